@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da extração de campos do DARM: extrator anterior x extrator pré-compilado
+
+Mede o tempo médio por documento das duas versões sobre textos de exemplo e
+confere que ambas devolvem o mesmo dicionário.
+
+Uso: python benchmark_extracao.py [iterações]
+"""
+
+import contextlib
+import io
+import re
+import sys
+import time
+
+from darm_extractor import DEFAULT_EXTRACTOR
+
+# Textos de exemplo: layout numerado (PyPDF2 e linhas separadas) e texto livre
+SAMPLE_TEXTS = {
+    'pdf_real': """01. RECEITA
+262-302. INSCRIÇÃO MUNICIPAL
+0301548303. DATA VENCIMENTO
+10/07/2025
+04. ANO DE REFERÊNCIA
+202505. GUIA NØ
+0000149
+06. VALOR DO TRIBUTO
+R$ 32,05
+07. VALOR MORA
+*************08. VALOR MULTA
+*************
+09. VALOR TOTAL
+R$ 32,0510. NOME/NOME EMPRESARIAL
+AM PATT PUBLICIDADE LTDA11. INFORMAÇÕES COMPLEMENTARES
+TAXA DE AUTORIZAÇÃO DE PUBLICIDADE
+NÚMERO DO REQUERIMENTO - 2025001228
+DATA DO DEFERIMENTO - 25/06/2025
+TIPO - INTEGRAL
+TIPO DE ENGENHO - PAINEL
+LOCAL DE EXIBIÇÃO - ÁREA PÚBLICA
+012623020301548303100720250420250500001490632050""",
+    'linhas_separadas': """01. RECEITA
+262-3
+02. INSCRIÇÃO MUNICIPAL
+03015483
+03. DATA VENCIMENTO
+10/07/2025
+04. ANO DE REFERÊNCIA
+2025
+05. GUIA NØ
+0000149
+06. VALOR DO TRIBUTO
+R$ 32,05
+09. VALOR TOTAL
+R$ 32,05
+""",
+    'texto_livre': """DARM - Documento de Arrecadação de Receitas Municipais
+Inscrição Municipal: 123456789
+Código de Barras: 021234560126230315122024042024051234567890612345
+Código de Receita: 26-30
+Valor Principal: R$ 1.234,56
+Valor Total: R$ 1.234,56
+Data de Vencimento: 15/12/2024
+Exercício: 2024
+Número da Guia: 123456789
+""",
+}
+
+
+def extract_fields_legacy(text):
+    """Extrator anterior: monta e busca ~30 regex a cada chamada (mantido só para comparação)"""
+    try:
+        patterns = {
+            # Número de inscrição - múltiplos padrões
+            'inscricao': [
+                r'02\.\s*INSCRIÇÃO MUNICIPAL\s*\n?(\d{8,9})',  # 8 ou 9 dígitos (com quebra de linha)
+                r'02\.\s*INSCRIÇÃO MUNICIPAL\s*(\d{8,9})',  # 8 ou 9 dígitos (sem quebra de linha)
+                r'(?:Inscrição|INSCRIÇÃO|Inscrição Municipal|Inscrição)\s*:?\s*(\d{8,9})',  # 8 ou 9 dígitos
+                r'(?:Inscrição|INSCRIÇÃO)\s*(\d{8,9})',  # 8 ou 9 dígitos
+                r'Insc\.?\s*:?\s*(\d{8,9})'  # 8 ou 9 dígitos
+            ],
+        
+            # Código de barras - padrão específico para código de barras
+            'codigoBarras': [
+                r'(?:Código de Barras|CODIGO DE BARRAS)\s*:?\s*([\d\.\s]+)',
+                r'(?:Barras|BARRAS)\s*:?\s*([\d\.\s]+)',
+                r'([\d]{48})',  # Exatamente 48 dígitos
+                r'([\d]{44,50})'  # Entre 44 e 50 dígitos
+            ],
+        
+            # Código de receita - extrair do campo RECEITA
+            'codigoReceita': [
+                r'01\.\s*RECEITA\s*\n(\d{1,4})-(\d{1,2})',  # Formato específico do PDF
+                r'01\.\s*RECEITA\s*(\d{1,4})-(\d{1,2})',  # Formato alternativo
+                r'(?:RECEITA|Receita|Código de Receita)\s*:?\s*(\d{1,4}-\d{1,2})',  # Formato genérico
+                r'(\d{1,4})-(\d{1,2})',  # Para formato como "258-5"
+                r'RECEITA\s*\n(\d{1,4})-(\d{1,2})'  # Formato mais específico
+            ],
+        
+            # Valor principal - múltiplos padrões
+            'valorPrincipal': [
+                r'(?:Valor Principal|VALOR PRINCIPAL|Valor principal)\s*:?\s*R?\$?\s*([\d,\.]+)',
+                r'(?:Principal|PRINCIPAL)\s*:?\s*R?\$?\s*([\d,\.]+)',
+                r'R?\$?\s*([\d,\.]+)\s*(?:Principal|PRINCIPAL)',
+                r'06\.\s*VALOR DO TRIBUTO\s*R?\$?\s*([\d,\.]+)'
+            ],
+        
+            # Valor total - múltiplos padrões
+            'valorTotal': [
+                r'(?:Valor Total|VALOR TOTAL|Valor total)\s*:?\s*R?\$?\s*([\d,\.]+)',
+                r'(?:Total|TOTAL)\s*:?\s*R?\$?\s*([\d,\.]+)',
+                r'R?\$?\s*([\d,\.]+)\s*(?:Total|TOTAL)',
+                r'09\.\s*VALOR TOTAL\s*R?\$?\s*([\d,\.]+)'
+            ],
+        
+            # Data de vencimento - múltiplos padrões
+            'dataVencimento': [
+                r'(?:Vencimento|VENCIMENTO|Venc\.?)\s*:?\s*(\d{2}/\d{2}/\d{4})',
+                r'(\d{2}/\d{2}/\d{4})\s*(?:Vencimento|VENCIMENTO)',
+                r'03\.\s*DATA VENCIMENTO\s*(\d{2}/\d{2}/\d{4})'
+            ],
+        
+            # Exercício - múltiplos padrões
+            'exercicio': [
+                r'(?:Exercício|EXERCÍCIO|Exerc\.?)\s*:?\s*(\d{4})',
+                r'(\d{4})\s*(?:Exercício|EXERCÍCIO)',
+                r'04\.\s*ANO DE REFERÊNCIA\s*(\d{4})'
+            ],
+        
+            # Número da guia - múltiplos padrões
+            'numeroGuia': [
+                r'05\.\s*GUIA NØ\s*\n?([0-9]+)',  # Pega a linha após o título
+                r'(?:Guia|GUIA|Número da Guia|Nº Guia)\s*:?\s*(\d+)',
+                r'(?:Guia|GUIA)\s*(\d+)',
+                r'Guia\.?\s*:?\s*(\d+)'
+            ],
+        
+            # Competência - múltiplos padrões
+            'competencia': [
+                r'(?:Competência|COMPETÊNCIA|Comp\.?)\s*:?\s*(\d{2}/\d{4})',
+                r'(\d{2}/\d{4})\s*(?:Competência|COMPETÊNCIA)'
+            ]
+        }
+
+        data = {}
+
+        # Extrair cada campo usando múltiplos padrões
+        for key, pattern_array in patterns.items():
+            for pattern in pattern_array:
+                match = re.search(pattern, text, re.IGNORECASE)
+                if match:
+                    # Tratamento especial para código de receita no formato "XXX-X"
+                    if key == 'codigoReceita' and len(match.groups()) > 1:
+                        data[key] = match.group(1) + match.group(2)  # Concatenar sem hífen
+                        print(f'🔧 Código de receita extraído (concatenação): {data[key]}')
+                    elif key == 'codigoReceita' and '-' in match.group(1):
+                        # Manter o formato original com hífen
+                        data[key] = match.group(1)
+                        print(f'🔧 Código de receita extraído (com hífen): {data[key]}')
+                    elif key == 'numeroGuia':
+                        data[key] = match.group(1).lstrip('0') or '0'  # Remove zeros à esquerda
+                    elif key == 'inscricao':
+                        # Processar inscrição municipal - remover zero extra se necessário
+                        inscricao = match.group(1).strip()
+                        # Se tem 9 dígitos e termina com zero, remover o último dígito
+                        if len(inscricao) == 9 and inscricao.endswith('0'):
+                            inscricao = inscricao[:-1]
+                            print(f'🔧 Inscrição corrigida: {match.group(1)} -> {inscricao}')
+                        data[key] = inscricao
+                    elif key == 'codigoBarras':
+                        # Limpar o código de barras removendo espaços e pontos
+                        codigo = re.sub(r'[\s\.]', '', match.group(1))
+                        # Garantir que tem pelo menos 44 dígitos
+                        if len(codigo) >= 44:
+                            data[key] = codigo[:48]  # Limitar a 48 dígitos
+                            print(f'Campo {key} encontrado: {data[key]}')
+                            break
+                    else:
+                        data[key] = match.group(1).strip()
+                
+                    if data[key]:
+                        print(f'Campo {key} encontrado: {data[key]}')
+                    break  # Usar o primeiro padrão que encontrar
+
+        return data
+    except Exception:
+        return None
+
+
+def extract_fields_precompiled(text):
+    """Extrator atual (darm_extractor)"""
+    return DEFAULT_EXTRACTOR.extract_fields(text)
+
+
+def time_per_document(func, text, iterations):
+    """Tempo médio (µs) de uma chamada, com a saída de debug descartada"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func(text)
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1e6
+
+
+def run_benchmark(iterations=2000):
+    """Executar o benchmark e devolver {amostra: (µs antes, µs depois, resultados iguais)}"""
+    results = {}
+    for name, text in SAMPLE_TEXTS.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            same = extract_fields_legacy(text) == extract_fields_precompiled(text)
+        before = time_per_document(extract_fields_legacy, text, iterations)
+        after = time_per_document(extract_fields_precompiled, text, iterations)
+        results[name] = (before, after, same)
+    return results
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"⏱️  Benchmark de extração de campos ({iterations} iterações por amostra)")
+    print("=" * 70)
+    print(f"{'Amostra':<20}{'Antes (µs/doc)':>16}{'Depois (µs/doc)':>17}{'Ganho':>8}  Mesmo resultado")
+    for name, (before, after, same) in run_benchmark(iterations).items():
+        print(f"{name:<20}{before:>16.1f}{after:>17.1f}{before / after:>7.1f}x  {'✅' if same else '❌'}")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pico de memória alocada por página no caminho de imagem do OCR: pipeline anterior x atual
+
+Anterior: página RGB do pdf2image -> np.array -> RGB2BGR -> BGR2GRAY -> threshold
+-> morfologia -> blur (cada etapa um quadro novo) -> PNG para o pytesseract.
+Atual: página em tons de cinza do pdf2image -> array 2D -> threshold, com
+morfologia e blur no mesmo buffer -> bytes crus para o tesserocr.
+
+A medição usa o tracemalloc (arrays do numpy/OpenCV e buffers do Python; o
+buffer interno da PIL Image, alocado em C, fica de fora dos dois lados).
+Sem PDF, usa uma página A4 sintética na resolução configurada.
+
+Uso: python benchmark_memoria_ocr.py [arquivo.pdf]
+"""
+
+import contextlib
+import io
+import sys
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from config import OCR_CONFIG
+from darm_processor import DarmProcessor
+from fixtures_darm import linhas_darm
+
+A4_INCHES = (8.27, 11.69)
+
+
+def synthetic_page(dpi, mode):
+    """Página A4 com o texto de um DARM, no modo da PIL ('RGB' ou 'L')"""
+    size = (int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi))
+    page = Image.new(mode, size, 'white')
+    draw = ImageDraw.Draw(page)
+    for index, line in enumerate(linhas_darm()):
+        draw.text((dpi // 2, dpi // 2 + index * dpi // 6), line, fill='black')
+    return page
+
+
+def previous_pipeline(page):
+    """Caminho anterior: conversões de cor e uma cópia por etapa, PNG no fim (pytesseract)"""
+    opencv_image = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, np.ones((1, 1), np.uint8))
+    processed = cv2.GaussianBlur(processed, (1, 1), 0)
+    png = io.BytesIO()
+    Image.fromarray(processed).save(png, format='PNG')
+    return png.getvalue()
+
+
+def current_pipeline(processor, page):
+    """Caminho atual: página já em cinza, buffer do threshold reaproveitado, bytes crus no fim"""
+    processed = processor.preprocess_image_for_ocr(np.asarray(page))
+    return processed.tobytes()
+
+
+def measure(function, *args):
+    """Pico de memória alocada (bytes) durante a chamada"""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(pdf_path=None, dpi=None):
+    """Devolver {'anterior': bytes, 'atual': bytes, 'pixels': n} para uma página"""
+    processor = DarmProcessor()
+    dpi = dpi or processor.ocr_dpi
+    if pdf_path:
+        from pdf2image import convert_from_path
+        rgb_page = convert_from_path(pdf_path, dpi=dpi, first_page=1, last_page=1)[0]
+        gray_page = processor.rasterize_pdf_page(pdf_path, 1)
+    else:
+        rgb_page = synthetic_page(dpi, 'RGB')
+        gray_page = synthetic_page(dpi, 'L')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            'anterior': measure(previous_pipeline, rgb_page),
+            'atual': measure(current_pipeline, processor, gray_page),
+            'pixels': gray_page.size[0] * gray_page.size[1],
+        }
+
+
+if __name__ == "__main__":
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else None
+    origem = pdf_path or f"página A4 sintética a {OCR_CONFIG.get('dpi', 300)} DPI"
+    print(f"🧠 Pico de memória alocada por página no OCR ({origem})")
+    print("=" * 70)
+    result = run_benchmark(pdf_path)
+    pixels = result['pixels']
+    for name in ('anterior', 'atual'):
+        allocated = result[name]
+        print(f"{name:<10}{allocated / 1024 / 1024:>10.1f} MB  ({allocated / pixels:.1f} bytes/pixel)")
+    print(f"📉 Redução: {1 - result['atual'] / result['anterior']:.0%}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos motores de OCR (tesserocr com instâncias aquecidas x pytesseract)
+
+Rasteriza e pré-processa as páginas de uma pasta (imagens e PDFs escaneados)
+uma única vez, fora da medição, e aplica o OCR com cada motor disponível:
+na página inteira e nas caixas do modelo de OCR por regiões (várias chamadas
+pequenas por página, onde a partida do processo do pytesseract mais pesa).
+Mostra as páginas por segundo e confere se os dados do DARM extraídos são os
+mesmos obtidos com o pytesseract.
+
+Uso: python benchmark_ocr_engines.py [pasta_com_darms] [repetições]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from config import OCR_CONFIG
+from darm_extractor import DEFAULT_EXTRACTOR
+from darm_processor import DarmProcessor
+from ocr_engines import ENGINES, FALLBACK_ENGINE, create_engine
+from roi_ocr import RoiOcr
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.tif', '.bmp')
+
+
+def load_pages(darms_dir, processor):
+    """Páginas pré-processadas ({nome: imagem}) das imagens e da primeira página dos PDFs"""
+    import cv2
+    import numpy as np
+
+    pages = {}
+    for path in sorted(Path(darms_dir).iterdir()):
+        suffix = path.suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        elif suffix == '.pdf':
+            page = processor.rasterize_pdf_page(path, 1)
+            image = np.asarray(page)
+            page.close()
+        else:
+            continue
+        if image is not None:
+            pages[path.name] = processor.preprocess_image_for_ocr(image)
+    return pages
+
+
+def benchmark_engine(engine, pages, lang, repetitions=1, roi=False):
+    """Devolver (segundos, {arquivo: campos extraídos}) do motor sobre as páginas"""
+    reader = RoiOcr.from_config(engine=engine) if roi else None
+    texts = {}
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for name, image in pages.items():
+            texts[name] = reader.read(image) if roi else engine.image_to_string(image, lang=lang)
+    elapsed = time.perf_counter() - start
+
+    # Extração dos campos fora da medição: só o OCR entra no tempo
+    return elapsed, {name: DEFAULT_EXTRACTOR.extract_fields(text, verbose=False) for name, text in texts.items()}
+
+
+def run_benchmark(darms_dir, repetitions=1):
+    """Executar o benchmark e devolver {(motor, modo): (páginas/s, arquivos com os mesmos dados do pytesseract, arquivos)}"""
+    processor = DarmProcessor()
+    pages = load_pages(darms_dir, processor)
+    if not pages:
+        return {}
+
+    lang = OCR_CONFIG.get('language', 'por')
+    measured = {}
+    for name in ENGINES:
+        engine = create_engine(name, OCR_CONFIG)
+        if not engine.available():
+            continue
+        for mode in ('página', 'caixas'):
+            elapsed, fields = benchmark_engine(engine, pages, lang, repetitions, roi=mode == 'caixas')
+            measured[name, mode] = (len(pages) * repetitions / elapsed if elapsed else float('inf'), fields)
+        engine.close()
+
+    results = {}
+    for (name, mode), (pages_per_second, fields) in measured.items():
+        reference = measured.get((FALLBACK_ENGINE, mode), (None, {}))[1]
+        same = sum(1 for f, data in fields.items() if reference.get(f) == data)
+        results[name, mode] = (pages_per_second, same, len(pages))
+    return results
+
+
+if __name__ == "__main__":
+    darms_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('darms')
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f"⏱️  Benchmark dos motores de OCR ({darms_dir}, {repetitions} repetição(ões))")
+    print("=" * 70)
+    try:
+        results = run_benchmark(darms_dir, repetitions)
+    except ImportError as error:
+        print(f"❌ Dependências de OCR não instaladas: {error}")
+        sys.exit(1)
+    if not results:
+        print("📭 Nenhuma imagem ou PDF encontrado, ou nenhum motor disponível.")
+        sys.exit(1)
+
+    print(f"{'Motor':<14}{'Modo':<10}{'Páginas/s':>12}  Mesmos dados do pytesseract")
+    for (name, mode), (pages_per_second, same, total) in results.items():
+        print(f"{name:<14}{mode:<10}{pages_per_second:>12.2f}  {same}/{total}")
+    missing = [name for name in ENGINES if not any(name == measured for measured, _ in results)]
+    if missing:
+        print(f"⚠️  Motores não instalados: {', '.join(missing)} (tesserocr: pip install tesserocr)")
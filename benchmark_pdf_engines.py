@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos motores de texto de PDF (pdftotext, pdfminer, PyPDF2)
+
+Extrai a camada de texto de todos os PDFs de uma pasta com cada motor
+disponível, mostra as páginas por segundo e confere se os dados do DARM
+extraídos são os mesmos obtidos com o PyPDF2.
+
+Uso: python benchmark_pdf_engines.py [pasta_com_pdfs] [repetições]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from config import PDF_TEXT_CONFIG
+from darm_extractor import DEFAULT_EXTRACTOR
+from pdf_text_engines import ENGINES, FALLBACK_ENGINE, create_engine
+
+
+def benchmark_engine(engine, pdf_files, repetitions=1):
+    """Devolver (páginas, segundos, {arquivo: campos extraídos}) do motor sobre os PDFs"""
+    pages = 0
+    fields = {}
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for pdf_file in pdf_files:
+            page_texts = list(engine.iter_pages(pdf_file))
+            pages += len(page_texts)
+            fields[pdf_file.name] = page_texts
+    elapsed = time.perf_counter() - start
+
+    # Extração dos campos fora da medição: só o motor entra no tempo
+    for name, page_texts in fields.items():
+        fields[name] = DEFAULT_EXTRACTOR.extract_fields(''.join(page_texts), verbose=False)
+    return pages, elapsed, fields
+
+
+def run_benchmark(pdf_dir, repetitions=1):
+    """Executar o benchmark e devolver {motor: (páginas/s, arquivos com os mesmos dados do PyPDF2)}"""
+    pdf_files = sorted(Path(pdf_dir).glob('*.pdf'))
+    if not pdf_files:
+        return {}
+
+    measured = {}
+    for name in ENGINES:
+        engine = create_engine(name, PDF_TEXT_CONFIG)
+        if not engine.available():
+            continue
+        pages, elapsed, fields = benchmark_engine(engine, pdf_files, repetitions)
+        measured[name] = (pages / elapsed if elapsed else float('inf'), fields)
+
+    reference = measured.get(FALLBACK_ENGINE, (None, {}))[1]
+    return {name: (pages_per_second, sum(1 for f, data in fields.items() if reference.get(f) == data))
+            for name, (pages_per_second, fields) in measured.items()}
+
+
+if __name__ == "__main__":
+    pdf_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('darms')
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    pdf_count = len(list(pdf_dir.glob('*.pdf')))
+
+    print(f"⏱️  Benchmark dos motores de texto de PDF ({pdf_count} PDFs em {pdf_dir}, {repetitions} repetição(ões))")
+    print("=" * 70)
+    results = run_benchmark(pdf_dir, repetitions)
+    if not results:
+        print("📭 Nenhum PDF encontrado ou nenhum motor disponível.")
+        sys.exit(1)
+
+    print(f"{'Motor':<12}{'Páginas/s':>12}  Mesmos dados do PyPDF2")
+    for name, (pages_per_second, same) in results.items():
+        print(f"{name:<12}{pages_per_second:>12.1f}  {same}/{pdf_count}")
+    missing = [name for name in ENGINES if name not in results]
+    if missing:
+        print(f"⚠️  Motores não instalados: {', '.join(missing)}")
@@ -7,6 +7,8 @@ Este arquivo contém todas as configurações personalizáveis do processador,
 permitindo fácil adaptação para diferentes ambientes e necessidades.
 """
 
+import re
+
 # =============================================================================
 # CONFIGURAÇÕES DO BANCO DE DADOS
 # =============================================================================
@@ -42,69 +44,72 @@ PROCESSING_CONFIG = {
     'default_valor_mora': 0.00,     # Valor padrão para mora
     'default_valor_multa': 0.00,    # Valor padrão para multa
     'default_valor_juros': 0.00,    # Valor padrão para juros
+    'incremental': False,           # Processar apenas arquivos novos ou alterados
+    'manifest_file': '.manifest.json', # Manifesto do modo incremental (na pasta de saída)
 }
 
 # =============================================================================
 # CONFIGURAÇÕES DE EXTRAÇÃO DE DADOS
 # =============================================================================
 
-# Padrões de regex para extração de dados
+# Padrões genéricos de regex para extração de dados (texto livre, fora do layout
+# numerado "01. RECEITA" ... "09. VALOR TOTAL", que o extrator lê numa varredura própria).
+# Com 'adaptive_pattern_order' o registro de padrões passa a tentar primeiro os que mais
+# acertam por tempo de busca, mas só entre padrões da mesma especificidade (rótulo antes
+# do valor, rótulo depois do valor); padrões sem rótulo ficam sempre no fim, nesta ordem.
 EXTRACTION_PATTERNS = {
     'inscricao': [
-        r'(?:Inscrição|INSCRIÇÃO|Inscrição Municipal|Inscrição)\s*:?\s*(\d+)',
-        r'(?:Inscrição|INSCRIÇÃO)\s*(\d+)',
-        r'Insc\.?\s*:?\s*(\d+)',
-        r'02\.\s*INSCRIÇÃO MUNICIPAL\s*(\d+)'
+        r'(?:Inscrição|INSCRIÇÃO|Inscrição Municipal|Inscrição)\s*:?\s*(\d{8,9})',  # 8 ou 9 dígitos
+        r'(?:Inscrição|INSCRIÇÃO)\s*(\d{8,9})',  # 8 ou 9 dígitos
+        r'Insc\.?\s*:?\s*(\d{8,9})'  # 8 ou 9 dígitos
     ],
-    
     'codigoBarras': [
-        r'([\d\.\s]+)'
+        r'([\d]{48})',  # Exatamente 48 dígitos
+        r'([\d]{44,50})'  # Entre 44 e 50 dígitos
     ],
-    
     'codigoReceita': [
-        r'(?:RECEITA|Receita)\s*(\d+-\d+)',
-        r'01\.\s*RECEITA\s*(\d+-\d+)',
-        r'(\d+)-(\d+)'
+        r'RECEITA\s*\n(\d{1,4})-(\d{1,2})',  # Formato mais específico
+        r'(?:RECEITA|Receita|Código de Receita)\s*:?\s*(\d{1,4}-\d{1,2})',  # Formato genérico
+        r'(\d{1,4})-(\d{1,2})'  # Sem rótulo, para formato como "258-5" (sempre por último)
     ],
-    
     'valorPrincipal': [
         r'(?:Valor Principal|VALOR PRINCIPAL|Valor principal)\s*:?\s*R?\$?\s*([\d,\.]+)',
         r'(?:Principal|PRINCIPAL)\s*:?\s*R?\$?\s*([\d,\.]+)',
-        r'R?\$?\s*([\d,\.]+)\s*(?:Principal|PRINCIPAL)',
-        r'06\.\s*VALOR DO TRIBUTO\s*R?\$?\s*([\d,\.]+)'
+        r'R?\$?\s*([\d,\.]+)\s*(?:Principal|PRINCIPAL)'
     ],
-    
     'valorTotal': [
         r'(?:Valor Total|VALOR TOTAL|Valor total)\s*:?\s*R?\$?\s*([\d,\.]+)',
         r'(?:Total|TOTAL)\s*:?\s*R?\$?\s*([\d,\.]+)',
-        r'R?\$?\s*([\d,\.]+)\s*(?:Total|TOTAL)',
-        r'09\.\s*VALOR TOTAL\s*R?\$?\s*([\d,\.]+)'
+        r'R?\$?\s*([\d,\.]+)\s*(?:Total|TOTAL)'
     ],
-    
     'dataVencimento': [
         r'(?:Vencimento|VENCIMENTO|Venc\.?)\s*:?\s*(\d{2}/\d{2}/\d{4})',
-        r'(\d{2}/\d{2}/\d{4})\s*(?:Vencimento|VENCIMENTO)',
-        r'03\.\s*DATA VENCIMENTO\s*(\d{2}/\d{2}/\d{4})'
+        r'(\d{2}/\d{2}/\d{4})\s*(?:Vencimento|VENCIMENTO)'
     ],
-    
     'exercicio': [
         r'(?:Exercício|EXERCÍCIO|Exerc\.?)\s*:?\s*(\d{4})',
-        r'(\d{4})\s*(?:Exercício|EXERCÍCIO)',
-        r'04\.\s*ANO DE REFERÊNCIA\s*(\d{4})'
+        r'(\d{4})\s*(?:Exercício|EXERCÍCIO)'
     ],
-    
     'numeroGuia': [
-        r'05\.\s*GUIA NØ\s*\n?([0-9]+)',
         r'(?:Guia|GUIA|Número da Guia|Nº Guia)\s*:?\s*(\d+)',
         r'(?:Guia|GUIA)\s*(\d+)',
         r'Guia\.?\s*:?\s*(\d+)'
     ],
-    
     'competencia': [
         r'(?:Competência|COMPETÊNCIA|Comp\.?)\s*:?\s*(\d{2}/\d{4})',
         r'(\d{2}/\d{4})\s*(?:Competência|COMPETÊNCIA)'
     ]
 }
+# Configurações do registro de padrões de extração
+EXTRACTION_CONFIG = {
+    'patterns_file': None,          # JSON {campo: [padrões]} que substitui os padrões acima (por campo)
+    'adaptive_pattern_order': True, # Tentar primeiro os padrões que mais acertam por tempo de busca
+    'reorder_interval': 50,         # Reordenar os padrões de um campo a cada N buscas
+    'stats_file': '.pattern_stats.json', # Estatísticas de acerto por padrão (na pasta de saída)
+    'stop_when_fields_found': True, # Parar de ler páginas quando inscrição, valor e guia já foram encontrados
+    'split_multi_darm_pdfs': False, # PDF consolidado do banco: um DARM por página (ou por "01. RECEITA")
+    'split_chunk_pages': 50,        # Páginas por tarefa ao ler um PDF consolidado no pool de processos
+}
 
 # =============================================================================
 # CONFIGURAÇÕES DE LOG E RELATÓRIOS
@@ -159,11 +164,36 @@ SECURITY_CONFIG = {
 # Configurações de performance
 PERFORMANCE_CONFIG = {
     'batch_size': 100,              # Tamanho do lote para processamento
+    'parallel_processing': True,    # Extrair os arquivos em paralelo num pool de processos
     'max_workers': 4,               # Número máximo de workers (para processamento paralelo)
     'timeout_seconds': 30,          # Timeout para processamento de cada PDF
     'memory_limit_mb': 512,         # Limite de memória (MB)
 }
 
+# Cache de extração (texto + dados extraídos por hash do conteúdo do arquivo)
+CACHE_CONFIG = {
+    'enabled': True,                # Reaproveitar extrações de arquivos que não mudaram
+    'directory': '.cache',          # Pasta do cache (relativa à pasta de saída)
+    'max_size_mb': 256,             # Tamanho máximo do cache (MB) - remove os menos usados
+}
+
+# Detecção de DARMs duplicados (reescaneamentos, fotos e o PDF original)
+DEDUP_CONFIG = {
+    'enabled': False,               # Pular cópias do mesmo DARM (hash da imagem antes do OCR, dos campos depois)
+    'hash_dpi': 24,                 # DPI da renderização da primeira página para o hash perceptual
+    'hash_size': 16,                # Lado da grade do dHash (hash de hash_size² bits)
+    'max_hash_distance': 8,         # Bits diferentes para ser candidato a cópia (confirmado por guia e valor)
+    'report_file': 'DUPLICATAS.json', # Grupos de duplicatas encontrados (na pasta de saída)
+}
+
+# Extração da camada de texto dos PDFs (pdf_text_engines.py)
+PDF_TEXT_CONFIG = {
+    'engine': 'auto',               # auto, pdftotext, pdfminer ou pypdf2
+    'engine_order': ['pdftotext', 'pdfminer', 'pypdf2'],  # Ordem no modo auto (motores ausentes são ignorados)
+    'pdftotext_path': 'pdftotext',  # Executável do poppler (nome no PATH ou caminho completo)
+    'timeout': 30,                  # Timeout do pdftotext por documento (segundos)
+}
+
 # =============================================================================
 # CONFIGURAÇÕES DE OCR
 # =============================================================================
@@ -173,13 +203,25 @@ OCR_CONFIG = {
     'enabled': True,                # Habilitar funcionalidades de OCR
     'language': 'por',              # Idioma para OCR (por = português)
     'dpi': 300,                     # Resolução para conversão de PDF (DPI)
+    'adaptive_dpi': True,           # Tentar DPI menores primeiro; subir só se faltarem campos
+    'dpi_tiers': [150, 200],        # DPI tentados antes de 'dpi', em ordem crescente
     'preprocessing': True,          # Habilitar pré-processamento de imagem
     'threshold_method': 'adaptive', # Método de threshold (adaptive, otsu, binary)
     'kernel_size': 1,               # Tamanho do kernel para morfologia
     'blur_kernel': 1,               # Tamanho do kernel para blur
-    'confidence_threshold': 60,     # Limite de confiança do OCR (%)
+    'confidence_threshold': 60,     # Limite de confiança do OCR (%): campos abaixo dele são relidos
+    'field_confidence': True,       # OCR por palavras (image_to_data): confiança de cada campo extraído
+    'reocr_weak_fields': True,      # Reler só a caixa dos campos abaixo de confidence_threshold
+    'reocr_scale': 2,               # Ampliação do recorte na releitura
+    'reocr_padding': 4,             # Margem em volta das palavras do campo na releitura (pixels)
+    'reocr_configs': {},            # Campo -> configuração do tesseract na releitura (padrão: a de ROI_OCR_TEMPLATE)
     'max_pages': 10,                # Número máximo de páginas para processar
+    'parallel_pages': True,         # Rasterizar e aplicar OCR nas páginas em paralelo
+    'page_workers': 4,              # Número de workers do OCR por página
     'timeout_per_page': 60,         # Timeout por página (segundos)
+    'engine': 'auto',               # auto, tesserocr ou pytesseract
+    'engine_order': ['tesserocr', 'pytesseract'], # Ordem tentada no modo auto (pytesseract sempre por último)
+    'tessdata_path': None,          # Pasta do tessdata para o tesserocr (None = padrão da instalação)
 }
 
 # Configurações de pré-processamento de imagem
@@ -189,11 +231,40 @@ IMAGE_PREPROCESSING_CONFIG = {
     'remove_noise': True,           # Remover ruído
     'smooth_image': True,           # Suavizar imagem
     'enhance_contrast': True,       # Melhorar contraste
-    'resize_if_needed': True,       # Redimensionar se necessário
+    'resize_if_needed': True,       # Reduzir arquivos de imagem grandes (páginas de PDF já vêm no DPI do OCR)
     'max_width': 2000,              # Largura máxima da imagem
     'max_height': 3000,             # Altura máxima da imagem
 }
 
+# OCR por regiões (ROI): só as caixas numeradas do formulário e a linha do código de barras
+ROI_OCR_CONFIG = {
+    'enabled': False,               # Recortar as caixas do modelo em vez de ler a página inteira
+    'template_file': None,          # JSON {campo: {"box": [...], "config": "..."}} que substitui campos do modelo
+    'fallback_full_page': True,     # Sem os campos obrigatórios nas caixas: OCR da página inteira
+    'padding': 0.005,               # Margem extra em volta de cada caixa (fração da página)
+}
+
+# Modelo do DARM: caixa de cada campo em frações da página (x0, y0, x1, y1) e configuração
+# do Tesseract. Calibrar com: python roi_ocr.py <imagem_do_darm> (desenha as caixas)
+_DIGITOS = '-c tessedit_char_whitelist=0123456789'
+ROI_OCR_TEMPLATE = {
+    'codigoReceita':  {'box': [0.05, 0.10, 0.30, 0.15], 'config': f'--psm 7 {_DIGITOS}-'},
+    'inscricao':      {'box': [0.30, 0.10, 0.60, 0.15], 'config': f'--psm 7 {_DIGITOS}'},
+    'dataVencimento': {'box': [0.60, 0.10, 0.95, 0.15], 'config': f'--psm 7 {_DIGITOS}/'},
+    'exercicio':      {'box': [0.05, 0.15, 0.30, 0.20], 'config': f'--psm 7 {_DIGITOS}'},
+    'numeroGuia':     {'box': [0.30, 0.15, 0.60, 0.20], 'config': f'--psm 7 {_DIGITOS}'},
+    'valorPrincipal': {'box': [0.60, 0.15, 0.95, 0.20], 'config': f'--psm 7 {_DIGITOS}.,'},
+    'valorTotal':     {'box': [0.60, 0.30, 0.95, 0.35], 'config': f'--psm 7 {_DIGITOS}.,'},
+    'codigoBarras':   {'box': [0.05, 0.40, 0.95, 0.45], 'config': f'--psm 7 {_DIGITOS}.'},
+}
+
+# Código de barras / linha digitável (padrão FEBRABAN de arrecadação, 48 dígitos)
+BARCODE_CONFIG = {
+    'enabled': True,                # Conferir os dígitos verificadores e usar o valor do código de barras
+    'decode_images': True,          # Nas páginas escaneadas, ler o código de barras da imagem (requer pyzbar)
+    'fields': {},                   # Campos do campo livre: {campo: [início, fim]} no código de 44 dígitos
+}
+
 # =============================================================================
 # CONFIGURAÇÕES DE OUTPUT
 # =============================================================================
@@ -201,14 +272,39 @@ IMAGE_PREPROCESSING_CONFIG = {
 # Configurações de saída
 OUTPUT_CONFIG = {
     'generate_single_file': True,   # Gerar arquivo único
-    'generate_individual_files': True, # Gerar arquivos individuais
-    'generate_check_files': True,   # Gerar arquivos de verificação
+    'generate_individual_files': True, # Gerar arquivos individuais (INSERT_DARM_PAGO_{guia}.sql)
+    'generate_check_files': True,   # Gerar a verificação de existência das guias (uma por lote, NR_GUIA IN em blocos)
+    'check_file_name': 'CHECK_GUIAS_EXISTENTES.sql', # Verificação de todas as guias da execução
+    'check_chunk_size': 1000,       # Guias por NR_GUIA IN (...) na verificação
+    'existing_guias_file': 'GUIAS_EXISTENTES.tsv', # Resultado da verificação (NR_GUIA, AA_EXERCICIO): guias sem INSERT
+    'generate_batch_files': False,  # Gerar INSERTs de várias linhas em poucos arquivos (lotes)
+    'batch_file_rows': 5000,        # Linhas por arquivo de lote (statements de batch_size linhas)
+    'batch_file_pattern': 'INSERT_DARMS_LOTE_{n:03d}.sql', # Nome dos arquivos de lote
+    'batch_check_file_pattern': 'CHECK_GUIAS_LOTE_{n:03d}.sql', # Verificação das guias de cada lote
     'generate_report': True,        # Gerar relatório
     'file_naming_pattern': 'INSERT_DARM_PAGO_{guia}.sql', # Padrão de nomenclatura
     'single_file_name': 'INSERT_TODOS_DARMs.sql', # Nome do arquivo único
+    'max_rows_per_statement': 1000, # Linhas por INSERT no arquivo único (None = sem limite)
+    'max_statement_bytes': 1048576, # Bytes por INSERT (abaixo do max_allowed_packet do MySQL)
     'report_file_name': 'RELATORIO_PROCESSAMENTO.md', # Nome do relatório
 }
 
+# Alocação de SQ_DOC (sequência persistente, compartilhada entre execuções e processos)
+SQ_DOC_CONFIG = {
+    'sequence_file': '.sq_doc_sequence', # Próximo SQ_DOC livre (na pasta de saída)
+    'start': 1,                     # Primeiro SQ_DOC (use um valor acima do MAX(SQ_DOC) já existente no banco)
+    'max_value': 999999,            # Maior SQ_DOC permitido
+    'block_size': 1000,             # Números reservados por acesso ao arquivo de sequência
+}
+
+# Livro de guias (SQLite na pasta de saída): guias já geradas ou carregadas, entre execuções
+LEDGER_CONFIG = {
+    'enabled': True,                # Consultar o livro em vez de gerar um CHECK_GUIA_{guia}.sql por guia
+    'file': '.guias.sqlite3',       # Arquivo do livro (na pasta de saída)
+    'skip_loaded': True,            # Não gerar INSERT para guias já carregadas no banco
+    'skip_generated': True,         # Não gerar de novo guias geradas por outro arquivo em execução anterior
+}
+
 # =============================================================================
 # MENSAGENS E TEXTO
 # =============================================================================
@@ -260,14 +356,22 @@ def get_config_section(section_name):
         'directories': DIRECTORIES,
         'processing': PROCESSING_CONFIG,
         'patterns': EXTRACTION_PATTERNS,
+        'extraction': EXTRACTION_CONFIG,
         'logging': LOGGING_CONFIG,
         'report': REPORT_CONFIG,
         'validation': VALIDATION_CONFIG,
         'security': SECURITY_CONFIG,
         'performance': PERFORMANCE_CONFIG,
+        'cache': CACHE_CONFIG,
+        'dedup': DEDUP_CONFIG,
+        'ledger': LEDGER_CONFIG,
+        'pdf_text': PDF_TEXT_CONFIG,
         'output': OUTPUT_CONFIG,
+        'sq_doc': SQ_DOC_CONFIG,
         'ocr': OCR_CONFIG,
         'image_preprocessing': IMAGE_PREPROCESSING_CONFIG,
+        'roi_ocr': ROI_OCR_CONFIG,
+        'barcode': BARCODE_CONFIG,
     }
     
     return config_sections.get(section_name, {})
@@ -294,6 +398,74 @@ def validate_config():
     if VALIDATION_CONFIG['max_valor'] <= VALIDATION_CONFIG['min_valor']:
         errors.append("Valor máximo deve ser maior que o valor mínimo")
     
+    # Validar limites dos statements
+    if OUTPUT_CONFIG.get('max_rows_per_statement') is not None and OUTPUT_CONFIG['max_rows_per_statement'] < 1:
+        errors.append("Linhas por statement deve ser pelo menos 1")
+    
+    # Validar alocação de SQ_DOC
+    if SQ_DOC_CONFIG['start'] < 0 or SQ_DOC_CONFIG['start'] > SQ_DOC_CONFIG['max_value']:
+        errors.append("SQ_DOC inicial deve estar entre 0 e o valor máximo")
+    
+    if EXTRACTION_CONFIG['split_chunk_pages'] < 1:
+        errors.append("Páginas por tarefa do PDF consolidado deve ser pelo menos 1")
+    
+    if SQ_DOC_CONFIG['block_size'] < 1:
+        errors.append("Bloco de SQ_DOC deve ter pelo menos 1 número")
+    
+    # Validar configurações de performance
+    if PERFORMANCE_CONFIG['max_workers'] < 1:
+        errors.append("Número máximo de workers deve ser pelo menos 1")
+    
+    # Validar motores de texto de PDF
+    engines = ['pdftotext', 'pdfminer', 'pypdf2']
+    if PDF_TEXT_CONFIG['engine'] not in engines + ['auto']:
+        errors.append(f"Motor de texto de PDF inválido: {PDF_TEXT_CONFIG['engine']}")
+    
+    for engine in PDF_TEXT_CONFIG['engine_order']:
+        if engine not in engines:
+            errors.append(f"Motor de texto de PDF inválido na ordem: {engine}")
+    
+    # Validar pré-processamento das imagens
+    if OCR_CONFIG['threshold_method'] not in ('adaptive', 'otsu', 'binary'):
+        errors.append(f"Método de threshold inválido: {OCR_CONFIG['threshold_method']}")
+    
+    if OCR_CONFIG['kernel_size'] < 1 or OCR_CONFIG['blur_kernel'] < 1 or OCR_CONFIG['blur_kernel'] % 2 == 0:
+        errors.append("Kernel de morfologia deve ser pelo menos 1 e o de blur um número ímpar")
+    
+    if IMAGE_PREPROCESSING_CONFIG['max_width'] < 1 or IMAGE_PREPROCESSING_CONFIG['max_height'] < 1:
+        errors.append("Dimensões máximas da imagem devem ser positivas")
+    
+    if any(dpi < 50 for dpi in OCR_CONFIG['dpi_tiers']):
+        errors.append("DPI das tentativas do OCR deve ser pelo menos 50")
+    
+    # Validar motores de OCR
+    ocr_engines = ['tesserocr', 'pytesseract']
+    if OCR_CONFIG['engine'] not in ocr_engines + ['auto']:
+        errors.append(f"Motor de OCR inválido: {OCR_CONFIG['engine']}")
+    
+    for engine in OCR_CONFIG['engine_order']:
+        if engine not in ocr_engines:
+            errors.append(f"Motor de OCR inválido na ordem: {engine}")
+    
+    # Validar modelo do OCR por regiões
+    for field, region in ROI_OCR_TEMPLATE.items():
+        x0, y0, x1, y1 = region['box']
+        if not (0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1):
+            errors.append(f"Caixa inválida no modelo de OCR por regiões: {field}")
+    
+    # Validar campos do campo livre do código de barras (posições no código de 44 dígitos)
+    for field, (start, end) in BARCODE_CONFIG['fields'].items():
+        if not 4 <= start < end <= 44:
+            errors.append(f"Posição inválida no código de barras: {field}")
+    
+    # Validar padrões de extração
+    for field, patterns in EXTRACTION_PATTERNS.items():
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as error:
+                errors.append(f"Padrão inválido para {field}: {pattern} ({error})")
+    
     return errors
 
 # =============================================================================
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Código de barras do DARM (padrão FEBRABAN de arrecadação)
+
+O código de barras tem 44 dígitos:
+
+    posição 1      '8' (arrecadação)
+    posição 2      segmento (1 = prefeituras)
+    posição 3      identificador de valor: 6/7 = módulo 10, 8/9 = módulo 11;
+                   6/8 = valor efetivo em reais, 7/9 = valor de referência
+    posição 4      dígito verificador geral
+    posições 5-15  valor (11 dígitos, em centavos)
+    posições 16-44 identificação do órgão e campo livre
+
+A linha digitável (48 dígitos, o campo codigoBarras do DARM) são os 44 dígitos em
+quatro blocos de 11, cada um seguido do seu dígito verificador.
+
+Com os dígitos verificadores conferidos, o valor do código de barras substitui o
+valor lido do texto (o OCR de "09. VALOR TOTAL" pode trocar dígitos; o código
+de barras validado não). Campos do campo livre podem ser mapeados em
+config.BARCODE_CONFIG['fields'].
+"""
+
+import re
+
+try:
+    from pyzbar import pyzbar
+except ImportError:
+    pyzbar = None
+
+BARCODE_LENGTH = 44
+LINE_LENGTH = 48
+BLOCK_LENGTH = 11
+
+# Identificadores de valor: quais usam módulo 10 e quais trazem o valor em reais
+MOD10_VALUE_IDS = '67'
+REAL_VALUE_IDS = '68'
+
+# Linha digitável no texto: quatro blocos "11 dígitos + DV", com espaços, pontos ou hífens
+_LINE_PATTERN = re.compile(
+    r'(?<!\d)(8\d{10})[ \t.\-]?(\d)'
+    + r'[\s.\-]*(\d{11})[ \t.\-]?(\d)' * 3
+    + r'(?!\d)'
+)
+# Código de barras (44 dígitos seguidos)
+_BARCODE_PATTERN = re.compile(r'(?<!\d)(8\d{43})(?!\d)')
+
+
+def mod10(digits):
+    """Dígito verificador módulo 10 (pesos 2 e 1 da direita para a esquerda)"""
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        product = int(digit) * (2 if index % 2 == 0 else 1)
+        total += product // 10 + product % 10
+    return (10 - total % 10) % 10
+
+
+def mod11(digits):
+    """Dígito verificador módulo 11 (pesos 2 a 9 da direita para a esquerda; restos 0 e 1 dão 0)"""
+    total = sum(int(digit) * (2 + index % 8) for index, digit in enumerate(reversed(digits)))
+    remainder = total % 11
+    return 0 if remainder in (0, 1) else 11 - remainder
+
+
+def check_digit(digits, value_id):
+    """Dígito verificador pelo módulo indicado no identificador de valor"""
+    return mod10(digits) if value_id in MOD10_VALUE_IDS else mod11(digits)
+
+
+def is_valid_barcode(code):
+    """Código de barras de arrecadação com 44 dígitos e dígito verificador geral correto"""
+    if len(code) != BARCODE_LENGTH or not code.isdigit() or code[0] != '8':
+        return False
+    return check_digit(code[:3] + code[4:], code[2]) == int(code[3])
+
+
+def barcode_from_line(line):
+    """Código de barras (44 dígitos) a partir da linha digitável; None se algum DV não confere"""
+    if len(line) != LINE_LENGTH or not line.isdigit() or line[0] != '8':
+        return None
+    blocks = [line[start:start + BLOCK_LENGTH + 1] for start in range(0, LINE_LENGTH, BLOCK_LENGTH + 1)]
+    value_id = line[2]
+    if any(check_digit(block[:-1], value_id) != int(block[-1]) for block in blocks):
+        return None
+    code = ''.join(block[:-1] for block in blocks)
+    return code if is_valid_barcode(code) else None
+
+
+def line_from_barcode(code):
+    """Linha digitável (48 dígitos) a partir do código de barras"""
+    blocks = [code[start:start + BLOCK_LENGTH] for start in range(0, BARCODE_LENGTH, BLOCK_LENGTH)]
+    return ''.join(block + str(check_digit(block, code[2])) for block in blocks)
+
+
+def format_value(cents):
+    """Centavos no formato do DARM (3.205,00)"""
+    reais, centavos = divmod(cents, 100)
+    return f'{reais:,}'.replace(',', '.') + f',{centavos:02d}'
+
+
+class BarcodeDecoder:
+    """Decodifica e valida o código de barras / linha digitável do DARM"""
+
+    def __init__(self, fields=None):
+        self.fields = fields or {}  # Campo -> [início, fim] no código de 44 dígitos
+
+    @classmethod
+    def from_config(cls):
+        """Montar o decodificador a partir do config.py"""
+        from config import BARCODE_CONFIG
+        return cls(BARCODE_CONFIG.get('fields'))
+
+    def decode(self, digits):
+        """Dados do código de barras (linha digitável ou código de 44 dígitos); None se não validar
+
+        Devolve {'codigoBarras': linha digitável, 'valorTotal': ...} e os campos mapeados
+        do campo livre. O valor só vem quando o identificador indica valor em reais.
+        """
+        digits = re.sub(r'\D', '', digits or '')
+        if len(digits) == LINE_LENGTH:
+            code = barcode_from_line(digits)
+        elif len(digits) == BARCODE_LENGTH and is_valid_barcode(digits):
+            code = digits
+        else:
+            code = None
+        if code is None:
+            return None
+
+        data = {'codigoBarras': line_from_barcode(code)}
+        if code[2] in REAL_VALUE_IDS:
+            data['valorTotal'] = format_value(int(code[4:15]))
+        for field, (start, end) in self.fields.items():
+            value = code[start:end]
+            if field == 'numeroGuia':
+                value = value.lstrip('0') or '0'  # Mesmo formato do extrator
+            data[field] = value
+        return data
+
+    def find_in_text(self, text):
+        """Primeira linha digitável (ou código de 44 dígitos) do texto que valida"""
+        for match in _LINE_PATTERN.finditer(text):
+            data = self.decode(''.join(match.groups()))
+            if data is not None:
+                return data
+        for match in _BARCODE_PATTERN.finditer(text):
+            data = self.decode(match.group(1))
+            if data is not None:
+                return data
+        return None
+
+    def read_image(self, image):
+        """Ler o código de barras (intercalado 2 de 5) da imagem da página; None se não houver
+
+        Requer pyzbar (pip install pyzbar) e a biblioteca zbar do sistema.
+        """
+        if pyzbar is None:
+            return None
+        for symbol in pyzbar.decode(image, symbols=[pyzbar.ZBarSymbol.I25]):
+            data = self.decode(symbol.data.decode('ascii', 'ignore'))
+            if data is not None:
+                return data
+        return None
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extrator de campos do DARM
+
+Todos os padrões são compilados uma única vez, na importação do módulo.
+Os campos numerados do formulário ("01. RECEITA" ... "09. VALOR TOTAL") são
+localizados numa única varredura do texto, com uma alternância de rótulos;
+o valor de cada campo é lido com um match ancorado logo após o rótulo.
+Os padrões genéricos (texto livre, sem o layout numerado) vêm do registro de
+padrões (config.EXTRACTION_PATTERNS) e só são tentados para os campos que a
+varredura não resolveu. O rótulo numerado vale para todos os campos; na versão
+anterior, valores, vencimento e exercício tentavam antes os padrões genéricos
+(ex.: "Exercício: 2024" no texto ganhava de "04. ANO DE REFERÊNCIA 2025").
+
+split_documents() separa o texto de um PDF consolidado (vários DARMs, em geral
+um por página) em um texto por DARM.
+"""
+
+import re
+
+from pattern_registry import PatternRegistry
+
+# Versão da lógica de extração (entra na chave do cache de extração)
+EXTRACTOR_VERSION = 3
+
+# Rótulos numerados do formulário: campo -> (número do campo, rótulo)
+FORM_LABELS = {
+    'codigoReceita': ('01', 'RECEITA'),
+    'inscricao': ('02', 'INSCRIÇÃO MUNICIPAL'),
+    'dataVencimento': ('03', 'DATA VENCIMENTO'),
+    'exercicio': ('04', 'ANO DE REFERÊNCIA'),
+    'numeroGuia': ('05', 'GUIA NØ'),
+    'valorPrincipal': ('06', 'VALOR DO TRIBUTO'),
+    'valorTotal': ('09', 'VALOR TOTAL'),
+}
+
+# Valor logo após o rótulo, em ordem de preferência
+FORM_VALUE_PATTERNS = {
+    'codigoReceita': [r'\s*\n(\d{1,4})-(\d{1,2})', r'\s*(\d{1,4})-(\d{1,2})'],
+    'inscricao': [r'\s*\n?(\d{8,9})'],
+    'dataVencimento': [r'\s*(\d{2}/\d{2}/\d{4})'],
+    'exercicio': [r'\s*(\d{4})'],
+    'numeroGuia': [r'\s*\n?([0-9]+)'],
+    'valorPrincipal': [r'\s*R?\$?\s*([\d,\.]+)'],
+    'valorTotal': [r'\s*R?\$?\s*([\d,\.]+)'],
+    'codigoBarras': [r'\s*:?\s*([\d\.\s]+)'],
+}
+
+# Ordem dos campos no dicionário devolvido (a mesma da versão anterior do extrator)
+FIELD_ORDER = ['inscricao', 'codigoBarras', 'codigoReceita', 'valorPrincipal', 'valorTotal',
+               'dataVencimento', 'exercicio', 'numeroGuia', 'competencia']
+
+# Campos obrigatórios para gerar o INSERT: cada grupo é resolvido por qualquer um dos seus campos
+REQUIRED_FIELDS = (('inscricao',), ('valorPrincipal', 'valorTotal'), ('numeroGuia',))
+
+# Campos conferidos antes de aceitar o texto de um motor de PDF, e o formato esperado de cada um
+CHECKED_FIELDS = (('numeroGuia',), ('codigoReceita',), ('valorPrincipal', 'valorTotal'))
+_MONEY_FORMAT = re.compile(r'\d{1,3}(?:[.,]?\d{3})*[.,]\d{2}')
+FIELD_FORMATS = {
+    'numeroGuia': re.compile(r'\d{1,10}'),
+    'codigoReceita': re.compile(r'\d{1,4}-?\d{1,2}'),
+    'valorPrincipal': _MONEY_FORMAT,
+    'valorTotal': _MONEY_FORMAT,
+}
+
+# Rótulo que abre cada DARM no layout numerado ("01. RECEITA")
+FIRST_FORM_FIELD = 'codigoReceita'
+
+_BARCODE_NOISE = re.compile(r'[\s\.]')
+
+
+def _compile_all(patterns):
+    """Compilar um dicionário campo -> lista de padrões"""
+    return {field: [re.compile(p, re.IGNORECASE) for p in field_patterns]
+            for field, field_patterns in patterns.items()}
+
+
+def build_label_scanner():
+    """Compilar a alternância de todos os rótulos (um grupo nomeado vazio marca o campo)
+
+    Os rótulos numerados vão de 01 a 09: o '0' comum fica fora da alternância e só
+    as palavras ignoram maiúsculas/minúsculas, o que deixa o motor de regex saltar
+    direto para as posições candidatas em vez de testar cada rótulo em cada caractere.
+    O rótulo do código de barras é só "Barras" ("Código de Barras" termina no mesmo ponto).
+    """
+    numbered = '|'.join(f'{number[1]}\\.\\s*(?i:{label})(?P<{field}>)'
+                        for field, (number, label) in FORM_LABELS.items())
+    return re.compile(f'0(?:{numbered})|[bB](?i:arras)(?P<codigoBarras>)')
+
+
+class DarmFieldExtractor:
+    """Extrator de campos do DARM com padrões pré-compilados"""
+
+    def __init__(self, registry=None):
+        self.label_scanner = build_label_scanner()
+        self.value_patterns = _compile_all(FORM_VALUE_PATTERNS)
+        self.registry = registry or PatternRegistry.from_config()
+
+    def scan_labels(self, text):
+        """Varredura única: posições (fim do rótulo) de cada campo numerado no texto"""
+        positions = {}
+        for match in self.label_scanner.finditer(text):
+            positions.setdefault(match.lastgroup, []).append(match.end())
+        return positions
+
+    def extract_fields(self, text, verbose=True, record=True):
+        """Extrair os campos do texto; devolve {campo: valor} apenas com os campos encontrados
+
+        record=False não conta a extração nas estatísticas do registro de padrões.
+        """
+        positions = self.scan_labels(text)
+        data = {}
+
+        for field in FIELD_ORDER:
+            value = self.find_field(field, text, positions, verbose, record)
+            if value:
+                data[field] = value
+                if verbose:
+                    print(f'Campo {field} encontrado: {value}')
+
+        return data
+
+    def find_field(self, field, text, positions, verbose=True, record=True):
+        """Valor de um campo: primeiro ancorado no rótulo, depois pelos padrões genéricos"""
+        # 1) Valor ancorado logo após o rótulo do formulário
+        for pattern in self.value_patterns.get(field, ()):
+            value = None
+            for pos in positions.get(field, ()):
+                match = pattern.match(text, pos)
+                if match:
+                    value = self.normalize(field, match, verbose)
+                    break
+            if value is not None:
+                return value
+
+        # 2) Padrões genéricos (registro), para textos fora do layout numerado
+        return self.registry.find(field, text,
+                                  lambda match: self.normalize(field, match, verbose), record)
+
+    def has_required_fields(self, text, required=REQUIRED_FIELDS):
+        """O texto já resolve todos os campos obrigatórios? (sem mensagens nem estatísticas)
+
+        Usado na leitura página a página para parar assim que os campos aparecem.
+        """
+        positions = self.scan_labels(text)
+        return all(any(self.find_field(field, text, positions, verbose=False, record=False)
+                       for field in group)
+                   for group in required)
+
+    @staticmethod
+    def has_required_data(data, required=REQUIRED_FIELDS):
+        """Os dados já extraídos (ex.: do código de barras) têm todos os campos obrigatórios?"""
+        return all(any(data.get(field) for field in group) for group in required)
+
+    @staticmethod
+    def has_well_formed_data(data, checked=CHECKED_FIELDS):
+        """Guia, receita e valor presentes e no formato esperado?
+
+        Um texto com rótulos e valores grudados ainda resolve os campos, mas com
+        valores errados (ex.: valor '32,0509.'); nesse caso o texto de outro motor
+        é preferível.
+        """
+        if not data:
+            return False
+        return (all(any(data.get(field) for field in group) for group in checked)
+                and all(pattern.fullmatch(str(data[field]))
+                        for field, pattern in FIELD_FORMATS.items() if data.get(field)))
+
+    def split_documents(self, pages):
+        """Dividir o texto das páginas de um PDF consolidado em um texto por DARM
+
+        Cada página abre um DARM novo se tiver o rótulo "01. RECEITA" ou os campos
+        obrigatórios; cada "01. RECEITA" adicional na mesma página abre outro. Páginas
+        sem nenhum dos dois continuam o DARM anterior (DARM de duas páginas, anexos).
+        """
+        documents = []
+        for page_text in pages:
+            starts = [match.start() for match in self.label_scanner.finditer(page_text)
+                      if match.lastgroup == FIRST_FORM_FIELD]
+            if starts:
+                # O cabeçalho da página fica com o primeiro DARM da página
+                bounds = [0] + starts[1:] + [len(page_text)]
+                documents.extend(page_text[start:end] for start, end in zip(bounds, bounds[1:]))
+            elif not documents or self.has_required_fields(page_text):
+                documents.append(page_text)
+            else:
+                documents[-1] += page_text
+        return documents
+
+    def normalize(self, field, match, verbose=True):
+        """Converter o match no valor do campo; None se o match não serve (tentar o próximo padrão)"""
+        if field == 'codigoReceita' and len(match.groups()) > 1:
+            value = match.group(1) + match.group(2)  # Concatenar sem hífen
+            if verbose:
+                print(f'🔧 Código de receita extraído (concatenação): {value}')
+            return value
+        if field == 'codigoReceita' and '-' in match.group(1):
+            # Manter o formato original com hífen
+            if verbose:
+                print(f'🔧 Código de receita extraído (com hífen): {match.group(1)}')
+            return match.group(1)
+        if field == 'numeroGuia':
+            return match.group(1).lstrip('0') or '0'  # Remove zeros à esquerda
+        if field == 'inscricao':
+            # Processar inscrição municipal - remover zero extra se necessário
+            inscricao = match.group(1).strip()
+            # Se tem 9 dígitos e termina com zero, remover o último dígito
+            if len(inscricao) == 9 and inscricao.endswith('0'):
+                inscricao = inscricao[:-1]
+                if verbose:
+                    print(f'🔧 Inscrição corrigida: {match.group(1)} -> {inscricao}')
+            return inscricao
+        if field == 'codigoBarras':
+            # Limpar o código de barras removendo espaços e pontos
+            codigo = _BARCODE_NOISE.sub('', match.group(1))
+            # Garantir que tem pelo menos 44 dígitos
+            if len(codigo) >= 44:
+                return codigo[:48]  # Limitar a 48 dígitos
+            return None
+        return match.group(1).strip()
+
+
+# Instância padrão, compartilhada pelo processador
+DEFAULT_EXTRACTOR = DarmFieldExtractor()
@@ -3,9 +3,31 @@ import re
 import json
 from datetime import datetime
 from pathlib import Path
-import PyPDF2
 import io
 import sys
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config import (PERFORMANCE_CONFIG, PROCESSING_CONFIG, OCR_CONFIG, CACHE_CONFIG, IMAGE_PREPROCESSING_CONFIG,
+                    EXTRACTION_CONFIG, OUTPUT_CONFIG, SQ_DOC_CONFIG, PDF_TEXT_CONFIG, ROI_OCR_CONFIG,
+                    BARCODE_CONFIG, DEDUP_CONFIG, LEDGER_CONFIG)
+from darm_barcode import BarcodeDecoder
+from duplicate_detection import QUICK_FIELDS, VALUE_FIELDS, DuplicateIndex, difference_hash, text_fingerprint
+from darm_extractor import DEFAULT_EXTRACTOR, EXTRACTOR_VERSION
+from ocr_confidence import ConfidentOcr
+from ocr_engines import engine_from_config
+from extraction_cache import ExtractionCache
+from guia_ledger import LOADED, GuiaLedger
+from image_preprocessing import ImagePreprocessor
+from processing_manifest import ProcessingManifest
+from pdf_text_engines import PdfTextExtractor, count_pages
+from roi_ocr import RoiOcr
+from sql_output import BatchedSqlWriter, StreamingSqlFile, existence_check_statements, read_existing_guias
+from darm_record import CD_BANCO, NR_LOTE_NSA, DarmRecord
+from sq_doc_allocator import SqDocAllocator, find_duplicate_sq_docs, iter_sq_docs_in_sql
 
 # Novas importações para OCR e processamento de imagens
 try:
@@ -13,7 +35,7 @@ try:
     from PIL import Image
     import cv2
     import numpy as np
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_path, pdfinfo_from_path
     OCR_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️  Aviso: Algumas dependências de OCR não estão instaladas: {e}")
@@ -36,9 +58,65 @@ class DarmProcessor:
         
         self.darms_dir = self.base_dir / 'darms'
         self.output_dir = self.base_dir / 'inserts'
-        self.processed_guias = set()  # Para controlar guias já processadas
-        self.guias_processadas = []  # Lista para rastrear guias processadas
-        self.all_sql_inserts = []  # Array para armazenar todos os INSERTs
+        self.guias_processadas = []  # Guias desta execução, na ordem de registro (relatório)
+        self.use_ledger = LEDGER_CONFIG.get('enabled', True)
+        self.skip_loaded = LEDGER_CONFIG.get('skip_loaded', True)
+        self.skip_generated = LEDGER_CONFIG.get('skip_generated', True)
+        self.ledger = None  # Livro de guias (SQLite), aberto no process_darms()
+        self.skipped_loaded = 0
+        self.skipped_generated = 0  # Guias geradas por outro arquivo numa execução anterior
+        self.existing_guias = set()  # Guias já no banco quando o livro está desativado
+        self.existing_guias_path = None  # Resultado da verificação passado na linha de comando
+        self.run_guias = []  # (guia, exercício) dos INSERTs desta execução, para a verificação
+        self.records = []  # DarmRecord de cada guia, quando o arquivo único não está sendo gravado em streaming
+        self.record_count = 0  # Registros gerados (no streaming, os registros não ficam em memória)
+        self.last_record = None
+        self.all_sql_inserts = []  # INSERTs carregados de arquivos já gerados (ex.: regenerate_consolidated.py)
+        self.parallel_processing = PERFORMANCE_CONFIG.get('parallel_processing', False)
+        self.max_workers = PERFORMANCE_CONFIG.get('max_workers', 1)
+        self.pdf_text = PdfTextExtractor.from_config(PDF_TEXT_CONFIG)  # Motores da camada de texto, em ordem
+        self.stop_when_fields_found = EXTRACTION_CONFIG.get('stop_when_fields_found', True)
+        self.split_multi_darm = EXTRACTION_CONFIG.get('split_multi_darm_pdfs', False)
+        self.split_chunk_pages = EXTRACTION_CONFIG.get('split_chunk_pages', 50)
+        self.split_page_workers = self.max_workers if self.parallel_processing else 1
+        self.ocr_dpi = OCR_CONFIG.get('dpi', 300)
+        # DPI adaptativo: tenta os DPI menores primeiro e só sobe se faltarem campos (o último é sempre 'dpi')
+        self.ocr_dpi_tiers = sorted({dpi for dpi in OCR_CONFIG.get('dpi_tiers', []) if dpi < self.ocr_dpi}
+                                    if OCR_CONFIG.get('adaptive_dpi', False) else set()) + [self.ocr_dpi]
+        self.last_ocr_dpi = None  # DPI que o último documento lido por OCR precisou
+        self.ocr_dpi_counts = {}  # DPI -> documentos
+        self.ocr_max_pages = OCR_CONFIG.get('max_pages', 10)
+        self.ocr_page_workers = OCR_CONFIG.get('page_workers', 1) if OCR_CONFIG.get('parallel_pages', False) else 1
+        self.ocr_lang = OCR_CONFIG.get('language', 'por')
+        self.ocr_engine = engine_from_config(OCR_CONFIG)  # tesserocr (instâncias aquecidas) ou pytesseract
+        # OCR da página por palavras: confiança de cada campo e releitura só dos campos fracos
+        self.confident_ocr = ConfidentOcr.from_config(self.ocr_engine) if OCR_CONFIG.get('field_confidence', False) else None
+        self.last_ocr_confidences = {}  # Campo -> confiança (%) no último documento lido por OCR
+        self.ocr_confidences_lock = threading.Lock()  # OCR paralelo por página
+        self.preprocessor = ImagePreprocessor.from_config(OCR_CONFIG, IMAGE_PREPROCESSING_CONFIG)
+        self.roi_ocr = RoiOcr.from_config(engine=self.ocr_engine) if ROI_OCR_CONFIG.get('enabled', False) else None  # OCR só das caixas do formulário
+        self.roi_fallback_full_page = ROI_OCR_CONFIG.get('fallback_full_page', True)
+        self.barcode = BarcodeDecoder.from_config() if BARCODE_CONFIG.get('enabled', True) else None  # Linha digitável validada
+        self.decode_barcode_images = BARCODE_CONFIG.get('decode_images', True)
+        self.use_cache = CACHE_CONFIG.get('enabled', False)
+        self.extraction_cache = None  # Criado sob demanda (a pasta de saída pode mudar após o __init__)
+        self.cache_hits = 0
+        self.incremental = PROCESSING_CONFIG.get('incremental', False)
+        self.manifest = None  # Carregado no init() quando o modo incremental está ativo
+        self.skipped_unchanged = 0
+        self.dedup = DEDUP_CONFIG.get('enabled', False)
+        self.duplicate_index = None  # Criado no process_darms() quando a detecção de duplicatas está ativa
+        self.skipped_duplicates = 0
+        self.quick_roi = None  # Caixas do formulário para conferir candidatos a cópia (criado sob demanda)
+        self.generate_individual_files = OUTPUT_CONFIG.get('generate_individual_files', True)
+        self.generate_check_files = OUTPUT_CONFIG.get('generate_check_files', True)
+        self.generate_batch_files = OUTPUT_CONFIG.get('generate_batch_files', False)
+        self.generate_single_file = OUTPUT_CONFIG.get('generate_single_file', True)
+        self.single_file_name = OUTPUT_CONFIG.get('single_file_name', 'INSERT_TODOS_DARMs.sql')
+        self.consolidated_writer = None  # Arquivo único gravado linha a linha durante o process_darms()
+        self.batch_size = PERFORMANCE_CONFIG.get('batch_size', 100)
+        self.batch_writer = None  # Aberto no process_darms() quando os arquivos de lote estão ativos
+        self.sq_doc_allocator = None  # Criado sob demanda (a sequência fica na pasta de saída)
 
     async def init(self):
         """Inicializar o processador"""
@@ -53,122 +131,151 @@ class DarmProcessor:
         # Carregar guias já processadas de arquivos existentes
         await self.load_processed_guias()
 
+        # Ordem dos padrões de extração aprendida nas execuções anteriores
+        stats_path = self.pattern_stats_path()
+        if stats_path is not None and DEFAULT_EXTRACTOR.registry.load_stats(stats_path):
+            print(f"📈 Estatísticas de padrões carregadas: {stats_path.name}")
+
+    def pattern_stats_path(self):
+        """Arquivo com as estatísticas de acerto dos padrões de extração (None se desativado)"""
+        stats_file = EXTRACTION_CONFIG.get('stats_file')
+        return self.output_dir / stats_file if stats_file else None
+
     async def load_processed_guias(self):
         """Carregar guias já processadas de arquivos existentes"""
         try:
-            # Não carregar guias processadas para permitir reprocessamento completo
-            # As guias serão processadas novamente a cada execução
-            print("🔄 Modo de reprocessamento ativado - todos os arquivos serão sobrescritos")
+            if self.incremental:
+                # Modo incremental: o manifesto diz quais arquivos já foram processados e não mudaram
+                manifest_path = self.output_dir / PROCESSING_CONFIG.get('manifest_file', '.manifest.json')
+                self.manifest = ProcessingManifest(manifest_path).load()
+                print(f"⏩ Modo incremental ativado - {len(self.manifest.entries)} arquivos no manifesto")
+            else:
+                # Não carregar guias processadas para permitir reprocessamento completo
+                # As guias serão processadas novamente a cada execução
+                print("🔄 Modo de reprocessamento ativado - todos os arquivos serão sobrescritos")
         except Exception as error:
             print(f'Erro ao carregar guias processadas: {error}')
 
-    async def check_guia_exists(self, numero_guia):
-        """Verificar se a guia já existe no banco de dados"""
-        try:
-            # Gerar SQL para verificar se a guia já existe no formato simplificado para Control-M
-            check_sql = f"""use silfae;
-SELECT COUNT(*) as total FROM FarrDarmsPagos WHERE NR_GUIA = {numero_guia} AND AA_EXERCICIO = 2025 AND CD_BANCO = 70 AND NR_BDA = 37 AND NR_COMPLEMENTO = 0 AND NR_LOTE_NSA = 730 AND TP_LOTE_D = 1;"""
+    def load_existing_guias(self, path=None):
+        """Ler o resultado da verificação de guias (guias já no banco) e marcá-las como carregadas
+
+        Sem `path`, usa o arquivo configurado na pasta de saída, se existir.
+        """
+        path = Path(path) if path else self.output_dir / OUTPUT_CONFIG.get('existing_guias_file', 'GUIAS_EXISTENTES.tsv')
+        if not path.exists():
+            return 0
+        keys = {(numero_guia, exercicio, CD_BANCO, NR_LOTE_NSA) for numero_guia, exercicio in read_existing_guias(path)}
+        if self.ledger is not None:
+            self.ledger.mark_loaded(keys)
+        else:
+            self.existing_guias |= keys
+        print(f'📥 Guias já existentes no banco ({path.name}): {len(keys)} - não terão INSERT')
+        return len(keys)
+
+    def write_existence_check(self):
+        """Gravar a verificação das guias desta execução: uma consulta por exercício, em blocos de NR_GUIA IN (...)
+
+        O resultado (NR_GUIA e AA_EXERCICIO de cada guia já existente, ex.: mysql -B -N) volta
+        para o processador pelo arquivo existing_guias_file ou por --guias-existentes.
+        """
+        check_path = self.output_dir / OUTPUT_CONFIG.get('check_file_name', 'CHECK_GUIAS_EXISTENTES.sql')
+        if not self.run_guias:
+            check_path.unlink(missing_ok=True)  # Não deixar a verificação de uma execução anterior
+            return None
 
-            check_filename = f'CHECK_GUIA_{numero_guia}.sql'
-            check_path = self.output_dir / check_filename
-            
-            # Escrever arquivo em encoding latin1
-            with open(check_path, 'w', encoding='latin1') as f:
-                f.write(check_sql)
-            
-            print(f'Arquivo de verificação criado: {check_filename}')
-            print(f'IMPORTANTE: Execute {check_filename} para verificar se a guia {numero_guia} já existe no banco')
-            
-            return False  # Assumir que não existe por segurança
-        except Exception as error:
-            print(f'Erro ao verificar guia {numero_guia}: {error}')
-            return False
+        statements = list(existence_check_statements(self.run_guias,
+                                                     chunk_size=OUTPUT_CONFIG.get('check_chunk_size', 1000),
+                                                     max_bytes=OUTPUT_CONFIG.get('max_statement_bytes')))
+        with open(check_path, 'w', encoding=PROCESSING_CONFIG.get('encoding', 'latin1')) as f:
+            f.write('use silfae;\n\n' + '\n'.join(statements) + '\n')
 
-    async def generate_single_sql_file(self):
-        """Gerar arquivo SQL único com todos os INSERTs no formato simplificado para Control-M"""
-        try:
-            if not self.all_sql_inserts:
-                print('📭 Nenhum INSERT para gerar no arquivo único.')
-                return
+        existing_file = OUTPUT_CONFIG.get('existing_guias_file', 'GUIAS_EXISTENTES.tsv')
+        print(f'🔍 Verificação de guias gerada: {check_path.name} ({len(statements)} consulta(s))')
+        print(f'   Para excluir as guias que já existem: mysql -B -N < {check_path.name} > {existing_file}'
+              f' e processe de novo')
+        return check_path.name
 
-            # Filtrar apenas INSERTs válidos
-            valid_inserts = []
-            for sql_insert in self.all_sql_inserts:
-                if sql_insert and len(sql_insert.strip()) > 50:
-                    valid_inserts.append(sql_insert)
+    async def generate_single_sql_file(self):
+        """Gerar arquivo SQL único com todos os INSERTs no formato simplificado para Control-M
 
-            if not valid_inserts:
-                print('📭 Nenhum INSERT válido encontrado para gerar o arquivo único.')
-                return
+        Durante o process_darms() as linhas já foram gravadas em streaming: aqui só
+        se finaliza o arquivo. Chamado avulso (ex.: regenerate_consolidated.py),
+        grava numa única passada a partir dos registros ou dos INSERTs carregados.
+        """
+        try:
+            writer, self.consolidated_writer = self.consolidated_writer, None
+            if writer is None:
+                if self.records:
+                    rows = (self.record_row(record) for record in self.records)
+                elif self.all_sql_inserts:
+                    rows = self.rows_from_sql_texts()
+                else:
+                    print('📭 Nenhum INSERT para gerar no arquivo único.')
+                    return
+                writer = self.open_consolidated_writer()
+                try:
+                    for row in rows:
+                        writer.add(row)
+                except BaseException:
+                    writer.abort()
+                    raise
 
-            # Gerar SQ_DOC únicos no Python
-            timestamp = int(datetime.now().timestamp() * 1000)
-            simple_insert_statements = []
-            
-            for index, sql_insert in enumerate(valid_inserts):
-                # Extrair apenas a parte VALUES do INSERT
-                values_match = re.search(r'VALUES\s*\(\s*(.+?)\s*\);', sql_insert, re.DOTALL)
-                if values_match:
-                    values_part = values_match.group(1)
-                    # Split dos valores considerando vírgulas
-                    # Atenção: isso só funciona porque todos os campos são simples (sem vírgula interna)
-                    valores = [v.strip() for v in values_part.split(',')]
-                    # O campo SQ_DOC é o 8º campo (índice 7)
-                    if index < len(self.guias_processadas):
-                        guia = self.guias_processadas[index]
-                        guia_last3 = int(guia) % 1000
-                        timestamp_last3 = timestamp % 1000
-                        sq_doc = (guia_last3 * 1000) + timestamp_last3 + index
-                        valores[7] = str(sq_doc)
-                        simple_insert_statements.append(f"({', '.join(valores)})")
-
-            if not simple_insert_statements:
+            if not writer.close():
                 print('📭 Nenhum statement válido para gerar o arquivo único.')
                 return
 
-            # Formato formatado bonito para o arquivo consolidado
-            single_sql_content = f"""use silfae;
-
-INSERT INTO FarrDarmsPagos (
-    id, AA_EXERCICIO, CD_BANCO, NR_BDA, NR_COMPLEMENTO, NR_LOTE_NSA, TP_LOTE_D, SQ_DOC,
-    CD_RECEITA, CD_USU_ALT, CD_USU_INCL, DT_ALT, DT_INCL, DT_VENCTO, DT_PAGTO,
-    NR_INSCRICAO, NR_GUIA, NR_COMPETENCIA, NR_CODIGO_BARRAS, NR_LOTE_IPTU, ST_DOC_D, TP_IMPOSTO,
-    VL_PAGO, VL_RECEITA, VL_PRINCIPAL, VL_MORA, VL_MULTA, VL_MULTAF_TCDL, VL_MULTAP_TSD, VL_INSU_TIP, VL_JUROS,
-    processado, criticaProcessamento
-) VALUES 
-    {',\n    '.join(simple_insert_statements)};"""
-
-            # Validar se o conteúdo foi gerado corretamente
-            if not single_sql_content or len(single_sql_content.strip()) < 100:
-                print('❌ Erro: Conteúdo SQL único está vazio ou muito pequeno')
-                return
-
-            single_sql_path = self.output_dir / 'INSERT_TODOS_DARMs.sql'
-            
-            # Escrever arquivo em encoding latin1
-            with open(single_sql_path, 'w', encoding='latin1') as f:
-                f.write(single_sql_content)
-            
-            print('📄 Arquivo SQL único gerado: INSERT_TODOS_DARMs.sql')
-            print(f'📊 Contém {len(simple_insert_statements)} INSERT statements')
+            print(f'📄 Arquivo SQL único gerado: {self.single_file_name}')
+            print(f'📊 Contém {writer.row_count} linhas em {writer.statement_count} INSERT statement(s)')
             print('🔧 Formato: ISO 8859-1 (Latin-1) - Compatível com Control-M')
             print('✨ Versão: Formatada bonita - Legível e organizada')
-            
-            # Mostrar SQ_DOC gerados
-            sq_docs_info = []
-            for i, guia in enumerate(self.guias_processadas[:len(simple_insert_statements)]):
-                guia_last3 = int(guia) % 1000
-                timestamp_last3 = timestamp % 1000
-                sq_doc = (guia_last3 * 1000) + timestamp_last3 + i
-                sq_docs_info.append(f'Guia {guia} = {sq_doc}')
-            print(f'🔢 SQ_DOC gerados: {", ".join(sq_docs_info)}')
-            
+            print(f'🔢 SQ_DOC gerados: {writer.row_count} (um por linha, da sequência persistente)')
+
         except Exception as error:
             print(f'❌ Erro ao gerar arquivo SQL único: {error}')
 
+    def open_consolidated_writer(self):
+        """Abrir o arquivo único para gravação em streaming (temporário até a finalização)"""
+        return StreamingSqlFile(
+            self.output_dir / self.single_file_name,
+            max_rows=OUTPUT_CONFIG.get('max_rows_per_statement'),
+            max_bytes=OUTPUT_CONFIG.get('max_statement_bytes'),
+            encoding=PROCESSING_CONFIG.get('encoding', 'latin1'),
+        )
+
+    def record_row(self, record):
+        """Linha VALUES do registro, alocando o SQ_DOC se ele ainda não tiver um"""
+        if record.sq_doc is None:
+            record.sq_doc = self.allocate_sq_doc()
+        return record.row()
+
+    def rows_from_sql_texts(self):
+        """Linhas do arquivo único a partir de INSERTs em texto (arquivos individuais carregados do disco)
+
+        Gerador de linhas "(...)", cada uma com um SQ_DOC novo. As guias vêm de
+        guias_processadas, na mesma ordem.
+        """
+        # Filtrar apenas INSERTs válidos
+        valid_inserts = [sql_insert for sql_insert in self.all_sql_inserts
+                         if sql_insert and len(sql_insert.strip()) > 50]
+
+        for index, sql_insert in enumerate(valid_inserts):
+            # Extrair apenas a parte VALUES do INSERT
+            values_match = re.search(r'VALUES\s*\(\s*(.+?)\s*\);', sql_insert, re.DOTALL)
+            if values_match and index < len(self.guias_processadas):
+                # Atenção: isso só funciona porque todos os campos são simples (sem vírgula interna)
+                valores = [v.strip() for v in values_match.group(1).split(',')]
+                # O campo SQ_DOC é o 8º campo (índice 7)
+                valores[7] = str(self.allocate_sq_doc())
+                yield f"({', '.join(valores)})"
+
     async def generate_report(self):
         """Gerar relatório de processamento"""
         try:
+            check_file = OUTPUT_CONFIG.get('check_file_name', 'CHECK_GUIAS_EXISTENTES.sql')
+            check_files = [f'- **{check_file}** - Verificação de existência de todas as guias do lote (NR_GUIA IN em blocos)']
+            if self.use_ledger:
+                check_files.append(f"- **{LEDGER_CONFIG.get('file', '.guias.sqlite3')}** - Livro de guias "
+                                   f"(geradas e já carregadas, entre execuções)")
             report_content = f"""# RELATÓRIO DE PROCESSAMENTO DE DARMs
 
 ## Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
@@ -181,14 +288,17 @@ INSERT INTO FarrDarmsPagos (
 ### Estatísticas:
 - Total de guias processadas: {len(self.guias_processadas)}
 - Guias únicas: {len(set(self.guias_processadas))}
-- Arquivos SQL individuais gerados: {len(self.guias_processadas)}
+- Arquivos SQL individuais gerados: {len(self.guias_processadas) if self.generate_individual_files else 0}
+- Guias já carregadas no banco (INSERT não gerado): {self.skipped_loaded}
+- Guias já geradas em execuções anteriores (INSERT não gerado): {self.skipped_generated}
 - Arquivo SQL único gerado: 1
 - Arquivo SQL alternativo gerado: 1
 
 ### Arquivos Gerados:
 - **INSERT_TODOS_DARMs.sql** - Script único com INSERT IGNORE (proteção automática contra duplicatas)
 - **INSERT_DARM_PAGO_*.sql** - Arquivos individuais para cada guia
-- **CHECK_GUIA_*.sql** - Arquivos de verificação para cada guia
+{chr(10).join(check_files)}
+- **INSERT_DARMS_LOTE_*.sql / CHECK_GUIAS_LOTE_*.sql** - INSERTs e verificações em lote (se `generate_batch_files` estiver ativo)
 - **RELATORIO_PROCESSAMENTO.md** - Este relatório
 
 ### Compatibilidade Control-M:
@@ -208,14 +318,14 @@ INSERT INTO FarrDarmsPagos (
 ### Verificações de Segurança:
 - ✅ Controle de duplicatas por sessão
 - ✅ Verificação de arquivos SQL existentes
-- ✅ Geração de arquivos de verificação para cada guia
-- ✅ SQ_DOC único baseado em guia + timestamp
+- ✅ Verificação de existência em uma consulta por lote (resultado lido de volta pelo processador)
+- ✅ SQ_DOC único alocado de uma sequência persistente (sem colisão entre execuções)
 - ✅ Script único com transação para consistência
 - ✅ INSERT IGNORE (proteção automática contra duplicatas)
 
 ### Próximos Passos:
 1. **Opção 1 (Recomendada)**: Execute o arquivo **INSERT_TODOS_DARMs.sql** para inserir todos os registros de uma vez
-2. **Opção 2**: Execute os arquivos CHECK_GUIA_*.sql para verificar se as guias já existem no banco
+2. **Opção 2**: Execute {check_file} (`mysql -B -N < {check_file} > {OUTPUT_CONFIG.get('existing_guias_file', 'GUIAS_EXISTENTES.tsv')}`) e processe de novo: as guias que já existem no banco saem dos INSERTs
 3. **Opção 3**: Execute os arquivos INSERT_DARM_PAGO_*.sql individualmente se preferir
 
 ### Vantagens do Script Único:
@@ -245,7 +355,7 @@ Gerado automaticamente pelo DarmProcessor (Python)
             print('\n🔍 Verificando arquivos SQL gerados...')
             
             # Verificar arquivo único
-            single_sql_path = self.output_dir / 'INSERT_TODOS_DARMs.sql'
+            single_sql_path = self.output_dir / self.single_file_name
             if single_sql_path.exists():
                 with open(single_sql_path, 'r', encoding='latin1') as f:
                     content = f.read()
@@ -273,8 +383,27 @@ Gerado automaticamente pelo DarmProcessor (Python)
             print(f'📊 Arquivos individuais válidos: {valid_files}/{len(individual_files)}')
             
             # Verificar arquivos de verificação
-            check_files = list(self.output_dir.glob('CHECK_GUIA_*.sql'))
-            print(f'📊 Arquivos de verificação gerados: {len(check_files)}')
+            check_path = self.output_dir / OUTPUT_CONFIG.get('check_file_name', 'CHECK_GUIAS_EXISTENTES.sql')
+            print(f'📊 Verificação de guias gerada: {"sim" if check_path.exists() else "não"}')
+
+            # Verificar arquivos de lote
+            batch_files = []
+            if self.generate_batch_files:
+                batch_prefix = OUTPUT_CONFIG.get('batch_file_pattern', 'INSERT_DARMS_LOTE_{n:03d}.sql').split('{', 1)[0]
+                batch_files = sorted(self.output_dir.glob(f'{batch_prefix}*.sql'))
+                print(f'📊 Arquivos de lote gerados: {len(batch_files)}')
+
+            # Verificar unicidade dos SQ_DOC (arquivo único e lotes são alternativas: conferir cada um)
+            for sql_files in ([single_sql_path], batch_files):
+                sql_files = [f for f in sql_files if f.exists()]
+                if not sql_files:
+                    continue
+                sq_docs = (sq_doc for f in sql_files for sq_doc in iter_sq_docs_in_sql(f))
+                duplicates = find_duplicate_sq_docs(sq_docs, SQ_DOC_CONFIG.get('max_value', 999999))
+                if duplicates:
+                    print(f'❌ SQ_DOC duplicados em {sql_files[0].name}...: {duplicates[:10]}')
+                else:
+                    print(f'✅ SQ_DOC únicos em {", ".join(f.name for f in sql_files)}')
             
         except Exception as error:
             print(f'❌ Erro ao verificar arquivos SQL: {error}')
@@ -291,8 +420,8 @@ Gerado automaticamente pelo DarmProcessor (Python)
 
             # Listar todos os arquivos suportados no diretório darms
             supported_extensions = ['.pdf', '.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif']
-            all_files = [f for f in self.darms_dir.iterdir() 
-                        if f.suffix.lower() in supported_extensions]
+            all_files = sorted((f for f in self.darms_dir.iterdir()
+                                if f.suffix.lower() in supported_extensions), key=lambda f: f.name)
 
             if not all_files:
                 print('📭 Nenhum arquivo suportado encontrado no diretório darms.')
@@ -308,155 +437,735 @@ Gerado automaticamente pelo DarmProcessor (Python)
             print(f'📄 PDFs encontrados: {len(pdf_files)}')
             print(f'🖼️  Imagens encontradas: {len(image_files)}')
 
-            # Processar cada arquivo PDF
-            for pdf_file in pdf_files:
-                await self.process_file(pdf_file, 'pdf')
+            # PDFs primeiro, depois imagens - mesma ordem nos modos sequencial e paralelo
+            files_to_process = [(f, 'pdf') for f in pdf_files] + [(f, 'image') for f in image_files]
+
+            # Modo incremental: arquivos inalterados vêm do manifesto, sem nova extração
+            unchanged = {}
+            if self.manifest is not None:
+                removed = self.manifest.prune(f.name for f in all_files)
+                if removed:
+                    print(f'🗑️  {len(removed)} arquivo(s) removido(s) do manifesto')
+                unchanged = self.find_unchanged_files(files_to_process)
+                print(f'⏩ Arquivos inalterados (pulados): {len(unchanged)}')
+
+            if self.dedup:
+                # Cópias do mesmo DARM (reescaneamento, foto): detectadas antes do OCR pelo hash da imagem
+                self.duplicate_index = DuplicateIndex(hash_bits=DEDUP_CONFIG.get('hash_size', 16) ** 2,
+                                                      max_distance=DEDUP_CONFIG.get('max_hash_distance', 8))
+                files_to_process = self.skip_duplicate_images(files_to_process, unchanged)
+
+            if self.use_ledger:
+                self.open_ledger()
+            # Resultado da verificação da execução anterior: guias já no banco não geram INSERT
+            self.load_existing_guias(self.existing_guias_path)
+
+            if self.generate_batch_files:
+                self.open_batch_writer()
+            if self.generate_single_file:
+                # Linhas gravadas à medida que cada documento termina: memória constante
+                self.consolidated_writer = self.open_consolidated_writer()
+
+            pending = len(files_to_process) - len(unchanged)
+            if self.parallel_processing and self.max_workers > 1 and pending > 1:
+                await self.process_files_in_parallel(files_to_process, unchanged)
+            else:
+                for filepath, file_type in files_to_process:
+                    if filepath in unchanged:
+                        self.restore_from_manifest(unchanged[filepath], filepath.name)
+                    else:
+                        await self.process_file(filepath, file_type)
+
+            if self.batch_writer is not None:
+                self.close_batch_writer()
 
-            # Processar cada arquivo de imagem
-            for image_file in image_files:
-                await self.process_file(image_file, 'image')
+            # Finalizar arquivo SQL único
+            if self.generate_single_file:
+                await self.generate_single_sql_file()
 
-            # Verificar arquivos SQL gerados
+            # Uma verificação de existência para o lote todo (em lote, cada arquivo tem a sua)
+            if self.generate_check_files and not self.generate_batch_files:
+                self.write_existence_check()
+
+            # Verificar arquivos SQL gerados (depois do arquivo único, para conferir os SQ_DOC desta execução)
             await self.verify_sql_files()
 
             # Gerar relatório final
             await self.generate_report()
-            
-            # Gerar arquivo SQL único
-            await self.generate_single_sql_file()
 
             print('✅ Processamento concluído!')
             print(f'📊 Total de guias processadas: {len(self.guias_processadas)}')
+            if self.use_cache:
+                print(f'⚡ Extrações reaproveitadas do cache: {self.cache_hits}/{len(files_to_process)}')
+            if self.manifest is not None:
+                print(f'⏩ Arquivos inalterados reaproveitados do manifesto: {self.skipped_unchanged}')
+            if self.duplicate_index is not None:
+                self.report_duplicates()
+            if self.ledger is not None:
+                print(f'📒 Livro de guias: {self.ledger.count()} guia(s), {self.ledger.count(LOADED)} já carregada(s); '
+                      f'INSERTs não gerados nesta execução: {self.skipped_loaded} de guias carregadas, '
+                      f'{self.skipped_generated} de guias já geradas')
+            if self.ocr_dpi_counts:
+                tiers = ', '.join(f'{dpi} DPI: {count}' for dpi, count in sorted(self.ocr_dpi_counts.items()))
+                print(f'🔍 Documentos por DPI do OCR: {tiers}')
+            stage_times = self.preprocessor.timing_report()
+            if stage_times:
+                print(f'⏱️  Pré-processamento (média por imagem): {ImagePreprocessor.format_timings(stage_times)}')
 
         except Exception as error:
             print(f'❌ Erro durante o processamento: {error}')
+        finally:
+            if self.batch_writer is not None:
+                self.close_batch_writer()
+            if self.consolidated_writer is not None:
+                # Processamento interrompido: manter o arquivo único anterior
+                self.consolidated_writer.abort()
+                self.consolidated_writer = None
+            if self.sq_doc_allocator is not None:
+                self.sq_doc_allocator.release()
+                self.sq_doc_allocator = None
+            if self.ledger is not None:
+                self.ledger.close()
+                self.ledger = None
+            if self.extraction_cache is not None:
+                self.extraction_cache.close()
+                self.extraction_cache = None
+            if self.manifest is not None:
+                self.manifest.save()
+            stats_path = self.pattern_stats_path()
+            if stats_path is not None:
+                DEFAULT_EXTRACTOR.registry.save_stats(stats_path)
+
+    def find_unchanged_files(self, files_to_process):
+        """Mapear os arquivos inalterados desde a última execução para a sua entrada no manifesto"""
+        unchanged = {}
+        for filepath, _ in files_to_process:
+            entry = self.manifest.lookup(filepath)
+            if entry is None:
+                continue
+            # Se o SQL individual foi apagado, reprocessar para gerá-lo de novo
+            if any(document['output_file'] and not (self.output_dir / document['output_file']).exists()
+                   for document in ProcessingManifest.documents(entry)):
+                continue
+            unchanged[filepath] = entry
+        return unchanged
+
+    def restore_from_manifest(self, entry, name=None):
+        """Incluir no lote os dados de um arquivo inalterado, sem reextrair nem reescrever arquivos"""
+        self.skipped_unchanged += 1
+        documents = ProcessingManifest.documents(entry)
+        for number, document in enumerate(documents, start=1):
+            self.restore_document(document, self.document_name(name, number, 'documents' in entry), name)
+
+    def restore_document(self, entry, name=None, source_file=None):
+        """Incluir no lote um DARM registrado no manifesto (source_file: arquivo de origem, se name for arquivo#n)"""
+        darm_data = entry.get('darm_data')
+        if not darm_data or self.is_duplicate_document(name, darm_data):
+            return
+
+        source_file = source_file or name
+        record = self.build_record(darm_data)
+        if record is not None and self.check_ledger(record, source_file):
+            # Mesmo SQ_DOC da execução anterior: o arquivo não mudou
+            record.sq_doc = entry.get('sq_doc') or self.allocate_sq_doc()
+            self.guias_processadas.append(darm_data.get('numeroGuia') or 'SEM_GUIA')
+            self.emit_record(record)
+            self.record_in_ledger(record, source_file, entry.get('output_file'))
+
+    def open_ledger(self):
+        """Abrir o livro de guias (SQLite na pasta de saída) e iniciar uma execução nele"""
+        self.ledger = GuiaLedger(self.output_dir / LEDGER_CONFIG.get('file', '.guias.sqlite3'))
+        self.ledger.start_run()
+        print(f'📒 Livro de guias: {self.ledger.count()} guia(s) de execuções anteriores')
+
+    def check_ledger(self, record, source_file=None):
+        """Consultar o livro antes de gerar o INSERT; False se a guia não deve ser gerada de novo
+
+        Guias já carregadas no banco (skip_loaded) e guias geradas por outro arquivo numa
+        execução anterior (skip_generated) são puladas. O mesmo arquivo lido de novo
+        continua gerando a sua guia: a saída da execução é a mesma.
+        """
+        if self.skip_loaded and record.key() in self.existing_guias:
+            print(f'⏭️  Guia {record.numero_guia}/{record.exercicio} já carregada no banco: INSERT não gerado')
+            self.skipped_loaded += 1
+            return False
+        entry = self.ledger.lookup(record.key()) if self.ledger is not None else None
+        if entry is None:
+            return True
+        if entry['status'] == LOADED and self.skip_loaded:
+            print(f'⏭️  Guia {record.numero_guia}/{record.exercicio} já carregada no banco: INSERT não gerado')
+            self.skipped_loaded += 1
+            return False
+        if entry['run_id'] == self.ledger.run_id:
+            print(f'🔄 Reprocessando guia {record.numero_guia} (já processada nesta sessão: {entry["source_file"]})')
+        elif (self.skip_generated and source_file is not None
+              and re.sub(r'#\d+$', '', entry['source_file'] or '') != source_file):
+            # Livros antigos guardam arquivo#n para os DARMs de um PDF consolidado
+            print(f'⏭️  Guia {record.numero_guia} já gerada em {entry["updated_at"]} ({entry["source_file"]}): '
+                  f'INSERT não gerado')
+            self.skipped_generated += 1
+            return False
+        else:
+            print(f'ℹ️  Guia {record.numero_guia} já gerada em {entry["updated_at"]} ({entry["source_file"]})')
+        return True
+
+    def record_in_ledger(self, record, source_file, output_file):
+        """Registrar no livro a guia cujo INSERT foi gerado"""
+        if self.ledger is not None:
+            self.ledger.record(record, source_file, output_file)
+
+    @staticmethod
+    def document_name(name, number, consolidated):
+        """Nome de um DARM no relatório de duplicatas (arquivo, ou arquivo#n num PDF consolidado)"""
+        return f'{name}#{number}' if consolidated and name else name
+
+    def skip_duplicate_images(self, files_to_process, unchanged):
+        """Tirar da lista as cópias de arquivos anteriores: a imagem aponta o candidato, os campos confirmam
+
+        DARMs diferentes do mesmo formulário têm o mesmo hash perceptual; o arquivo só é pulado se
+        inscrição, guia e valor (camada de texto ou caixas do formulário) forem iguais aos do candidato.
+        """
+        if not OCR_AVAILABLE:
+            print('⚠️  Hash das imagens indisponível (pdf2image/opencv): duplicatas só pelos dados extraídos')
+            return files_to_process
+
+        pending = [(filepath, file_type) for filepath, file_type in files_to_process if filepath not in unchanged]
+        workers = max(1, min(self.max_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hashes = dict(zip((filepath for filepath, _ in pending),
+                              executor.map(lambda item: self.image_hash(*item), pending)))
+
+        files = {filepath.name: (filepath, file_type) for filepath, file_type in pending}
+        quick_keys = {}  # Nome -> impressão digital rápida (cada arquivo é lido no máximo uma vez)
+
+        def quick_key(name):
+            if name not in quick_keys:
+                quick_keys[name] = self.quick_fingerprint(*files[name])
+            return quick_keys[name]
+
+        kept = []
+        for filepath, file_type in files_to_process:
+            image_hash = hashes.get(filepath)
+            candidates = self.duplicate_index.image_candidates(image_hash) if image_hash is not None else []
+            match = None
+            if candidates and quick_key(filepath.name) is not None:
+                match = next(((original, distance) for original, distance in candidates
+                              if quick_key(original) == quick_key(filepath.name)), None)
+            if match is None:
+                if image_hash is not None:
+                    self.duplicate_index.add_image(filepath.name, image_hash)
+                kept.append((filepath, file_type))
+                continue
+            original = self.duplicate_index.mark_duplicate(filepath.name, match[0], 'imagem', match[1])
+            print(f'♻️  {filepath.name}: cópia de {original} (imagem, mesma guia e valor) - extração pulada')
+            self.skipped_duplicates += 1
+        return kept
+
+    def quick_fingerprint(self, filepath, file_type):
+        """Inscrição, guia e valor lidos do jeito mais barato: camada de texto da página 1 ou caixas do formulário"""
+        try:
+            data = {}
+            if file_type == 'pdf':
+                text, _ = self.pdf_text.extract(filepath, max_pages=1)
+                data = DEFAULT_EXTRACTOR.extract_fields(text, verbose=False, record=False) if text.strip() else {}
+            if not DEFAULT_EXTRACTOR.has_required_data(data):
+                data = self.read_quick_fields(filepath, file_type)
+            return text_fingerprint(data, QUICK_FIELDS)
+        except Exception as error:
+            print(f'⚠️  Erro na conferência rápida de {filepath.name}: {error}')
+            return None
 
-    async def process_file(self, filepath, file_type):
-        """Processar um arquivo específico (PDF ou imagem)"""
+    def read_quick_fields(self, filepath, file_type):
+        """OCR só das caixas de inscrição, guia e valor do modelo ROI, na primeira página (no menor DPI)"""
+        if file_type == 'pdf':
+            image = np.asarray(self.rasterize_pdf_page(filepath, 1, self.ocr_dpi_tiers[0]))
+        else:
+            image = cv2.imread(str(filepath), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                return {}
+        if self.quick_roi is None:
+            self.quick_roi = self.roi_ocr or RoiOcr.from_config(engine=self.ocr_engine)
+        skip = set(self.quick_roi.template) - set(QUICK_FIELDS + VALUE_FIELDS)
+        values = self.quick_roi.read_fields(self.preprocess_image_for_ocr(image, rasterized=file_type == 'pdf'),
+                                            skip=skip)
+        return DEFAULT_EXTRACTOR.extract_fields(RoiOcr.render(values), verbose=False, record=False)
+
+    def image_hash(self, filepath, file_type):
+        """Hash perceptual da primeira página em baixa resolução (None se não renderizar)"""
         try:
-            print(f'🔄 Processando {file_type.upper()}: {filepath.name}')
-            
-            # Extrair texto baseado no tipo de arquivo
             if file_type == 'pdf':
-                text = await self.extract_text_from_pdf(filepath)
-            elif file_type == 'image':
-                text = await self.extract_text_from_image(filepath)
+                page = convert_from_path(filepath, dpi=DEDUP_CONFIG.get('hash_dpi', 24), first_page=1, last_page=1,
+                                         grayscale=True)[0]
+                image = np.asarray(page)
             else:
-                print(f'❌ Tipo de arquivo não suportado: {file_type}')
-                return
-            
-            # Debug: mostrar primeiras linhas do texto extraído
-            print('=== TEXTO EXTRAÍDO ===')
-            print(text[:500] + '...' if len(text) > 500 else text)
-            print('==============================')
+                image = cv2.imread(str(filepath), cv2.IMREAD_REDUCED_GRAYSCALE_8)  # Decodificada já reduzida
+            if image is None or image.size == 0:
+                return None
+            return difference_hash(image, DEDUP_CONFIG.get('hash_size', 16))
+        except Exception as error:
+            print(f'⚠️  Erro ao calcular o hash da imagem de {filepath.name}: {error}')
+            return None
 
-            # Extrair dados do DARM
-            darm_data = self.extract_darm_data(text)
-            
-            if darm_data:
-                print('✅ Dados extraídos:', darm_data)
-                
-                # Verificar se a guia já foi processada nesta sessão
-                if darm_data['numeroGuia'] in self.processed_guias:
-                    print(f'🔄 Reprocessando guia {darm_data["numeroGuia"]} (já processada nesta sessão)')
-                
-                # Verificar se já existe um arquivo SQL para esta guia
-                numero_guia = darm_data.get('numeroGuia', 'SEM_GUIA')
-                sql_filename = f'INSERT_DARM_PAGO_{numero_guia}.sql'
-                sql_path = self.output_dir / sql_filename
-                
-                # Sempre sobrescrever arquivos existentes
-                if sql_path.exists():
-                    print(f'🔄 Sobrescrevendo arquivo existente para guia {numero_guia}')
-                
-                # Verificar se a guia já existe no banco de dados
-                await self.check_guia_exists(darm_data['numeroGuia'])
-                
-                # Adicionar guia ao controle de processadas
-                self.processed_guias.add(darm_data['numeroGuia'])
-                self.guias_processadas.append(darm_data['numeroGuia'])
-                
-                sql_content = self.generate_sql_insert(darm_data)
-                
-                # Verificar se o SQL foi gerado corretamente
-                if sql_content and len(sql_content.strip()) > 50:
-                    # Escrever arquivo em encoding latin1
-                    with open(sql_path, 'w', encoding='latin1') as f:
-                        f.write(sql_content)
-                    
-                    # Armazenar o INSERT para o arquivo único
-                    self.all_sql_inserts.append(sql_content)
-                    
-                    print(f'✅ Arquivo SQL gerado: {sql_filename}')
-                    print(f'📊 Guias processadas até agora: {len(self.guias_processadas)}')
-                else:
-                    print(f'❌ Erro: SQL não foi gerado corretamente para guia {numero_guia}')
-                    # Remover a guia da lista de processadas se o SQL falhou
-                    if darm_data['numeroGuia'] in self.processed_guias:
-                        self.processed_guias.remove(darm_data['numeroGuia'])
-                    if darm_data['numeroGuia'] in self.guias_processadas:
-                        self.guias_processadas.remove(darm_data['numeroGuia'])
-            else:
-                print(f'❌ Não foi possível extrair dados do arquivo: {filepath.name}')
+    def is_duplicate_document(self, name, darm_data):
+        """O DARM tem os mesmos campos de um já registrado em outro arquivo? (não gera INSERT)"""
+        if self.duplicate_index is None or not darm_data:
+            return False
+        original = self.duplicate_index.add_text(name, text_fingerprint(darm_data))
+        if original is None:
+            return False
+        print(f'♻️  {name}: mesmo DARM de {original} (guia {darm_data.get("numeroGuia")}) - INSERT não gerado')
+        self.skipped_duplicates += 1
+        return True
+
+    def report_duplicates(self):
+        """Mostrar e gravar os grupos de duplicatas encontrados"""
+        groups = self.duplicate_index.groups()
+        print(f'♻️  Duplicatas puladas: {self.skipped_duplicates} em {len(groups)} grupo(s)')
+        for original, copies in groups.items():
+            print(f'   {original}: {", ".join(copy["file"] for copy in copies)}')
+        report_path = self.output_dir / DEDUP_CONFIG.get('report_file', 'DUPLICATAS.json')
+        self.duplicate_index.save_report(report_path)
+        print(f'📋 Grupos de duplicatas gravados em: {report_path.name}')
+
+    def open_batch_writer(self):
+        """Abrir o writer dos arquivos de lote (INSERTs de várias linhas em poucos arquivos)"""
+        self.batch_writer = BatchedSqlWriter(
+            self.output_dir,
+            batch_size=self.batch_size,
+            rows_per_file=OUTPUT_CONFIG.get('batch_file_rows', 5000),
+            write_checks=self.generate_check_files,
+            max_statement_bytes=OUTPUT_CONFIG.get('max_statement_bytes'),
+            check_chunk_size=OUTPUT_CONFIG.get('check_chunk_size', 1000),
+            insert_pattern=OUTPUT_CONFIG.get('batch_file_pattern', 'INSERT_DARMS_LOTE_{n:03d}.sql'),
+            check_pattern=OUTPUT_CONFIG.get('batch_check_file_pattern', 'CHECK_GUIAS_LOTE_{n:03d}.sql'),
+            encoding=PROCESSING_CONFIG.get('encoding', 'latin1'),
+        )
+        self.batch_writer.remove_previous_files()
+        print(f'📦 Arquivos de lote ativados: {self.batch_size} linhas por INSERT')
+
+    def close_batch_writer(self):
+        """Gravar as linhas pendentes e fechar os arquivos de lote"""
+        writer, self.batch_writer = self.batch_writer, None
+        files = writer.close()
+        print(f'📦 Arquivos de lote gerados: {len(files)} ({writer.total_rows} linhas)')
+
+    def emit_record(self, record):
+        """Enviar o registro para o arquivo único (em streaming ou em memória) e para o lote"""
+        self.record_count += 1
+        self.last_record = record
+        if record.numero_guia:
+            self.run_guias.append((record.numero_guia, record.exercicio))
+        if self.consolidated_writer is not None:
+            self.consolidated_writer.add(record.row())
+        else:
+            self.records.append(record)
+        self.add_to_batch(record)
+
+    def add_to_batch(self, record):
+        """Acrescentar a linha do DARM ao arquivo de lote (se ativo)"""
+        if self.batch_writer is None:
+            return
+        self.batch_writer.add(record.row(), record.numero_guia, record.exercicio)
+
+    def get_sq_doc_allocator(self):
+        """Obter o alocador de SQ_DOC (sequência persistente na pasta de saída)"""
+        if self.sq_doc_allocator is None:
+            self.sq_doc_allocator = SqDocAllocator(
+                self.output_dir / SQ_DOC_CONFIG.get('sequence_file', '.sq_doc_sequence'),
+                start=SQ_DOC_CONFIG.get('start', 1),
+                max_value=SQ_DOC_CONFIG.get('max_value', 999999),
+                block_size=SQ_DOC_CONFIG.get('block_size', 1000),
+            )
+        return self.sq_doc_allocator
+
+    def allocate_sq_doc(self):
+        """Próximo SQ_DOC livre (único entre execuções e entre processos simultâneos)"""
+        return self.get_sq_doc_allocator().next()
+
+    async def process_files_in_parallel(self, files_to_process, unchanged=None):
+        """Extrair os arquivos num pool de processos e registrar os resultados na ordem original"""
+        unchanged = unchanged or {}
+        workers = min(self.max_workers, len(files_to_process) - len(unchanged))
+        print(f'⚡ Processamento paralelo ativado: {workers} workers')
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_extraction_worker,
+                                 initargs=(self.output_dir, self.worker_settings())) as executor:
+            futures = [None if filepath in unchanged else
+                       loop.run_in_executor(executor, _extract_file_worker, filepath, file_type)
+                       for filepath, file_type in files_to_process]
+
+            # Aguardar na ordem de submissão: o registro (SQL, guias) fica determinístico
+            for (filepath, file_type), future in zip(files_to_process, futures):
+                if future is None:
+                    self.restore_from_manifest(unchanged[filepath], filepath.name)
+                    continue
+                try:
+                    result = await future
+                    if result is not None:
+                        # Acertos dos padrões no worker: somar ao registro deste processo
+                        DEFAULT_EXTRACTOR.registry.merge_stats(result.pop('pattern_stats', {}))
+                        await self.register_extraction_result(filepath, result)
+                except Exception as error:
+                    print(f'❌ Erro ao processar {filepath.name}: {error}')
+
+    def worker_settings(self, **overrides):
+        """Ajustes desta execução repassados aos workers (cada worker cria o próprio DarmProcessor)"""
+        settings = {name: getattr(self, name) for name in WORKER_SETTINGS}
+        settings.update(overrides)
+        return settings
 
+    async def process_file(self, filepath, file_type):
+        """Processar um arquivo específico (PDF ou imagem)"""
+        try:
+            result = await self.extract_file(filepath, file_type)
+            if result is not None:
+                await self.register_extraction_result(filepath, result)
         except Exception as error:
             print(f'❌ Erro ao processar {filepath.name}: {error}')
 
+    async def extract_file(self, filepath, file_type):
+        """Extrair texto e dados do DARM de um arquivo (etapa pesada, executável em outro processo)"""
+        print(f'🔄 Processando {file_type.upper()}: {filepath.name}')
+
+        if file_type not in ('pdf', 'image'):
+            print(f'❌ Tipo de arquivo não suportado: {file_type}')
+            return None
+
+        # Arquivo com o mesmo conteúdo já extraído antes: pular PyPDF2/Tesseract
+        cache = self.get_extraction_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key_for(filepath, file_type)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print(f'⚡ Extração reaproveitada do cache: {filepath.name}')
+                cached['from_cache'] = True
+                return cached
+
+        if file_type == 'pdf' and self.split_multi_darm:
+            # PDF consolidado do banco: um registro por DARM encontrado nas páginas
+            result = await self.extract_consolidated_pdf(filepath)
+        else:
+            result = await self.extract_single_document(filepath, file_type)
+
+        # Falhas de extração (texto vazio) não vão para o cache: podem ser transitórias
+        if cache is not None and result['text'].strip():
+            cache.put(cache_key, result)
+
+        return result
+
+    async def extract_single_document(self, filepath, file_type):
+        """Extrair o texto e os dados de um arquivo com um único DARM"""
+        # Extrair texto baseado no tipo de arquivo
+        text_source = None
+        if file_type == 'pdf':
+            text, text_source = await self.read_pdf_text(filepath)
+        else:
+            text = await self.extract_text_from_image(filepath)
+
+        # Debug: mostrar primeiras linhas do texto extraído
+        print('=== TEXTO EXTRAÍDO ===')
+        print(text[:500] + '...' if len(text) > 500 else text)
+        print('==============================')
+
+        # Extrair dados do DARM
+        darm_data = self.extract_darm_data(text)
+
+        # Texto de um motor rápido sem guia, receita e valor bem formados: tentar os motores
+        # seguintes (até o PyPDF2); o texto só é trocado se o do próximo motor for melhor
+        fallback_engines = self.pdf_text.fallback_engines(text_source) if text_source else []
+        while fallback_engines and not DEFAULT_EXTRACTOR.has_well_formed_data(darm_data):
+            print(f'🔄 Dados ausentes ou malformados no texto do {text_source}; tentando {fallback_engines[0].name}')
+            fallback_text, fallback_source = self.pdf_text.extract(filepath, engines=fallback_engines,
+                                                                   stop_when=self.page_stop_condition())
+            if fallback_source is None:
+                break
+            fallback_data = self.extract_darm_data(fallback_text)
+            if fallback_data and (not darm_data or DEFAULT_EXTRACTOR.has_well_formed_data(fallback_data)):
+                text, darm_data, text_source = fallback_text, fallback_data, fallback_source
+            fallback_engines = self.pdf_text.fallback_engines(fallback_source)
+
+        if not darm_data:
+            print(f'❌ Não foi possível extrair dados do arquivo: {filepath.name}')
+
+        result = {'text': text, 'darm_data': darm_data}
+        if text_source == 'ocr' and self.last_ocr_dpi is not None:
+            result['ocr_dpi'] = self.last_ocr_dpi  # DPI que o documento precisou
+        if (text_source == 'ocr' or file_type == 'image') and darm_data:
+            confidences = {field: confidence for field, confidence in self.last_ocr_confidences.items()
+                           if field in darm_data}
+            if confidences:
+                result['ocr_confidence'] = confidences  # Confiança (%) de cada campo lido por OCR
+                weak = [field for field, confidence in confidences.items()
+                        if confidence < self.confident_ocr.threshold]
+                if weak:
+                    print(f'⚠️  Campos com baixa confiança no OCR: {", ".join(weak)}')
+        return result
+
+    async def extract_consolidated_pdf(self, filepath):
+        """Extrair todos os DARMs de um PDF consolidado (em geral um por página)"""
+        pages = await self.read_pdf_pages(filepath)
+        text = ''.join(pages)
+
+        print('=== TEXTO EXTRAÍDO ===')
+        print(text[:500] + '...' if len(text) > 500 else text)
+        print('==============================')
+
+        documents = [darm_data for darm_data in map(self.extract_darm_data, DEFAULT_EXTRACTOR.split_documents(pages))
+                     if darm_data]
+        if documents:
+            print(f'📑 {len(documents)} DARM(s) encontrado(s) em {len(pages)} página(s): {filepath.name}')
+        else:
+            print(f'❌ Não foi possível extrair dados do arquivo: {filepath.name}')
+
+        return {'text': text, 'darm_data': documents[0] if documents else None, 'documents': documents}
+
+    async def read_pdf_pages(self, filepath):
+        """Texto de todas as páginas do PDF; blocos de páginas lidos em paralelo no pool de processos"""
+        page_count = count_pages(filepath)
+        chunk = self.split_chunk_pages
+        ranges = [(first, min(chunk, page_count - first + 1)) for first in range(1, page_count + 1, chunk)]
+
+        workers = min(self.split_page_workers, len(ranges))
+        if workers > 1:
+            print(f'⚡ Leitura paralela do PDF consolidado: {len(ranges)} blocos de até {chunk} páginas, {workers} workers')
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_extraction_worker,
+                                     initargs=(self.output_dir, self.worker_settings(use_cache=False))) as executor:
+                chunks = await asyncio.gather(*(loop.run_in_executor(executor, _read_pages_worker, filepath, first, count)
+                                                for first, count in ranges))
+        else:
+            chunks = [self.read_pdf_page_range(filepath, first, count) for first, count in ranges]
+
+        return [page_text for chunk_pages in chunks for page_text in chunk_pages]
+
+    def read_pdf_page_range(self, filepath, first_page, page_count):
+        """Texto de um intervalo de páginas: camada de texto e, nas páginas sem texto, OCR"""
+        pages, _ = self.pdf_text.extract_pages(filepath, page_count, first_page)
+        if not pages:
+            pages = [''] * page_count
+
+        missing = [index for index, page_text in enumerate(pages) if not page_text.strip()]
+        if missing and OCR_AVAILABLE:
+            last_page = first_page + page_count - 1
+            for index in missing:
+                pages[index] = self.ocr_pdf_page(filepath, first_page + index, last_page)
+        return pages
+
+    def get_extraction_cache(self):
+        """Obter o cache de extração (None se desativado)"""
+        if not self.use_cache:
+            return None
+        if self.extraction_cache is None:
+            self.extraction_cache = ExtractionCache(
+                self.output_dir / CACHE_CONFIG.get('directory', '.cache'),
+                max_size_mb=CACHE_CONFIG.get('max_size_mb', 256),
+                settings={'ocr': OCR_CONFIG, 'ocr_engine': self.ocr_engine.name,
+                          'preprocessing': IMAGE_PREPROCESSING_CONFIG,
+                          'roi_ocr': self.roi_ocr.template if self.roi_ocr is not None else None,
+                          'barcode': BARCODE_CONFIG,
+                          'extractor': EXTRACTOR_VERSION, 'pdf_text': self.pdf_text.names,
+                          'stop_when_fields_found': self.stop_when_fields_found,
+                          'split_multi_darm_pdfs': self.split_multi_darm,
+                          'patterns': DEFAULT_EXTRACTOR.registry.definition()},
+            )
+        return self.extraction_cache
+
+    async def register_extraction_result(self, filepath, result):
+        """Registrar o resultado da extração de um arquivo"""
+        if result.get('from_cache'):
+            self.cache_hits += 1
+        if result.get('ocr_dpi'):
+            self.ocr_dpi_counts[result['ocr_dpi']] = self.ocr_dpi_counts.get(result['ocr_dpi'], 0) + 1
+
+        # PDF consolidado: vários DARMs, registrados na ordem das páginas
+        documents = result['documents'] if 'documents' in result else [result['darm_data']]
+        registered = []
+        failed = 0
+        for number, darm_data in enumerate(documents, start=1):
+            name = self.document_name(filepath.name, number, 'documents' in result)
+            if self.is_duplicate_document(name, darm_data):
+                registered.append({'darm_data': darm_data, 'output_file': None, 'sq_doc': None})
+                continue
+            records_before = self.record_count
+            try:
+                output_file = await self.register_darm_data(filepath, darm_data)
+            except Exception as error:
+                # Um DARM com problema não derruba os demais do mesmo PDF
+                print(f'❌ Erro ao registrar {name}: {error}')
+                failed += 1
+                continue
+            sq_doc = self.last_record.sq_doc if self.record_count > records_before else None
+            registered.append({'darm_data': darm_data, 'output_file': output_file, 'sq_doc': sq_doc})
+
+        if failed:
+            # Arquivo fica fora do manifesto: a próxima execução tenta de novo
+            print(f'⚠️  {failed} DARM(s) de {filepath.name} não registrado(s)')
+            return
+
+        # Texto vazio pode ser falha transitória (ex.: OCR indisponível): não marcar como processado
+        if self.manifest is not None and result['text'].strip():
+            if 'documents' in result:
+                self.manifest.record(filepath, result['darm_data'], None, documents=registered)
+            else:
+                self.manifest.record(filepath, **registered[0], ocr_dpi=result.get('ocr_dpi'))
+
+    async def register_darm_data(self, filepath, darm_data):
+        """Registrar os dados extraídos de um arquivo: controle de guias e geração do SQL
+
+        Retorna o nome do arquivo SQL gerado, ou None se nenhum foi gerado.
+        """
+        if not darm_data:
+            return None
+
+        print('✅ Dados extraídos:', darm_data)
+
+        # Verificar se já existe um arquivo SQL para esta guia
+        numero_guia = darm_data.get('numeroGuia') or 'SEM_GUIA'
+        sql_filename = OUTPUT_CONFIG.get('file_naming_pattern', 'INSERT_DARM_PAGO_{guia}.sql').format(guia=numero_guia)
+        sql_path = self.output_dir / sql_filename
+
+        # Sempre sobrescrever arquivos existentes
+        if self.generate_individual_files and sql_path.exists():
+            print(f'🔄 Sobrescrevendo arquivo existente para guia {numero_guia}')
+
+        record = self.build_record(darm_data)
+
+        # Verificar se o registro foi gerado corretamente
+        if record is None:
+            print(f'❌ Erro: SQL não foi gerado corretamente para guia {numero_guia}')
+            return None
+
+        # Guia já gerada ou carregada no banco: consulta ao livro de guias
+        if not self.check_ledger(record, filepath.name):
+            return None
+
+        self.guias_processadas.append(numero_guia)
+        record.sq_doc = self.allocate_sq_doc()
+
+        # Gravar a linha no arquivo único e no lote
+        self.emit_record(record)
+
+        if not self.generate_individual_files:
+            self.record_in_ledger(record, filepath.name, None)
+            print(f'📊 Guias processadas até agora: {len(self.guias_processadas)}')
+            return None
+
+        # Escrever arquivo em encoding latin1
+        with open(sql_path, 'w', encoding='latin1') as f:
+            f.write(record.render_insert())
+
+        self.record_in_ledger(record, filepath.name, sql_filename)
+        print(f'✅ Arquivo SQL gerado: {sql_filename}')
+        print(f'📊 Guias processadas até agora: {len(self.guias_processadas)}')
+        return sql_filename
+
     async def extract_text_from_pdf(self, filepath):
         """Extrair texto de um arquivo PDF - com suporte a OCR para imagens"""
+        text, _ = await self.read_pdf_text(filepath)
+        return text
+
+    async def read_pdf_text(self, filepath):
+        """Texto do PDF e sua origem: (texto, nome do motor) ou (texto, 'ocr')"""
         try:
-            # Primeiro, tentar extrair texto normalmente
-            with open(filepath, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    text += page_text
-                
-                # Se conseguiu extrair texto, retornar
-                if text.strip():
-                    print(f"✅ Texto extraído normalmente do PDF: {filepath.name}")
-                    return text
-                
-                # Se não conseguiu extrair texto, pode ser PDF com imagens
-                print(f"⚠️  PDF sem texto extraível detectado: {filepath.name}")
-                print("🔄 Tentando extrair texto usando OCR...")
-                
-                if not OCR_AVAILABLE:
-                    print("❌ OCR não disponível. Instale as dependências: pip install pytesseract Pillow pdf2image opencv-python")
-                    return ""
-                
-                # Converter PDF para imagens e usar OCR
-                return await self.extract_text_from_pdf_with_ocr(filepath)
-                
+            # Primeiro, tentar a camada de texto (motor mais rápido disponível, PyPDF2 como fallback)
+            text, engine = self.pdf_text.extract(filepath, stop_when=self.page_stop_condition())
+
+            # Se conseguiu extrair texto, retornar
+            if engine is not None:
+                print(f"✅ Texto extraído normalmente do PDF ({engine}): {filepath.name}")
+                return text, engine
+
+            # Se não conseguiu extrair texto, pode ser PDF com imagens
+            print(f"⚠️  PDF sem texto extraível detectado: {filepath.name}")
+            print("🔄 Tentando extrair texto usando OCR...")
+
+            if not OCR_AVAILABLE:
+                print("❌ OCR não disponível. Instale as dependências: pip install pytesseract Pillow pdf2image opencv-python")
+                return "", None
+
+            # Converter PDF para imagens e usar OCR
+            return await self.extract_text_from_pdf_with_ocr(filepath), 'ocr'
+
         except Exception as error:
             print(f'Erro ao extrair texto do PDF {filepath.name}: {error}')
-            return ""
+            return "", None
+
+    def page_stop_condition(self):
+        """Condição para parar a leitura página a página (None = ler todas as páginas)"""
+        if not self.stop_when_fields_found:
+            return None
+        return DEFAULT_EXTRACTOR.has_required_fields
 
     async def extract_text_from_pdf_with_ocr(self, filepath):
-        """Extrair texto de PDF usando OCR (para PDFs com imagens)"""
+        """Extrair texto de PDF usando OCR (para PDFs com imagens)
+
+        Com DPI adaptativo, o PDF é rasterizado primeiro no menor DPI de dpi_tiers; só
+        é rasterizado de novo, no DPI seguinte (até OCR_CONFIG['dpi']), se faltarem
+        campos obrigatórios ou algum não passar na validação. O DPI usado fica em
+        last_ocr_dpi.
+        """
+        self.last_ocr_dpi = None
+        for index, dpi in enumerate(self.ocr_dpi_tiers):
+            self.last_ocr_confidences = {}
+            text = await self.ocr_pdf_at_dpi(filepath, dpi)
+            if index == len(self.ocr_dpi_tiers) - 1 or self.ocr_fields_valid(text):
+                self.last_ocr_dpi = dpi
+                return text
+            print(f"🔁 Campos obrigatórios ausentes ou inválidos a {dpi} DPI: "
+                  f"rasterizando de novo a {self.ocr_dpi_tiers[index + 1]} DPI")
+
+    async def ocr_pdf_at_dpi(self, filepath, dpi):
+        """OCR das páginas do PDF rasterizadas num DPI"""
         try:
-            print(f"🔍 Convertendo PDF para imagens: {filepath.name}")
-            
-            # Converter PDF para imagens
-            images = convert_from_path(filepath, dpi=300)
-            
-            all_text = ""
-            for i, image in enumerate(images):
-                print(f"📄 Processando página {i+1}/{len(images)} com OCR...")
-                
-                # Converter PIL Image para OpenCV format
-                opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-                
-                # Pré-processar imagem para melhorar OCR
-                processed_image = self.preprocess_image_for_ocr(opencv_image)
-                
-                # Extrair texto usando Tesseract
-                page_text = pytesseract.image_to_string(processed_image, lang='por')
-                all_text += page_text + "\n"
-                
-                print(f"✅ Página {i+1} processada com OCR")
-            
+            print(f"🔍 Convertendo PDF para imagens ({dpi} DPI): {filepath.name}")
+
+            page_count = pdfinfo_from_path(filepath)['Pages']
+            total_pages = min(page_count, self.ocr_max_pages)
+            if total_pages < page_count:
+                print(f"⚠️  PDF com {page_count} páginas - processando apenas as {total_pages} primeiras (max_pages)")
+
+            # Parar nas primeiras páginas se os campos obrigatórios já apareceram
+            stop_when = self.page_stop_condition()
+            page_texts = []
+
+            def fields_found(page_number):
+                if stop_when is None or page_number >= total_pages:
+                    return False
+                if not stop_when("".join(page_text + "\n" for page_text in page_texts)):
+                    return False
+                print(f"⏩ Campos obrigatórios encontrados na página {page_number}: "
+                      f"{total_pages - page_number} página(s) restante(s) sem OCR")
+                return True
+
+            workers = min(self.ocr_page_workers, total_pages)
+            if workers > 1:
+                # Cada worker rasteriza e aplica OCR na sua página; os resultados são lidos na ordem das páginas
+                print(f"⚡ OCR paralelo por página: {workers} workers")
+                # Evitar que cada Tesseract abra várias threads OpenMP competindo pelos mesmos núcleos
+                os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self.ocr_pdf_page, filepath, page_number, total_pages, dpi)
+                               for page_number in range(1, total_pages + 1)]
+                    for page_number, future in enumerate(futures, start=1):
+                        page_texts.append(future.result())
+                        if fields_found(page_number):
+                            for pending in futures[page_number:]:
+                                pending.cancel()  # Páginas que ainda não começaram
+                            break
+            else:
+                # Rasterizar página a página: apenas uma página decodificada em memória por vez
+                for page_number, image in self.iter_pdf_page_images(filepath, total_pages, dpi):
+                    print(f"📄 Processando página {page_number}/{total_pages} com OCR...")
+                    page_texts.append(self.ocr_page_image(image))
+                    image.close()
+                    print(f"✅ Página {page_number} processada com OCR")
+                    if fields_found(page_number):
+                        break
+
+            all_text = "".join(page_text + "\n" for page_text in page_texts)
+
             if all_text.strip():
                 print(f"✅ Texto extraído com OCR: {len(all_text)} caracteres")
                 return all_text
@@ -468,24 +1177,92 @@ Gerado automaticamente pelo DarmProcessor (Python)
             print(f"❌ Erro ao extrair texto com OCR: {error}")
             return ""
 
-    def preprocess_image_for_ocr(self, image):
-        """Pré-processar imagem para melhorar a qualidade do OCR"""
+    def iter_pdf_page_images(self, filepath, total_pages, dpi=None):
+        """Rasterizar as páginas do PDF uma a uma (gerador de (número da página, PIL Image))"""
+        for page_number in range(1, total_pages + 1):
+            yield page_number, self.rasterize_pdf_page(filepath, page_number, dpi)
+
+    def rasterize_pdf_page(self, filepath, page_number, dpi=None):
+        """Rasterizar uma única página do PDF (por padrão na resolução OCR_CONFIG['dpi'])
+
+        Direto em tons de cinza (pdftoppm -gray): um terço dos bytes de uma página RGB,
+        e o pré-processamento não precisa converter as cores.
+        """
+        return convert_from_path(filepath, dpi=dpi or self.ocr_dpi, first_page=page_number, last_page=page_number,
+                                 grayscale=True)[0]
+
+    def ocr_pdf_page(self, filepath, page_number, total_pages, dpi=None):
+        """Rasterizar uma única página do PDF e extrair o texto com OCR"""
+        print(f"📄 Processando página {page_number}/{total_pages} com OCR...")
+        image = self.rasterize_pdf_page(filepath, page_number, dpi)
+        page_text = self.ocr_page_image(image)
+        image.close()
+        print(f"✅ Página {page_number} processada com OCR")
+        return page_text
+
+    def ocr_page_image(self, image):
+        """Aplicar OCR numa página rasterizada (PIL Image, em tons de cinza)"""
+        # PIL 'L' -> array 2D uint8, sem a ida e volta RGB -> BGR -> cinza
+        page = np.asarray(image)
+        if page.ndim == 3:
+            page = cv2.cvtColor(page, cv2.COLOR_RGB2GRAY)  # Página colorida (ex.: PIL Image de outra origem)
+
+        # Pré-processar imagem para melhorar OCR (página já no DPI escolhido: sem redução)
+        processed_image = self.preprocess_image_for_ocr(page, rasterized=True)
+
+        # Extrair texto usando Tesseract
+        return self.ocr_processed_image(processed_image)
+
+    def ocr_processed_image(self, processed_image):
+        """OCR de uma página pré-processada: só as caixas do formulário (modo ROI) ou a página inteira
+
+        O código de barras lido da imagem entra no texto antes do OCR; se sozinho já traz
+        os campos obrigatórios (campo livre mapeado em BARCODE_CONFIG), o OCR é dispensado.
+        """
+        barcode_data = self.read_barcode_image(processed_image)
+        if barcode_data and DEFAULT_EXTRACTOR.has_required_data(barcode_data):
+            print('⚡ Campos obrigatórios lidos do código de barras: OCR da página dispensado')
+            return RoiOcr.render(barcode_data)
+
+        if self.roi_ocr is not None:
+            text = self.roi_ocr.read(processed_image, known=barcode_data)
+            if not self.roi_fallback_full_page or DEFAULT_EXTRACTOR.has_required_fields(text):
+                return text
+            print('🔄 Caixas do formulário sem os campos obrigatórios: OCR da página inteira')
+        if self.confident_ocr is None:
+            return RoiOcr.render(barcode_data) + self.ocr_engine.image_to_string(processed_image, lang=self.ocr_lang)
+
+        text, confidences = self.confident_ocr.read(processed_image, engine=self.ocr_engine, lang=self.ocr_lang)
+        self.record_ocr_confidences(confidences)
+        return RoiOcr.render(barcode_data) + text
+
+    def record_ocr_confidences(self, confidences):
+        """Acumular a confiança dos campos de uma página (campo em várias páginas: a menor)"""
+        with self.ocr_confidences_lock:
+            for field, confidence in confidences.items():
+                self.last_ocr_confidences[field] = min(confidence, self.last_ocr_confidences.get(field, confidence))
+
+    def read_barcode_image(self, image):
+        """Dados do código de barras lido e validado na imagem da página ({} se não houver)"""
+        if self.barcode is None or not self.decode_barcode_images:
+            return {}
         try:
-            # Converter para escala de cinza
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Aplicar threshold adaptativo para melhorar contraste
-            thresh = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-            )
-            
-            # Aplicar morfologia para remover ruído
-            kernel = np.ones((1, 1), np.uint8)
-            processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-            
-            # Aplicar blur suave para suavizar
-            processed = cv2.GaussianBlur(processed, (1, 1), 0)
-            
+            return self.barcode.read_image(image) or {}
+        except Exception as error:
+            print(f"⚠️  Erro ao ler o código de barras da imagem: {error}")
+            return {}
+
+    def preprocess_image_for_ocr(self, image, rasterized=False):
+        """Pré-processar imagem para melhorar a qualidade do OCR (array BGR ou já em tons de cinza)
+
+        Etapas montadas a partir de IMAGE_PREPROCESSING_CONFIG e OCR_CONFIG (image_preprocessing).
+        rasterized: página de PDF rasterizada no DPI escolhido pelo processador; a redução para
+        max_width não se aplica (desfaria o DPI mais alto do DPI adaptativo).
+        """
+        try:
+            processed, timings = self.preprocessor.apply(image, skip=('resize',) if rasterized else ())
+            if timings:
+                print(f"⏱️  Pré-processamento: {ImagePreprocessor.format_timings(timings)}")
             return processed
             
         except Exception as error:
@@ -500,9 +1277,10 @@ Gerado automaticamente pelo DarmProcessor (Python)
                 return ""
             
             print(f"🔍 Processando imagem com OCR: {filepath.name}")
+            self.last_ocr_confidences = {}
             
-            # Carregar imagem
-            image = cv2.imread(str(filepath))
+            # Carregar imagem (direto em tons de cinza)
+            image = cv2.imread(str(filepath), cv2.IMREAD_GRAYSCALE)
             if image is None:
                 print(f"❌ Não foi possível carregar a imagem: {filepath.name}")
                 return ""
@@ -511,7 +1289,7 @@ Gerado automaticamente pelo DarmProcessor (Python)
             processed_image = self.preprocess_image_for_ocr(image)
             
             # Extrair texto usando Tesseract
-            text = pytesseract.image_to_string(processed_image, lang='por')
+            text = self.ocr_processed_image(processed_image)
             
             if text.strip():
                 print(f"✅ Texto extraído da imagem: {len(text)} caracteres")
@@ -527,118 +1305,11 @@ Gerado automaticamente pelo DarmProcessor (Python)
     def extract_darm_data(self, text):
         """Extrair dados do DARM do texto extraído"""
         try:
-            # Padrões para extrair dados do DARM - versão melhorada
-            patterns = {
-                # Número de inscrição - múltiplos padrões
-                'inscricao': [
-                    r'02\.\s*INSCRIÇÃO MUNICIPAL\s*\n?(\d{8,9})',  # 8 ou 9 dígitos (com quebra de linha)
-                    r'02\.\s*INSCRIÇÃO MUNICIPAL\s*(\d{8,9})',  # 8 ou 9 dígitos (sem quebra de linha)
-                    r'(?:Inscrição|INSCRIÇÃO|Inscrição Municipal|Inscrição)\s*:?\s*(\d{8,9})',  # 8 ou 9 dígitos
-                    r'(?:Inscrição|INSCRIÇÃO)\s*(\d{8,9})',  # 8 ou 9 dígitos
-                    r'Insc\.?\s*:?\s*(\d{8,9})'  # 8 ou 9 dígitos
-                ],
-                
-                # Código de barras - padrão específico para código de barras
-                'codigoBarras': [
-                    r'(?:Código de Barras|CODIGO DE BARRAS)\s*:?\s*([\d\.\s]+)',
-                    r'(?:Barras|BARRAS)\s*:?\s*([\d\.\s]+)',
-                    r'([\d]{48})',  # Exatamente 48 dígitos
-                    r'([\d]{44,50})'  # Entre 44 e 50 dígitos
-                ],
-                
-                # Código de receita - extrair do campo RECEITA
-                'codigoReceita': [
-                    r'01\.\s*RECEITA\s*\n(\d{1,4})-(\d{1,2})',  # Formato específico do PDF
-                    r'01\.\s*RECEITA\s*(\d{1,4})-(\d{1,2})',  # Formato alternativo
-                    r'(?:RECEITA|Receita|Código de Receita)\s*:?\s*(\d{1,4}-\d{1,2})',  # Formato genérico
-                    r'(\d{1,4})-(\d{1,2})',  # Para formato como "258-5"
-                    r'RECEITA\s*\n(\d{1,4})-(\d{1,2})'  # Formato mais específico
-                ],
-                
-                # Valor principal - múltiplos padrões
-                'valorPrincipal': [
-                    r'(?:Valor Principal|VALOR PRINCIPAL|Valor principal)\s*:?\s*R?\$?\s*([\d,\.]+)',
-                    r'(?:Principal|PRINCIPAL)\s*:?\s*R?\$?\s*([\d,\.]+)',
-                    r'R?\$?\s*([\d,\.]+)\s*(?:Principal|PRINCIPAL)',
-                    r'06\.\s*VALOR DO TRIBUTO\s*R?\$?\s*([\d,\.]+)'
-                ],
-                
-                # Valor total - múltiplos padrões
-                'valorTotal': [
-                    r'(?:Valor Total|VALOR TOTAL|Valor total)\s*:?\s*R?\$?\s*([\d,\.]+)',
-                    r'(?:Total|TOTAL)\s*:?\s*R?\$?\s*([\d,\.]+)',
-                    r'R?\$?\s*([\d,\.]+)\s*(?:Total|TOTAL)',
-                    r'09\.\s*VALOR TOTAL\s*R?\$?\s*([\d,\.]+)'
-                ],
-                
-                # Data de vencimento - múltiplos padrões
-                'dataVencimento': [
-                    r'(?:Vencimento|VENCIMENTO|Venc\.?)\s*:?\s*(\d{2}/\d{2}/\d{4})',
-                    r'(\d{2}/\d{2}/\d{4})\s*(?:Vencimento|VENCIMENTO)',
-                    r'03\.\s*DATA VENCIMENTO\s*(\d{2}/\d{2}/\d{4})'
-                ],
-                
-                # Exercício - múltiplos padrões
-                'exercicio': [
-                    r'(?:Exercício|EXERCÍCIO|Exerc\.?)\s*:?\s*(\d{4})',
-                    r'(\d{4})\s*(?:Exercício|EXERCÍCIO)',
-                    r'04\.\s*ANO DE REFERÊNCIA\s*(\d{4})'
-                ],
-                
-                # Número da guia - múltiplos padrões
-                'numeroGuia': [
-                    r'05\.\s*GUIA NØ\s*\n?([0-9]+)',  # Pega a linha após o título
-                    r'(?:Guia|GUIA|Número da Guia|Nº Guia)\s*:?\s*(\d+)',
-                    r'(?:Guia|GUIA)\s*(\d+)',
-                    r'Guia\.?\s*:?\s*(\d+)'
-                ],
-                
-                # Competência - múltiplos padrões
-                'competencia': [
-                    r'(?:Competência|COMPETÊNCIA|Comp\.?)\s*:?\s*(\d{2}/\d{4})',
-                    r'(\d{2}/\d{4})\s*(?:Competência|COMPETÊNCIA)'
-                ]
-            }
+            # Padrões pré-compilados; os campos numerados do formulário saem numa única varredura
+            data = DEFAULT_EXTRACTOR.extract_fields(text)
 
-            data = {}
-
-            # Extrair cada campo usando múltiplos padrões
-            for key, pattern_array in patterns.items():
-                for pattern in pattern_array:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        # Tratamento especial para código de receita no formato "XXX-X"
-                        if key == 'codigoReceita' and len(match.groups()) > 1:
-                            data[key] = match.group(1) + match.group(2)  # Concatenar sem hífen
-                            print(f'🔧 Código de receita extraído (concatenação): {data[key]}')
-                        elif key == 'codigoReceita' and '-' in match.group(1):
-                            # Manter o formato original com hífen
-                            data[key] = match.group(1)
-                            print(f'🔧 Código de receita extraído (com hífen): {data[key]}')
-                        elif key == 'numeroGuia':
-                            data[key] = match.group(1).lstrip('0') or '0'  # Remove zeros à esquerda
-                        elif key == 'inscricao':
-                            # Processar inscrição municipal - remover zero extra se necessário
-                            inscricao = match.group(1).strip()
-                            # Se tem 9 dígitos e termina com zero, remover o último dígito
-                            if len(inscricao) == 9 and inscricao.endswith('0'):
-                                inscricao = inscricao[:-1]
-                                print(f'🔧 Inscrição corrigida: {match.group(1)} -> {inscricao}')
-                            data[key] = inscricao
-                        elif key == 'codigoBarras':
-                            # Limpar o código de barras removendo espaços e pontos
-                            codigo = re.sub(r'[\s\.]', '', match.group(1))
-                            # Garantir que tem pelo menos 44 dígitos
-                            if len(codigo) >= 44:
-                                data[key] = codigo[:48]  # Limitar a 48 dígitos
-                                print(f'Campo {key} encontrado: {data[key]}')
-                                break
-                        else:
-                            data[key] = match.group(1).strip()
-                        
-                        if data[key]:
-                            print(f'Campo {key} encontrado: {data[key]}')
-                        break  # Usar o primeiro padrão que encontrar
+            # Linha digitável com os dígitos verificadores conferidos: valor vindo do código de barras
+            self.apply_barcode(data, text)
 
             # Validar se temos os dados mínimos necessários
             if not data.get('inscricao') or (not data.get('valorPrincipal') and not data.get('valorTotal')):
@@ -657,8 +1328,74 @@ Gerado automaticamente pelo DarmProcessor (Python)
             print(f'Erro ao extrair dados do PDF: {error}')
             return None
 
+    def ocr_fields_valid(self, text):
+        """O texto do OCR traz os campos obrigatórios, e eles passam na validação?
+
+        Decide se vale rasterizar de novo num DPI maior: inscrição com 8 dígitos, valor
+        diferente de zero, vencimento numa data válida e, se houver linha digitável de
+        arrecadação (começa com 8), dígitos verificadores corretos.
+        """
+        data = DEFAULT_EXTRACTOR.extract_fields(text, verbose=False, record=False)
+        barcode_data = self.decode_barcode(data, text)
+        if barcode_data is not None:
+            data.update(barcode_data)
+        elif self.barcode is not None and str(data.get('codigoBarras', '')).startswith('8'):
+            return False  # Linha digitável lida com algum dígito errado
+
+        if not DEFAULT_EXTRACTOR.has_required_data(data) or len(data['inscricao']) != 8:
+            return False
+        if self.parse_monetary_value(data.get('valorTotal') or data.get('valorPrincipal')) == '0.00':
+            return False
+        if data.get('dataVencimento'):
+            try:
+                datetime.strptime(data['dataVencimento'], '%d/%m/%Y')
+            except ValueError:
+                return False
+        return True
+
+    def decode_barcode(self, data, text):
+        """Dados do código de barras validado (o extraído ou o primeiro do texto); None se não houver"""
+        if self.barcode is None:
+            return None
+        return self.barcode.decode(data.get('codigoBarras')) or self.barcode.find_in_text(text)
+
+    def apply_barcode(self, data, text):
+        """Validar o código de barras (módulo 10/11) e completar os dados com o que ele codifica"""
+        barcode_data = self.decode_barcode(data, text)
+        if barcode_data is None:
+            return
+
+        print(f"✅ Código de barras validado: {barcode_data['codigoBarras']}")
+        valor = barcode_data.get('valorTotal')
+        if valor and data.get('valorTotal') and \
+                self.parse_monetary_value(data['valorTotal']) != self.parse_monetary_value(valor):
+            print(f"🔧 Valor total corrigido pelo código de barras: {data['valorTotal']} -> {valor}")
+        data.update(barcode_data)
+
     def generate_sql_insert(self, darm_data):
         """Gerar SQL INSERT para os dados do DARM no formato simplificado para Control-M"""
+        try:
+            record = self.build_record(darm_data)
+            if record is None:
+                return None
+
+            # Gerar SQL no formato formatado bonito
+            sql = record.render_insert()
+
+            # Validar se o SQL foi gerado corretamente
+            if not sql or len(sql.strip()) < 50:
+                print('❌ Erro: SQL gerado está vazio ou muito pequeno')
+                return None
+
+            print(f'✅ SQL gerado com sucesso para guia {darm_data.get("numeroGuia")}')
+            return sql
+
+        except Exception as error:
+            print(f'❌ Erro ao gerar SQL: {error}')
+            return None
+
+    def build_record(self, darm_data):
+        """Normalizar os dados do DARM num DarmRecord (None se faltar dado obrigatório)"""
         try:
             # Converter data de vencimento do formato DD/MM/YYYY para YYYY-MM-DD
             data_vencimento = None
@@ -693,11 +1430,10 @@ Gerado automaticamente pelo DarmProcessor (Python)
                 print(f'⚠️  Código de receita extraído muito longo ({codigo_receita}), usando valor padrão 2585')
                 codigo_receita = 2585
 
-            # Gerar expressão SQL para SQ_DOC dinâmico (6 dígitos: últimos 3 da guia + últimos 3 dos millisegundos)
-            numero_guia = darm_data.get('numeroGuia', '0')
-            if numero_guia != '0':
+            # Guia sem zeros à esquerda (também é a base do SQ_DOC)
+            numero_guia = darm_data.get('numeroGuia')
+            if numero_guia:
                 numero_guia = self.remove_leading_zeros(numero_guia)
-            sq_doc_expression = f"((({numero_guia} % 1000) * 1000) + (UNIX_TIMESTAMP() % 1000)) % 1000000"
 
             # Validar dados obrigatórios
             inscricao = darm_data.get('inscricao', '')
@@ -705,26 +1441,17 @@ Gerado automaticamente pelo DarmProcessor (Python)
                 print('❌ Erro: Inscrição não encontrada')
                 return None
 
-            # Gerar SQL no formato formatado bonito
-            sql = f"""use silfae;
-
-INSERT INTO FarrDarmsPagos (
-    id, AA_EXERCICIO, CD_BANCO, NR_BDA, NR_COMPLEMENTO, NR_LOTE_NSA, TP_LOTE_D, SQ_DOC,
-    CD_RECEITA, CD_USU_ALT, CD_USU_INCL, DT_ALT, DT_INCL, DT_VENCTO, DT_PAGTO,
-    NR_INSCRICAO, NR_GUIA, NR_COMPETENCIA, NR_CODIGO_BARRAS, NR_LOTE_IPTU, ST_DOC_D, TP_IMPOSTO,
-    VL_PAGO, VL_RECEITA, VL_PRINCIPAL, VL_MORA, VL_MULTA, VL_MULTAF_TCDL, VL_MULTAP_TSD, VL_INSU_TIP, VL_JUROS,
-    processado, criticaProcessamento
-) VALUES (
-    NULL, {darm_data.get('exercicio', 2025)}, 70, 37, 0, 730, 1, {sq_doc_expression}, {codigo_receita}, NULL, 'FARR', NULL, NOW(), {f"'{data_vencimento}'" if data_vencimento else 'NULL'}, NOW(), '{inscricao}', {self.remove_leading_zeros(darm_data.get('numeroGuia', 'NULL'))}, {competencia or 'NULL'}, {f"'{codigo_barras}'" if codigo_barras else 'NULL'}, NULL, '13', NULL, {valor_total}, {valor_total}, {valor_principal}, 0.00, 0.00, NULL, NULL, NULL, 0.00, 0, NULL
-);"""
-
-            # Validar se o SQL foi gerado corretamente
-            if not sql or len(sql.strip()) < 50:
-                print('❌ Erro: SQL gerado está vazio ou muito pequeno')
-                return None
-
-            print(f'✅ SQL gerado com sucesso para guia {darm_data.get("numeroGuia")}')
-            return sql
+            return DarmRecord(
+                exercicio=darm_data.get('exercicio', 2025),
+                codigo_receita=codigo_receita,
+                data_vencimento=data_vencimento,
+                inscricao=inscricao,
+                numero_guia=numero_guia,
+                competencia=competencia,
+                codigo_barras=codigo_barras,
+                valor_total=valor_total,
+                valor_principal=valor_principal,
+            )
 
         except Exception as error:
             print(f'❌ Erro ao gerar SQL: {error}')
@@ -768,13 +1495,73 @@ INSERT INTO FarrDarmsPagos (
         except ValueError:
             return '0.00'
 
+# Processador próprio de cada worker do pool de processos (criado uma vez por processo)
+_worker_processor = None
+
+# Atributos do processador que podem mudar depois do __init__ (linha de comando, testes) e
+# mudam a extração: sem repassá-los, o worker usaria os valores do config.py
+WORKER_SETTINGS = ('use_cache', 'split_multi_darm', 'split_chunk_pages', 'stop_when_fields_found',
+                   'ocr_dpi', 'ocr_dpi_tiers', 'ocr_max_pages', 'ocr_lang', 'roi_fallback_full_page',
+                   'decode_barcode_images')
+
+def _init_extraction_worker(output_dir, settings):
+    """Inicializar o processador usado pelo worker do pool de processos"""
+    global _worker_processor
+    _worker_processor = DarmProcessor()
+    _worker_processor.output_dir = output_dir
+    for name, value in settings.items():
+        setattr(_worker_processor, name, value)
+    # O paralelismo já está nos arquivos: páginas em sequência para não sobrecarregar os núcleos
+    _worker_processor.ocr_page_workers = 1
+    _worker_processor.split_page_workers = 1
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    # Começar com a mesma ordem de padrões do processo principal
+    stats_path = _worker_processor.pattern_stats_path()
+    if stats_path is not None:
+        DEFAULT_EXTRACTOR.registry.load_stats(stats_path)
+
+def _extract_file_worker(filepath, file_type):
+    """Extrair um arquivo dentro de um worker do pool de processos"""
+    result = asyncio.run(_worker_processor.extract_file(filepath, file_type))
+    if result is not None:
+        result['pattern_stats'] = DEFAULT_EXTRACTOR.registry.stats_delta()
+    return result
+
+def _read_pages_worker(filepath, first_page, page_count):
+    """Ler um bloco de páginas de um PDF consolidado dentro de um worker do pool de processos"""
+    return _worker_processor.read_pdf_page_range(filepath, first_page, page_count)
+
+def parse_args(argv=None):
+    """Ler os argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(description='Processador de DARMs - gera INSERTs SQL a partir de PDFs e imagens')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignorar o cache de extração e reextrair todos os arquivos')
+    parser.add_argument('--incremental', action='store_true',
+                        help='processar apenas arquivos novos ou alterados (manifesto em inserts/)')
+    parser.add_argument('--multi-darm', action='store_true',
+                        help='PDFs consolidados: extrair um DARM por página (ou por "01. RECEITA")')
+    parser.add_argument('--guias-existentes', metavar='ARQUIVO',
+                        help='resultado do CHECK_GUIAS_EXISTENTES.sql (NR_GUIA e AA_EXERCICIO por linha): '
+                             'essas guias não geram INSERT')
+    return parser.parse_args(argv)
+
 # Função principal para executar o processador
-async def main():
+async def main(argv=None):
     """Função principal"""
+    args = parse_args(argv)
     processor = DarmProcessor()
+    if args.no_cache:
+        processor.use_cache = False
+    if args.incremental:
+        processor.incremental = True
+    if args.multi_darm:
+        processor.split_multi_darm = True
+    if args.guias_existentes:
+        processor.existing_guias_path = args.guias_existentes
     await processor.init()
     await processor.process_darms()
 
 if __name__ == "__main__":
-    import asyncio
+    # Necessário para o pool de processos no executável PyInstaller (Windows)
+    multiprocessing.freeze_support()
     asyncio.run(main()) 
\ No newline at end of file
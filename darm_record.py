@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de um DARM pago, pronto para virar SQL
+
+Guarda só os campos que variam de um DARM para outro, já normalizados
+(datas no formato do banco, valores com 2 casas, guia sem zeros à esquerda).
+O arquivo individual, as linhas dos arquivos de lote e o arquivo consolidado
+são todos renderizados a partir do registro, sem reinterpretar texto SQL.
+"""
+
+from sql_output import CD_BANCO, INSERT_HEADER, NR_BDA, NR_LOTE_NSA
+
+
+class DarmRecord:
+    """Linha da tabela FarrDarmsPagos (os campos fixos do lote ficam na renderização)"""
+
+    __slots__ = ('exercicio', 'codigo_receita', 'data_vencimento', 'inscricao', 'numero_guia',
+                 'competencia', 'codigo_barras', 'valor_total', 'valor_principal', 'sq_doc')
+
+    def __init__(self, exercicio, codigo_receita, data_vencimento, inscricao, numero_guia,
+                 competencia, codigo_barras, valor_total, valor_principal, sq_doc=None):
+        self.exercicio = exercicio
+        self.codigo_receita = codigo_receita
+        self.data_vencimento = data_vencimento  # 'YYYY-MM-DD 00:00:00' ou None
+        self.inscricao = inscricao
+        self.numero_guia = numero_guia          # Sem zeros à esquerda; None se ausente
+        self.competencia = competencia
+        self.codigo_barras = codigo_barras      # Só dígitos, até 48; None se ausente
+        self.valor_total = valor_total          # Texto com 2 casas decimais
+        self.valor_principal = valor_principal
+        self.sq_doc = sq_doc                    # Alocado pelo SqDocAllocator; None = calculado no banco
+
+    def sq_doc_expression(self):
+        """SQ_DOC calculado no banco (arquivos individuais): últimos 3 da guia + UNIX_TIMESTAMP"""
+        return f"((({self.numero_guia or 0} % 1000) * 1000) + (UNIX_TIMESTAMP() % 1000)) % 1000000"
+
+    def values(self, sq_doc=None):
+        """Lista de valores da linha, sem parênteses
+
+        O SQ_DOC é `sq_doc`, senão o alocado no registro, senão a expressão calculada no banco.
+        """
+        if sq_doc is None:
+            sq_doc = self.sq_doc if self.sq_doc is not None else self.sq_doc_expression()
+        data_vencimento = f"'{self.data_vencimento}'" if self.data_vencimento else 'NULL'
+        codigo_barras = f"'{self.codigo_barras}'" if self.codigo_barras else 'NULL'
+        return (f"NULL, {self.exercicio}, {CD_BANCO}, {NR_BDA}, 0, {NR_LOTE_NSA}, 1, {sq_doc}, {self.codigo_receita}, NULL, 'FARR', NULL, "
+                f"NOW(), {data_vencimento}, NOW(), '{self.inscricao}', {self.numero_guia or 'NULL'}, "
+                f"{self.competencia or 'NULL'}, {codigo_barras}, NULL, '13', NULL, {self.valor_total}, "
+                f"{self.valor_total}, {self.valor_principal}, 0.00, 0.00, NULL, NULL, NULL, 0.00, 0, NULL")
+
+    def key(self):
+        """Chave da guia no banco: (NR_GUIA, AA_EXERCICIO, CD_BANCO, NR_LOTE_NSA); None sem guia"""
+        try:
+            return int(self.numero_guia), int(self.exercicio), CD_BANCO, NR_LOTE_NSA
+        except (TypeError, ValueError):
+            return None
+
+    def row(self, sq_doc=None):
+        """Linha "(...)" para um INSERT de várias linhas"""
+        return f'({self.values(sq_doc)})'
+
+    def render_insert(self):
+        """Conteúdo do arquivo individual INSERT_DARM_PAGO_{guia}.sql"""
+        return f"""use silfae;
+
+{INSERT_HEADER} (
+    {self.values()}
+);"""
@@ -2,54 +2,62 @@
 # -*- coding: utf-8 -*-
 """
 Script para identificar SQ_DOCs duplicados
+
+Lê o arquivo único, os arquivos de lote e os arquivos individuais linha a linha
+e confere a unicidade com o bitmap do sq_doc_allocator (escala para milhões de
+linhas). Também mostra o próximo valor livre da sequência de SQ_DOC.
 """
 
-import re
-from collections import Counter
+import sys
 from pathlib import Path
 
-def find_duplicate_sq_docs():
-    """Encontrar SQ_DOCs duplicados"""
-    
-    consolidated_path = Path('inserts/INSERT_TODOS_DARMs.sql')
-    
-    with open(consolidated_path, 'r', encoding='latin1') as f:
-        content = f.read()
-    
-    print("🔍 Analisando SQ_DOCs duplicados...")
-    
-    # Extrair todos os números de 6 dígitos
-    all_6_digit_numbers = re.findall(r'\b\d{6}\b', content)
-    print(f"📊 Todos os números de 6 dígitos: {all_6_digit_numbers}")
-    
-    # Contar ocorrências
-    counter = Counter(all_6_digit_numbers)
-    duplicates = {item: count for item, count in counter.items() if count > 1}
-    
+from config import SQ_DOC_CONFIG
+from sq_doc_allocator import SqDocAllocator, find_duplicate_sq_docs, iter_sq_docs_in_sql
+
+def check_files(title, sql_files):
+    """Conferir os SQ_DOC de um conjunto de arquivos; devolve True se não houver repetição"""
+    sql_files = sorted(f for f in sql_files if f.exists())
+    if not sql_files:
+        return True
+
+    print(f"\n🔍 {title}: {len(sql_files)} arquivo(s)")
+    origem = {}
+    total = [0]
+
+    def sq_docs():
+        for sql_file in sql_files:
+            for sq_doc in iter_sq_docs_in_sql(sql_file):
+                total[0] += 1
+                origem.setdefault(sq_doc, sql_file.name)
+                yield sq_doc
+
+    duplicates = find_duplicate_sq_docs(sq_docs(), SQ_DOC_CONFIG.get('max_value', 999999))
+    print(f"📊 SQ_DOCs literais encontrados: {total[0]}")
+
     if duplicates:
-        print(f"❌ SQ_DOCs duplicados encontrados:")
-        for sq_doc, count in duplicates.items():
-            print(f"   - {sq_doc}: {count} vezes")
-    else:
-        print("✅ Nenhum SQ_DOC duplicado encontrado")
-    
-    # Mostrar todos os números únicos
-    unique_numbers = set(all_6_digit_numbers)
-    print(f"\n📊 Números únicos: {sorted(unique_numbers)}")
-    
-    # Verificar se os SQ_DOCs estão na posição correta
-    print("\n🔍 Verificando posição dos SQ_DOCs...")
-    
-    # Extrair cada INSERT individualmente
-    insert_pattern = r'\(([^)]+)\)'
-    inserts = re.findall(insert_pattern, content)
-    
-    for i, insert in enumerate(inserts):
-        values = [v.strip() for v in insert.split(',')]
-        if len(values) >= 8:
-            sq_doc = values[7]
-            nr_guia = values[16] if len(values) > 16 else "N/A"
-            print(f"INSERT {i+1}: SQ_DOC={sq_doc}, NR_GUIA={nr_guia}")
+        print(f"❌ SQ_DOCs duplicados encontrados: {len(duplicates)}")
+        for sq_doc in duplicates[:20]:
+            print(f"   - {sq_doc} (primeira ocorrência em {origem[sq_doc]})")
+        return False
+
+    print("✅ Nenhum SQ_DOC duplicado encontrado")
+    return True
+
+def find_duplicate_sq_docs_in_outputs(output_dir=Path('inserts')):
+    """Encontrar SQ_DOCs duplicados nos arquivos gerados"""
+    print("🔍 Analisando SQ_DOCs duplicados...")
+
+    ok = check_files('Arquivo único', [output_dir / 'INSERT_TODOS_DARMs.sql'])
+    ok &= check_files('Arquivos de lote', output_dir.glob('INSERT_DARMS_LOTE_*.sql'))
+    ok &= check_files('Arquivos individuais', output_dir.glob('INSERT_DARM_PAGO_*.sql'))
+
+    sequence_path = output_dir / SQ_DOC_CONFIG.get('sequence_file', '.sq_doc_sequence')
+    if sequence_path.exists():
+        allocator = SqDocAllocator(sequence_path, start=SQ_DOC_CONFIG.get('start', 1))
+        print(f"\n🔢 Próximo SQ_DOC livre na sequência: {allocator.peek()}")
+
+    return ok
 
 if __name__ == "__main__":
-    find_duplicate_sq_docs() 
\ No newline at end of file
+    output_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('inserts')
+    sys.exit(0 if find_duplicate_sq_docs_in_outputs(output_dir) else 1)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detecção de DARMs duplicados (reescaneamentos, fotos e o PDF original)
+
+Duas impressões digitais, em dois momentos:
+
+- imagem: hash perceptual (dHash) de uma renderização em baixa resolução da
+  primeira página, calculado antes da extração. DARMs diferentes do mesmo
+  formulário têm hashes praticamente iguais (só mudam alguns dígitos), então
+  a imagem só aponta candidatos (distância de Hamming até max_hash_distance);
+  o arquivo só deixa de passar pelo OCR se inscrição, guia e valor, lidos da
+  forma mais barata (camada de texto ou caixas do formulário), forem iguais
+  aos do candidato;
+- texto: hash dos campos que identificam o DARM (inscrição, guia, exercício,
+  vencimento, valor), calculado quando os dados já foram extraídos. Pega as
+  cópias que a imagem não pega (foto torta, outro scanner) antes do INSERT.
+
+Os hashes de imagem ficam num índice por faixas de bits: com max_distance + 1
+faixas, dois hashes a essa distância têm ao menos uma faixa igual, então cada
+consulta compara só os hashes que compartilham alguma faixa.
+
+Os grupos encontrados (original -> cópias) vão para o relatório de duplicatas.
+"""
+
+import hashlib
+import json
+import re
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+    np = None
+
+# Campos que identificam um DARM (o valor pode vir em qualquer um dos dois)
+FINGERPRINT_FIELDS = ('inscricao', 'numeroGuia', 'exercicio', 'dataVencimento')
+VALUE_FIELDS = ('valorTotal', 'valorPrincipal')
+# Campos da conferência de um candidato pela imagem (além do valor)
+QUICK_FIELDS = ('inscricao', 'numeroGuia')
+
+_NOT_DIGIT = re.compile(r'\D')
+
+
+def difference_hash(image, hash_size=16):
+    """dHash da imagem em tons de cinza: um bit por par de células vizinhas (hash_size² bits)"""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    cells = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (cells[:, 1:] > cells[:, :-1]).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def hamming_distance(a, b):
+    """Número de bits diferentes entre dois hashes"""
+    return bin(a ^ b).count('1')
+
+
+def text_fingerprint(darm_data, fields=FINGERPRINT_FIELDS):
+    """Impressão digital dos campos do DARM (só dígitos); None sem inscrição ou guia"""
+    if not darm_data or not darm_data.get('inscricao') or not darm_data.get('numeroGuia'):
+        return None
+    value = next((darm_data[field] for field in VALUE_FIELDS if darm_data.get(field)), '')
+    parts = [_NOT_DIGIT.sub('', str(darm_data.get(field) or '')) for field in fields]
+    parts[fields.index('numeroGuia')] = parts[fields.index('numeroGuia')].lstrip('0')  # Guia com ou sem zeros
+    parts.append(_NOT_DIGIT.sub('', str(value)).lstrip('0'))
+    return hashlib.sha1('|'.join(parts).encode('ascii')).hexdigest()
+
+
+class DuplicateIndex:
+    """Índice das impressões digitais já vistas e grupos de duplicatas encontrados"""
+
+    def __init__(self, hash_bits=256, max_distance=8):
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        width = hash_bits // band_count
+        # (deslocamento, máscara) de cada faixa; a última fica com os bits que sobram
+        self.bands = [(index * width, (1 << (width if index < band_count - 1 else hash_bits - index * width)) - 1)
+                      for index in range(band_count)]
+        self.band_index = [{} for _ in self.bands]  # Faixa -> valor da faixa -> [(hash, nome)]
+        self.fingerprints = {}  # Impressão digital do texto -> nome
+        self.duplicates = {}  # Cópia -> {'original', 'method', 'distance'}
+
+    def image_candidates(self, image_hash):
+        """Arquivos indexados a até max_distance bits: [(nome, distância)], do mais próximo ao mais distante
+
+        São só candidatos: a cópia precisa ser confirmada pelos campos antes de mark_duplicate().
+        """
+        found = {}
+        for (shift, mask), index in zip(self.bands, self.band_index):
+            for other_hash, other in index.get((image_hash >> shift) & mask, ()):
+                if other not in found:
+                    distance = hamming_distance(image_hash, other_hash)
+                    if distance <= self.max_distance:
+                        found[other] = distance
+        return sorted(found.items(), key=lambda item: item[1])
+
+    def add_image(self, name, image_hash):
+        """Indexar o hash da imagem de um arquivo que não é cópia"""
+        for (shift, mask), index in zip(self.bands, self.band_index):
+            index.setdefault((image_hash >> shift) & mask, []).append((image_hash, name))
+
+    def add_text(self, name, fingerprint):
+        """Registrar a impressão digital dos dados; devolve o original se já foi vista em outro arquivo"""
+        if fingerprint is None:
+            return None
+        original = self.fingerprints.setdefault(fingerprint, name)
+        if original == name:
+            return None
+        return self.mark_duplicate(name, original, 'texto')
+
+    def mark_duplicate(self, name, original, method, distance=None):
+        """Registrar a cópia no grupo do original (cópia de cópia vai para o mesmo original)"""
+        original = self.duplicates.get(original, {}).get('original', original)
+        self.duplicates[name] = {'original': original, 'method': method, 'distance': distance}
+        return original
+
+    def groups(self):
+        """Grupos de duplicatas: {original: [{'file', 'method', 'distance'}]}"""
+        groups = {}
+        for name, duplicate in self.duplicates.items():
+            groups.setdefault(duplicate['original'], []).append(
+                {'file': name, 'method': duplicate['method'], 'distance': duplicate['distance']})
+        return groups
+
+    def save_report(self, path):
+        """Gravar os grupos de duplicatas em JSON"""
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(self.groups(), f, ensure_ascii=False, indent=1)
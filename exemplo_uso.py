@@ -81,7 +81,7 @@ async def exemplo_estatisticas():
     print(f"\n📈 Estatísticas do Processamento:")
     print(f"   - Total de guias processadas: {len(processor.guias_processadas)}")
     print(f"   - Guias únicas: {len(set(processor.guias_processadas))}")
-    print(f"   - Arquivos SQL gerados: {len(processor.all_sql_inserts)}")
+    print(f"   - Arquivos SQL gerados: {processor.record_count}")
     
     if processor.guias_processadas:
         print(f"   - Primeira guia: {processor.guias_processadas[0]}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistente de extração dos DARMs
+
+Mapeia o hash do conteúdo de cada arquivo (PDF ou imagem), junto com as
+configurações que influenciam a extração, para o texto extraído, o resultado
+de extract_darm_data e os dados do OCR (DPI usado, confiança por campo).
+Arquivos que não mudaram entre execuções não passam de novo pelo PyPDF2 nem
+pelo Tesseract.
+
+O cache fica num banco SQLite (um arquivo só, seguro para vários processos)
+e é limitado por tamanho: ao passar do limite, as entradas acessadas há mais
+tempo são removidas.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+# Incrementar quando o formato das entradas ou a lógica de extração mudar
+CACHE_SCHEMA_VERSION = 2
+
+# Dados do OCR guardados junto com a extração (devolvidos no acerto do cache)
+METADATA_FIELDS = ('ocr_dpi', 'ocr_confidence')
+
+# Tamanho do bloco de leitura para o hash dos arquivos
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(filepath):
+    """Calcular o SHA-256 do conteúdo de um arquivo, lendo em blocos"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_fingerprint(settings):
+    """Resumir as configurações de extração numa string curta e estável"""
+    payload = json.dumps({'schema': CACHE_SCHEMA_VERSION, 'settings': settings},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf8')).hexdigest()[:16]
+
+
+class ExtractionCache:
+    """Cache de extração endereçado por conteúdo, persistido em SQLite"""
+
+    def __init__(self, cache_dir, max_size_mb=256, settings=None):
+        self.cache_dir = Path(cache_dir)
+        self.db_path = self.cache_dir / 'extraction_cache.sqlite3'
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.settings_key = settings_fingerprint(settings or {})
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._approx_size = 0
+
+    def _connect(self):
+        """Abrir a conexão (preguiçosamente) e criar a tabela se necessário"""
+        if self._conn is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""CREATE TABLE IF NOT EXISTS extracoes (
+                chave TEXT PRIMARY KEY,
+                texto TEXT NOT NULL,
+                dados TEXT,
+                metadados TEXT,
+                tamanho INTEGER NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )""")
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(extracoes)')}
+            if 'metadados' not in columns:
+                # Cache criado pela versão anterior (sem os dados do OCR)
+                conn.execute('ALTER TABLE extracoes ADD COLUMN metadados TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_extracoes_acesso ON extracoes (ultimo_acesso)')
+            conn.commit()
+            self._conn = conn
+            self._approx_size = self._total_size()
+        return self._conn
+
+    def _total_size(self):
+        """Somar o tamanho de todas as entradas"""
+        row = self._conn.execute('SELECT COALESCE(SUM(tamanho), 0) FROM extracoes').fetchone()
+        return row[0]
+
+    def key_for(self, filepath, file_type):
+        """Montar a chave de um arquivo: hash do conteúdo + tipo + configurações"""
+        return f'{file_sha256(filepath)}:{file_type}:{self.settings_key}'
+
+    def get(self, key):
+        """Buscar uma extração no cache; devolve None se não houver"""
+        conn = self._connect()
+        row = conn.execute('SELECT texto, dados, metadados FROM extracoes WHERE chave = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        conn.execute('UPDATE extracoes SET ultimo_acesso = ? WHERE chave = ?', (time.time(), key))
+        conn.commit()
+        self.hits += 1
+        text, data, metadata = row
+        data = json.loads(data) if data else None
+        if isinstance(data, list):
+            # PDF consolidado: lista de DARMs
+            result = {'text': text, 'darm_data': data[0] if data else None, 'documents': data}
+        else:
+            result = {'text': text, 'darm_data': data}
+        if metadata:
+            result.update(json.loads(metadata))
+        return result
+
+    def put(self, key, result):
+        """Gravar uma extração no cache e aplicar o limite de tamanho"""
+        conn = self._connect()
+        text = result.get('text') or ''
+        if 'documents' in result:
+            data = json.dumps(result['documents'])
+        else:
+            data = json.dumps(result['darm_data']) if result.get('darm_data') else None
+        metadata = {field: result[field] for field in METADATA_FIELDS if result.get(field) is not None}
+        metadata = json.dumps(metadata) if metadata else None
+        size = len(text.encode('utf8')) + len(data or '') + len(metadata or '')
+
+        conn.execute('INSERT OR REPLACE INTO extracoes (chave, texto, dados, metadados, tamanho, ultimo_acesso) '
+                     'VALUES (?, ?, ?, ?, ?, ?)', (key, text, data, metadata, size, time.time()))
+        conn.commit()
+
+        self._approx_size += size
+        if self._approx_size > self.max_size_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remover as entradas menos usadas até o cache voltar a 90% do limite"""
+        conn = self._connect()
+        total = self._total_size()
+        target = int(self.max_size_bytes * 0.9)
+        removed = 0
+
+        if total > target:
+            rows = conn.execute('SELECT chave, tamanho FROM extracoes ORDER BY ultimo_acesso').fetchall()
+            to_remove = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                to_remove.append((key,))
+                total -= size
+            conn.executemany('DELETE FROM extracoes WHERE chave = ?', to_remove)
+            conn.commit()
+            removed = len(to_remove)
+
+        self._approx_size = total
+        return removed
+
+    def clear(self):
+        """Apagar todas as entradas do cache"""
+        conn = self._connect()
+        conn.execute('DELETE FROM extracoes')
+        conn.commit()
+        self._approx_size = 0
+
+    def close(self):
+        """Fechar a conexão com o banco do cache"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
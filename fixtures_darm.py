@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Utilitários para os testes: geração de PDFs de DARM mínimos sem dependências externas
+e saída falsa do Tesseract
+"""
+
+from pathlib import Path
+
+
+def linhas_darm(guia='0000149', inscricao='03015483', valor='32,05', receita='262-3',
+                vencimento='10/07/2025', ano='2025'):
+    """Montar as linhas de texto de um DARM no layout numerado do formulário"""
+    return [
+        '01. RECEITA',
+        receita,
+        '02. INSCRIÇÃO MUNICIPAL',
+        inscricao,
+        '03. DATA VENCIMENTO',
+        vencimento,
+        '04. ANO DE REFERÊNCIA',
+        ano,
+        '05. GUIA NØ',
+        guia,
+        '06. VALOR DO TRIBUTO',
+        f'R$ {valor}',
+        '09. VALOR TOTAL',
+        f'R$ {valor}',
+    ]
+
+
+def _escapar(linha):
+    """Escapar uma linha para uso dentro de uma string literal de PDF"""
+    return linha.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def criar_pdf_texto(caminho, paginas):
+    """Criar um PDF com texto extraível, uma página por item de `paginas` (lista de linhas)"""
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # Árvore de páginas, preenchida depois
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    kids = []
+    for linhas in paginas:
+        comandos = ['BT', '/F1 10 Tf', '12 TL', '50 800 Td']
+        for linha in linhas:
+            comandos.append(f'({_escapar(linha)}) Tj T*')
+        comandos.append('ET')
+        stream = '\n'.join(comandos).encode('latin1')
+        objetos.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        conteudo_id = len(objetos)
+        objetos.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % conteudo_id
+        )
+        kids.append(len(objetos))
+    objetos[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % k for k in kids), len(kids)
+    )
+
+    saida = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for numero, corpo in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        saida += b'%d 0 obj\n' % numero + corpo + b'\nendobj\n'
+    xref = len(saida)
+    saida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    for offset in offsets:
+        saida += b'%010d 00000 n \n' % offset
+    saida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, xref)
+
+    caminho = Path(caminho)
+    caminho.write_bytes(bytes(saida))
+    return caminho
+
+
+def dados_tesseract(texto, confianca=95):
+    """Saída do pytesseract.image_to_data (Output.DICT) com as palavras do texto, uma linha por linha do texto"""
+    dados = {chave: [] for chave in ('text', 'conf', 'left', 'top', 'width', 'height',
+                                     'block_num', 'par_num', 'line_num')}
+    for numero_linha, linha in enumerate(texto.splitlines(), start=1):
+        for posicao, palavra in enumerate(linha.split()):
+            for chave, valor in (('text', palavra), ('conf', confianca), ('left', posicao * 100),
+                                 ('top', numero_linha * 20), ('width', 90), ('height', 12),
+                                 ('block_num', 1), ('par_num', 1), ('line_num', numero_linha)):
+                dados[chave].append(valor)
+    return dados
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Livro de guias (SQLite)
+
+Registra cada guia que recebeu um INSERT, com a chave da guia no banco
+(NR_GUIA, AA_EXERCICIO, CD_BANCO, NR_LOTE_NSA) num índice único. Substitui o
+controle em memória de uma única execução e os CHECK_GUIA_{guia}.sql
+gerados para conferência manual: "esta guia já foi gerada/carregada?" vira
+uma consulta O(log n) feita pelo próprio processador, entre execuções.
+
+Cada guia tem um estado:
+
+- gerada: INSERT gerado por este processador (ainda sem confirmação do banco);
+- carregada: a guia já existe no FarrDarmsPagos; não gera INSERT de novo.
+
+As execuções ficam na tabela runs; run_id diz em qual execução a guia foi
+vista por último (mesmo run_id = duplicata dentro da mesma execução).
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+LEDGER_VERSION = 1
+
+GENERATED = 'gerada'
+LOADED = 'carregada'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS guias (
+    nr_guia INTEGER NOT NULL,
+    aa_exercicio INTEGER NOT NULL,
+    cd_banco INTEGER NOT NULL,
+    nr_lote_nsa INTEGER NOT NULL,
+    inscricao TEXT,
+    sq_doc INTEGER,
+    source_file TEXT,
+    output_file TEXT,
+    status TEXT NOT NULL,
+    run_id INTEGER,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS guias_chave ON guias (nr_guia, aa_exercicio, cd_banco, nr_lote_nsa);
+CREATE INDEX IF NOT EXISTS guias_run ON guias (run_id);
+"""
+
+_KEY_WHERE = 'nr_guia = ? AND aa_exercicio = ? AND cd_banco = ? AND nr_lote_nsa = ?'
+
+
+class GuiaLedger:
+    """Guias já processadas, persistidas em SQLite (na pasta de saída)"""
+
+    def __init__(self, path, commit_every=500):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        # WAL: leitores (ex.: outra execução conferindo guias) não bloqueiam a gravação
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f'PRAGMA user_version = {LEDGER_VERSION}')
+        self.commit_every = commit_every
+        self.pending = 0
+        self.run_id = None
+
+    def start_run(self):
+        """Abrir uma execução nova; as guias registradas a seguir ficam com o seu id"""
+        cursor = self.connection.execute('INSERT INTO runs (started_at) VALUES (?)', (_now(),))
+        self.connection.commit()
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def lookup(self, key):
+        """Entrada da guia (sqlite3.Row) ou None; key = (NR_GUIA, AA_EXERCICIO, CD_BANCO, NR_LOTE_NSA)"""
+        if key is None:
+            return None
+        return self.connection.execute(f'SELECT * FROM guias WHERE {_KEY_WHERE}', key).fetchone()
+
+    def record(self, record, source_file=None, output_file=None):
+        """Registrar (ou atualizar) a guia de um DarmRecord com INSERT gerado nesta execução"""
+        key = record.key()
+        if key is None:
+            return
+        now = _now()
+        # Uma guia já carregada continua carregada
+        self.connection.execute(
+            """INSERT INTO guias (nr_guia, aa_exercicio, cd_banco, nr_lote_nsa, inscricao, sq_doc, source_file,
+                                  output_file, status, run_id, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (nr_guia, aa_exercicio, cd_banco, nr_lote_nsa) DO UPDATE SET
+                   inscricao = excluded.inscricao, sq_doc = excluded.sq_doc, source_file = excluded.source_file,
+                   output_file = excluded.output_file, run_id = excluded.run_id, updated_at = excluded.updated_at""",
+            (*key, record.inscricao, record.sq_doc, source_file, output_file, GENERATED, self.run_id, now, now))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def mark_loaded(self, keys):
+        """Marcar guias como já existentes no banco (as desconhecidas entram direto como carregadas)"""
+        now = _now()
+        self.connection.executemany(
+            """INSERT INTO guias (nr_guia, aa_exercicio, cd_banco, nr_lote_nsa, status, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (nr_guia, aa_exercicio, cd_banco, nr_lote_nsa) DO UPDATE SET
+                   status = excluded.status, updated_at = excluded.updated_at""",
+            ((*key, LOADED, now, now) for key in keys))
+        self.commit()
+
+    def count(self, status=None):
+        """Número de guias no livro (todas ou só as de um estado)"""
+        if status is None:
+            return self.connection.execute('SELECT COUNT(*) FROM guias').fetchone()[0]
+        return self.connection.execute('SELECT COUNT(*) FROM guias WHERE status = ?', (status,)).fetchone()[0]
+
+    def commit(self):
+        """Gravar as guias pendentes"""
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        """Gravar as pendências e fechar o banco"""
+        self.commit()
+        self.connection.close()
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR com confiança por campo
+
+O OCR da página inteira é feito por palavras (image_to_data): o texto é montado
+a partir delas, linha a linha, e cada campo extraído recebe a confiança das
+palavras de onde veio (a menor delas, de 0 a 100).
+
+Só os campos abaixo de OCR_CONFIG['confidence_threshold'] são lidos de novo,
+recortando a caixa das suas palavras, ampliando o recorte (reocr_scale) e
+aplicando a configuração do campo (reocr_configs ou, por padrão, a da caixa
+em ROI_OCR_TEMPLATE: uma linha, whitelist de dígitos). A releitura substitui
+as palavras originais apenas se tiver confiança maior e o campo continuar
+sendo extraído do texto; o resto da página não passa de novo pelo Tesseract.
+"""
+
+import re
+
+from darm_extractor import DEFAULT_EXTRACTOR
+from ocr_engines import OcrWord, engine_from_config
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Configuração da releitura para campos sem caixa no modelo do formulário
+DEFAULT_REREAD_CONFIG = '--psm 7'
+
+_NOT_ALNUM = re.compile(r'\W')
+
+
+def layout_words(words):
+    """Texto das palavras, uma linha do OCR por linha de texto; devolve (texto, início de cada palavra)"""
+    parts = []
+    starts = []
+    position = 0
+    previous_line = None
+    for word in words:
+        if previous_line is not None:
+            separator = ' ' if word.line == previous_line else '\n'
+            parts.append(separator)
+            position += 1
+        starts.append(position)
+        parts.append(word.text)
+        position += len(word.text)
+        previous_line = word.line
+    text = ''.join(parts)
+    return (text + '\n' if text else ''), starts
+
+
+def word_key(text):
+    """Só letras e dígitos (o valor extraído perde hífens, pontos e espaços)"""
+    return _NOT_ALNUM.sub('', text)
+
+
+def match_words(words, starts, value, after=0):
+    """Índices das palavras de onde o valor veio (todas numa mesma linha); [] se não encontradas
+
+    Procura a partir de `after` (o fim do rótulo do campo): primeiro uma palavra igual ao
+    valor, depois uma que o contenha (ex.: zeros à esquerda) e, para valores quebrados
+    em várias palavras (linha digitável), as palavras da linha que são pedaços dele.
+    """
+    key = word_key(value)
+    if not key:
+        return []
+    candidates = [index for index, start in enumerate(starts) if start >= after]
+    keys = {index: word_key(words[index].text) for index in candidates}
+
+    for index in candidates:
+        if keys[index] == key:
+            return [index]
+    for index in candidates:
+        if len(keys[index]) >= 2 and key in keys[index]:
+            return [index]
+
+    lines = {}
+    for index in candidates:
+        if len(keys[index]) >= 2 and keys[index] in key:
+            lines.setdefault(words[index].line, []).append(index)
+    if not lines:
+        return []
+    best = max(lines.values(), key=lambda indexes: sum(len(keys[index]) for index in indexes))
+    return best if 2 * sum(len(keys[index]) for index in best) >= len(key) else []
+
+
+def union_box(words):
+    """Caixa (left, top, right, bottom) que contém todas as palavras"""
+    return (min(word.left for word in words), min(word.top for word in words),
+            max(word.left + word.width for word in words), max(word.top + word.height for word in words))
+
+
+class ConfidentOcr:
+    """OCR por palavras com confiança por campo e releitura só dos campos fracos"""
+
+    def __init__(self, engine=None, lang='por', threshold=60, reread=True, reread_configs=None,
+                 scale=2, padding=4, extractor=None):
+        self.engine = engine or engine_from_config()  # Motor de OCR (ocr_engines)
+        self.lang = lang
+        self.threshold = threshold
+        self.reread = reread
+        self.reread_configs = reread_configs or {}
+        self.scale = scale
+        self.padding = padding
+        self.extractor = extractor or DEFAULT_EXTRACTOR
+
+    @classmethod
+    def from_config(cls, engine=None):
+        """Montar o leitor a partir de OCR_CONFIG (configuração da releitura: ROI_OCR_TEMPLATE)"""
+        from config import OCR_CONFIG, ROI_OCR_TEMPLATE
+
+        reread_configs = {field: region['config'] for field, region in ROI_OCR_TEMPLATE.items() if 'config' in region}
+        reread_configs.update(OCR_CONFIG.get('reocr_configs', {}))
+        return cls(engine, lang=OCR_CONFIG.get('language', 'por'),
+                   threshold=OCR_CONFIG.get('confidence_threshold', 60),
+                   reread=OCR_CONFIG.get('reocr_weak_fields', True), reread_configs=reread_configs,
+                   scale=OCR_CONFIG.get('reocr_scale', 2), padding=OCR_CONFIG.get('reocr_padding', 4))
+
+    def read(self, image, engine=None, lang=None):
+        """Texto da imagem e {campo: confiança} dos campos extraídos dele
+
+        engine e lang, se informados, valem para esta leitura (ex.: o motor atual do
+        processador, que pode ter sido trocado depois da criação deste leitor).
+        """
+        engine = engine or self.engine
+        lang = lang or self.lang
+        words = engine.image_to_data(image, lang=lang)
+        text, starts = layout_words(words)
+        located = self.locate_fields(text, words, starts)
+        confidences = {field: round(min(words[index].confidence for index in indexes), 1)
+                       for field, indexes in located.items()}
+
+        weak = [field for field, confidence in confidences.items() if confidence < self.threshold]
+        for field in weak if self.reread else ():
+            indexes = located.get(field)
+            if not indexes:
+                continue
+            reread = self.reread_field(image, field, words, indexes, engine, lang)
+            if reread is None or reread.confidence <= confidences[field]:
+                continue
+
+            candidate = [reread if index == indexes[0] else word
+                         for index, word in enumerate(words) if index == indexes[0] or index not in indexes]
+            candidate_text, candidate_starts = layout_words(candidate)
+            if not self.extract(candidate_text).get(field):
+                continue
+            print(f'🔁 Campo {field} relido: {" ".join(words[index].text for index in indexes)!r} '
+                  f'({confidences[field]:.0f}%) -> {reread.text!r} ({reread.confidence:.0f}%)')
+            words, text, starts = candidate, candidate_text, candidate_starts
+            confidences[field] = round(reread.confidence, 1)
+            located = self.locate_fields(text, words, starts)  # Os índices mudaram
+
+        return text, confidences
+
+    def extract(self, text):
+        """Campos do texto, sem mensagens nem estatísticas do registro de padrões"""
+        return self.extractor.extract_fields(text, verbose=False, record=False)
+
+    def locate_fields(self, text, words, starts):
+        """{campo: índices das palavras} de cada campo extraído do texto"""
+        labels = self.extractor.scan_labels(text)
+        located = {}
+        for field, value in self.extract(text).items():
+            after = labels[field][0] if labels.get(field) else 0
+            indexes = match_words(words, starts, value, after) or match_words(words, starts, value)
+            if indexes:
+                located[field] = indexes
+        return located
+
+    def reread_field(self, image, field, words, indexes, engine=None, lang=None):
+        """Reler a caixa das palavras do campo com a configuração do campo; OcrWord ou None"""
+        left, top, right, bottom = union_box([words[index] for index in indexes])
+        height, width = image.shape[:2]
+        region = image[max(0, top - self.padding):min(height, bottom + self.padding),
+                       max(0, left - self.padding):min(width, right + self.padding)]
+        if region.size == 0:
+            return None
+        if self.scale > 1 and cv2 is not None:
+            # Dígitos pequenos: ampliar o recorte ajuda mais o Tesseract do que reler a página
+            region = cv2.resize(region, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_CUBIC)
+
+        reread = (engine or self.engine).image_to_data(region, lang=lang or self.lang,
+                                                       config=self.reread_configs.get(field, DEFAULT_REREAD_CONFIG))
+        if not reread:
+            return None
+        first = words[indexes[0]]
+        # Caixa de uma linha: os espaços entre dígitos são ruído do OCR
+        return OcrWord(''.join(word.text for word in reread), min(word.confidence for word in reread),
+                       left, top, right - left, bottom - top, first.line)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motores de OCR
+
+Cada chamada de pytesseract.image_to_string abre um processo novo do tesseract,
+grava a imagem num arquivo temporário e carrega de novo o traineddata do
+idioma. Em milhares de páginas (e, no OCR por regiões, várias caixas por
+página) essa partida domina o tempo.
+
+Os motores implementam a mesma interface (available / image_to_string /
+image_to_data) e o primeiro disponível na ordem configurada é usado:
+
+- tesserocr: bindings da API C do Tesseract. Uma instância já inicializada
+  (idioma carregado) por thread e por idioma, reaproveitada em todas as
+  chamadas; a imagem (array numpy ou PIL) vai direto da memória, sem arquivo
+  temporário;
+- pytesseract: um subprocesso por chamada (o caminho original), sempre por
+  último como fallback.
+
+O parâmetro config segue a linha de comando do tesseract ("--psm 7 -c
+tessedit_char_whitelist=0123456789"), então o mesmo texto de configuração
+serve aos dois motores.
+
+image_to_data devolve as palavras reconhecidas com a confiança do Tesseract
+(0 a 100) e a posição na imagem; é o que permite saber a confiança de cada
+campo extraído (ocr_confidence).
+"""
+
+import shlex
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Motor usado como último recurso (o mesmo das versões anteriores)
+FALLBACK_ENGINE = 'pytesseract'
+
+# Segmentação padrão da linha de comando do tesseract (página inteira, automática)
+DEFAULT_PSM = 3
+
+
+def parse_tesseract_config(config):
+    """Separar "--psm N -c var=valor ..." em (psm ou None, {variável: valor})"""
+    psm = None
+    variables = {}
+    args = shlex.split(config or '')
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == '--psm' and index + 1 < len(args):
+            psm = int(args[index + 1])
+            index += 1
+        elif arg == '-c' and index + 1 < len(args):
+            name, _, value = args[index + 1].partition('=')
+            variables[name] = value
+            index += 1
+        index += 1
+    return psm, variables
+
+
+class OcrWord(NamedTuple):
+    """Palavra reconhecida: texto, confiança (0 a 100), caixa em pixels e linha (bloco, parágrafo, linha)"""
+    text: str
+    confidence: float
+    left: int
+    top: int
+    width: int
+    height: int
+    line: tuple
+
+
+class OcrEngine:
+    """Interface dos motores: texto de uma imagem (array numpy ou PIL Image)"""
+
+    name = None
+
+    def available(self):
+        """O motor pode ser usado neste ambiente?"""
+        return False
+
+    def image_to_string(self, image, lang='por', config=''):
+        """Texto reconhecido na imagem (mesma assinatura do pytesseract)"""
+        raise NotImplementedError
+
+    def image_to_data(self, image, lang='por', config=''):
+        """Palavras reconhecidas na imagem (lista de OcrWord, na ordem de leitura)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Liberar as instâncias mantidas pelo motor"""
+
+
+class PytesseractEngine(OcrEngine):
+    """pytesseract: um processo do tesseract por chamada (motor original, usado como fallback)"""
+
+    name = 'pytesseract'
+
+    def available(self):
+        return pytesseract is not None
+
+    def image_to_string(self, image, lang='por', config=''):
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+
+    def image_to_data(self, image, lang='por', config=''):
+        data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+        words = []
+        for index, text in enumerate(data['text']):
+            confidence = float(data['conf'][index])
+            if not str(text).strip() or confidence < 0:
+                continue  # Entradas de bloco/linha (confiança -1) e palavras vazias
+            words.append(OcrWord(str(text).strip(), confidence, data['left'][index], data['top'][index],
+                                 data['width'][index], data['height'][index],
+                                 (data['block_num'][index], data['par_num'][index], data['line_num'][index])))
+        return words
+
+
+class TesserocrEngine(OcrEngine):
+    """tesserocr: instâncias da API do Tesseract mantidas aquecidas, uma por thread e idioma
+
+    A API do Tesseract não é thread-safe; com o OCR paralelo por página cada
+    thread do pool recebe a sua instância, criada na primeira chamada.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path=None):
+        self.tessdata_path = tessdata_path
+        self.local = threading.local()
+        self.instances = []  # Todas as instâncias criadas (para o close)
+        self.lock = threading.Lock()
+
+    def available(self):
+        return tesserocr is not None
+
+    def api(self, lang):
+        """Instância inicializada da thread atual para o idioma"""
+        apis = getattr(self.local, 'apis', None)
+        if apis is None:
+            apis = self.local.apis = {}
+        if lang not in apis:
+            kwargs = {'lang': lang}
+            if self.tessdata_path:
+                kwargs['path'] = self.tessdata_path
+            apis[lang] = tesserocr.PyTessBaseAPI(**kwargs)
+            with self.lock:
+                self.instances.append(apis[lang])
+        return apis[lang]
+
+    def set_image(self, api, image):
+        """Passar a imagem da memória para o Tesseract (sem arquivo temporário)"""
+        if hasattr(image, 'mode'):
+            api.SetImage(image)  # PIL Image
+            return
+        if image.ndim == 3:
+            image = image[:, :, 2::-1]  # BGR do OpenCV -> RGB
+        if not image.flags['C_CONTIGUOUS']:
+            image = image.copy()
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+        api.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+
+    @contextmanager
+    def configured(self, image, lang, config):
+        """Instância com a segmentação, as variáveis e a imagem de uma chamada"""
+        api = self.api(lang)
+        psm, variables = parse_tesseract_config(config)
+
+        # As variáveis de uma chamada (ex.: whitelist de uma caixa) não valem para as próximas
+        previous = {name: api.GetVariableAsString(name) for name in variables}
+        try:
+            api.SetPageSegMode(DEFAULT_PSM if psm is None else psm)
+            for name, value in variables.items():
+                api.SetVariable(name, value)
+            self.set_image(api, image)
+            yield api
+        finally:
+            for name, value in previous.items():
+                api.SetVariable(name, value or '')
+            api.Clear()
+
+    def image_to_string(self, image, lang='por', config=''):
+        with self.configured(image, lang, config) as api:
+            return api.GetUTF8Text()
+
+    def image_to_data(self, image, lang='por', config=''):
+        with self.configured(image, lang, config) as api:
+            api.Recognize()
+            words = []
+            block = paragraph = line = 0
+            level = tesserocr.RIL.WORD
+            for word in tesserocr.iterate_level(api.GetIterator(), level):
+                # Numeração de bloco/parágrafo/linha equivalente à do image_to_data do pytesseract
+                if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block, paragraph, line = block + 1, 0, 0
+                if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                    paragraph, line = paragraph + 1, 0
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = (word.GetUTF8Text(level) or '').strip()
+                if not text:
+                    continue
+                x0, y0, x1, y1 = word.BoundingBox(level)
+                words.append(OcrWord(text, word.Confidence(level), x0, y0, x1 - x0, y1 - y0,
+                                     (block, paragraph, line)))
+            return words
+
+    def close(self):
+        with self.lock:
+            for api in self.instances:
+                api.End()
+            self.instances = []
+        self.local = threading.local()
+
+
+# Motores disponíveis, pelo nome usado em OCR_CONFIG
+ENGINES = {
+    TesserocrEngine.name: TesserocrEngine,
+    PytesseractEngine.name: PytesseractEngine,
+}
+
+
+def create_engine(name, config=None):
+    """Instanciar um motor pelo nome, com as opções da configuração"""
+    config = config or {}
+    if name == TesserocrEngine.name:
+        return TesserocrEngine(config.get('tessdata_path'))
+    if name not in ENGINES:
+        raise ValueError(f'Motor de OCR desconhecido: {name}')
+    return ENGINES[name]()
+
+
+def engine_from_config(config=None):
+    """Primeiro motor disponível conforme OCR_CONFIG ('auto' = engine_order; o fallback vai sempre no fim)"""
+    if config is None:
+        from config import OCR_CONFIG
+        config = OCR_CONFIG
+
+    engine = config.get('engine', 'auto')
+    names = list(config.get('engine_order', ENGINES)) if engine == 'auto' else [engine]
+    if FALLBACK_ENGINE not in names:
+        names.append(FALLBACK_ENGINE)
+
+    for name in names:
+        candidate = create_engine(name, config)
+        if candidate.available():
+            return candidate
+    return create_engine(FALLBACK_ENGINE, config)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de padrões de extração
+
+Carrega os padrões genéricos de cada campo (config.EXTRACTION_PATTERNS ou um
+arquivo JSON) uma única vez, compila e guarda os regex, e conta tentativas,
+acertos e tempo gasto por padrão. Com a ordem adaptativa ligada, os padrões
+de cada campo são reordenados periodicamente para que os que mais acertam
+por unidade de tempo sejam tentados primeiro.
+
+A reordenação só troca padrões da mesma especificidade: rótulo antes do
+valor ("Receita: 262-3"), rótulo depois do valor ("32,05 Principal") e, por
+último, padrões sem rótulo, que casam com qualquer número do texto e ficam
+sempre na ordem de configuração. Assim a ordem muda a velocidade, mas não
+qual padrão vence (ex.: r'(\\d{1,4})-(\\d{1,2})' nunca passa à frente de
+"Código de Receita" e não lê o fim de um CNPJ).
+
+As estatísticas podem ser gravadas em JSON e recarregadas na próxima execução,
+para que a ordem aprendida não se perca entre execuções.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# Sintaxe de regex removida antes de procurar o rótulo: escapes (\d, \s, \.), classes, quantificadores
+# e aberturas de grupos não capturantes; os '(' que sobram são os grupos capturantes
+_REGEX_SYNTAX = re.compile(r'\\.|\[[^\]]*\]|\{[^}]*\}|\(\?[:=!<]*')
+_LABEL = re.compile(r'[^\W\d_]{2,}')
+
+# Classes de especificidade (menor = mais específico)
+LABEL_BEFORE_VALUE = 0
+LABEL_AFTER_VALUE = 1
+NO_LABEL = 2
+
+
+def specificity(source):
+    """Classe de especificidade do padrão: rótulo antes do valor, rótulo só depois do valor ou sem rótulo"""
+    stripped = _REGEX_SYNTAX.sub('', source)
+    label = _LABEL.search(stripped)
+    if label is None:
+        return NO_LABEL
+    capture = stripped.find('(')
+    return LABEL_BEFORE_VALUE if capture == -1 or label.start() < capture else LABEL_AFTER_VALUE
+
+
+class PatternEntry:
+    """Um padrão compilado e as suas estatísticas de uso"""
+
+    __slots__ = ('source', 'regex', 'index', 'specificity', 'attempts', 'hits', 'total_time', 'reported')
+
+    def __init__(self, source, index):
+        self.source = source
+        self.regex = re.compile(source, re.IGNORECASE)
+        self.index = index  # Posição original (desempate e padrões nunca tentados)
+        self.specificity = specificity(source)
+        self.attempts = 0
+        self.hits = 0
+        self.total_time = 0.0
+        self.reported = (0, 0, 0.0)  # Valores já enviados em stats_delta()
+
+    def score(self):
+        """Acertos por segundo de busca (quanto maior, mais cedo o padrão é tentado)"""
+        if self.attempts == 0:
+            return None
+        mean_time = self.total_time / self.attempts or 1e-9
+        return (self.hits / self.attempts) / mean_time
+
+
+class PatternRegistry:
+    """Padrões compilados por campo, com contagem de acertos e ordem adaptativa"""
+
+    def __init__(self, patterns, adaptive=True, reorder_interval=100):
+        self.adaptive = adaptive
+        self.reorder_interval = max(1, reorder_interval)
+        # Mais específicos primeiro desde o início (estável: a ordem de configuração vale dentro de cada classe)
+        self.entries = {
+            field: sorted((PatternEntry(source, index) for index, source in enumerate(sources)),
+                          key=lambda e: (e.specificity, e.index))
+            for field, sources in patterns.items()
+        }
+        self._lookups = {field: 0 for field in self.entries}
+
+    @classmethod
+    def from_config(cls, base_dir=None):
+        """Montar o registro a partir do config.py (e do arquivo JSON de padrões, se configurado)"""
+        from config import EXTRACTION_PATTERNS, EXTRACTION_CONFIG
+
+        patterns = {field: list(sources) for field, sources in EXTRACTION_PATTERNS.items()}
+
+        patterns_file = EXTRACTION_CONFIG.get('patterns_file')
+        if patterns_file:
+            path = Path(patterns_file)
+            if not path.is_absolute():
+                # Relativo à pasta do programa (a do executável, no PyInstaller)
+                if base_dir is None:
+                    base_dir = Path(sys.executable).parent if getattr(sys, 'frozen', False) else Path(__file__).parent
+                path = Path(base_dir) / path
+            with open(path, 'r', encoding='utf8') as f:
+                patterns.update(json.load(f))
+
+        return cls(patterns,
+                   adaptive=EXTRACTION_CONFIG.get('adaptive_pattern_order', True),
+                   reorder_interval=EXTRACTION_CONFIG.get('reorder_interval', 100))
+
+    def fields(self):
+        """Campos com padrões registrados"""
+        return list(self.entries)
+
+    def definition(self):
+        """Padrões de cada campo na ordem de configuração (independe da ordem adaptativa)"""
+        return {field: [e.source for e in sorted(entries, key=lambda e: e.index)]
+                for field, entries in self.entries.items()}
+
+    def find(self, field, text, accept, record=True):
+        """Tentar os padrões do campo na ordem atual
+
+        `accept(match)` converte o match no valor do campo ou devolve None para
+        seguir para o próximo padrão. Devolve o primeiro valor aceito (ou None).
+        Com record=False a busca não entra nas estatísticas (consultas de verificação).
+        """
+        entries = self.entries.get(field)
+        if not entries:
+            return None
+
+        if not record:
+            for entry in entries:
+                match = entry.regex.search(text)
+                if match:
+                    value = accept(match)
+                    if value is not None:
+                        return value
+            return None
+
+        value = None
+        for entry in entries:
+            start = time.perf_counter()
+            match = entry.regex.search(text)
+            entry.total_time += time.perf_counter() - start
+            entry.attempts += 1
+            if match:
+                value = accept(match)
+                if value is not None:
+                    entry.hits += 1
+                    break
+
+        self._lookups[field] += 1
+        if self.adaptive and self._lookups[field] % self.reorder_interval == 0:
+            self.reorder(field)
+        return value
+
+    def reorder(self, field):
+        """Ordenar os padrões do campo: maior taxa de acerto por tempo primeiro, dentro de cada especificidade
+
+        Padrões ainda não tentados mantêm a posição relativa original, depois dos já medidos da
+        mesma classe. Padrões sem rótulo não são reordenados.
+        """
+        def sort_key(entry):
+            score = entry.score()
+            if entry.specificity == NO_LABEL or score is None:
+                return (entry.specificity, 1, 0, entry.index)
+            return (entry.specificity, 0, -score, entry.index)
+
+        self.entries[field].sort(key=sort_key)
+
+    def stats(self):
+        """Estatísticas atuais: {campo: [{pattern, attempts, hits, total_time}, ...]} na ordem atual"""
+        return {
+            field: [{'pattern': e.source, 'attempts': e.attempts, 'hits': e.hits,
+                     'total_time': e.total_time} for e in entries]
+            for field, entries in self.entries.items()
+        }
+
+    def stats_delta(self):
+        """Contadores acumulados desde a última chamada (para juntar estatísticas de outros processos)"""
+        delta = {}
+        for field, entries in self.entries.items():
+            for e in entries:
+                attempts = e.attempts - e.reported[0]
+                if attempts:
+                    delta.setdefault(field, {})[e.source] = (
+                        attempts, e.hits - e.reported[1], e.total_time - e.reported[2]
+                    )
+                    e.reported = (e.attempts, e.hits, e.total_time)
+        return delta
+
+    def merge_stats(self, delta):
+        """Somar contadores vindos de outro processo (ver stats_delta)"""
+        for field, by_source in delta.items():
+            for e in self.entries.get(field, ()):
+                if e.source in by_source:
+                    attempts, hits, total_time = by_source[e.source]
+                    e.attempts += attempts
+                    e.hits += hits
+                    e.total_time += total_time
+                    e.reported = (e.reported[0] + attempts, e.reported[1] + hits,
+                                  e.reported[2] + total_time)
+        if self.adaptive:
+            for field in delta:
+                if field in self.entries:
+                    self.reorder(field)
+
+    def load_stats(self, path):
+        """Carregar estatísticas de uma execução anterior (padrões que mudaram são ignorados)"""
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        for field, items in saved.items():
+            by_source = {item['pattern']: item for item in items}
+            for e in self.entries.get(field, ()):
+                item = by_source.get(e.source)
+                if item:
+                    e.attempts = item['attempts']
+                    e.hits = item['hits']
+                    e.total_time = item['total_time']
+                    e.reported = (e.attempts, e.hits, e.total_time)
+            if self.adaptive and field in self.entries:
+                self.reorder(field)
+        return True
+
+    def save_stats(self, path):
+        """Gravar as estatísticas em JSON (escrita atômica)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(self.stats(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motores de extração da camada de texto dos PDFs
+
+Os DARMs são PDFs gerados digitalmente: o texto já está no arquivo e o gargalo
+é o PyPDF2. Cada motor implementa a mesma interface (available / iter_pages /
+extract) e o PdfTextExtractor tenta os motores na ordem configurada:
+
+- pdftotext: executável do poppler, um único subprocesso por documento
+  (todas as páginas de uma vez, separadas por form feed);
+- pdfminer: pdfminer.six com o agrupamento de linhas padrão (LAParams), uma
+  linha de texto por linha do formulário;
+- pypdf2: PyPDF2.PdfReader, sempre por último como fallback.
+
+Motores não instalados são ignorados. Se um motor falha ou não devolve texto,
+o próximo é usado. Com stop_when, as páginas são lidas uma a uma e a leitura
+para assim que o texto acumulado satisfaz a condição (ex.: todos os campos
+obrigatórios do DARM encontrados na página 1). O pdftotext lê o documento
+num único subprocesso, então para ele a condição só evita o resto do trabalho.
+"""
+
+import io
+import shutil
+import subprocess
+from pathlib import Path
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    PDFMINER_AVAILABLE = True
+except ImportError:
+    PDFMINER_AVAILABLE = False
+
+# Motor usado como último recurso (o mesmo das versões anteriores)
+FALLBACK_ENGINE = 'pypdf2'
+
+
+class PdfTextEngine:
+    """Interface dos motores: texto de cada página, na ordem"""
+
+    name = None
+
+    def available(self):
+        """O motor pode ser usado neste ambiente?"""
+        return False
+
+    def iter_pages(self, path, max_pages=None, first_page=1):
+        """Texto de cada página, a partir de first_page (até max_pages páginas)"""
+        raise NotImplementedError
+
+    def extract(self, path, max_pages=None, first_page=1):
+        """Texto do documento inteiro (ou do intervalo de páginas)"""
+        return ''.join(self.iter_pages(path, max_pages, first_page))
+
+
+class PdftotextEngine(PdfTextEngine):
+    """poppler-utils (pdftotext): um subprocesso por documento, todas as páginas de uma vez"""
+
+    name = 'pdftotext'
+
+    def __init__(self, executable='pdftotext', timeout=30):
+        self.executable = shutil.which(executable)
+        self.timeout = timeout
+
+    def available(self):
+        return self.executable is not None
+
+    def iter_pages(self, path, max_pages=None, first_page=1):
+        command = [self.executable, '-q', '-enc', 'UTF-8', '-f', str(first_page)]
+        if max_pages:
+            command += ['-l', str(first_page + max_pages - 1)]
+        command += [str(path), '-']
+        result = subprocess.run(command, capture_output=True, timeout=self.timeout, check=True)
+
+        # Cada página termina com form feed; o último pedaço é vazio
+        pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+        if pages and not pages[-1]:
+            pages.pop()
+        return iter(pages)
+
+
+class PdfminerEngine(PdfTextEngine):
+    """pdfminer.six: o texto de cada linha do formulário termina com quebra de linha
+
+    Sem LAParams o pdfminer não separa as linhas e os rótulos grudam nos valores
+    ("05. GUIA NØ" + "0000101" vira "...GUIA NØ000010106. VALOR..."), o que gera
+    campos errados em vez de nenhum campo.
+    """
+
+    name = 'pdfminer'
+
+    def __init__(self):
+        # Gerenciador de recursos compartilhado: fontes em cache entre documentos
+        self.resource_manager = PDFResourceManager(caching=True) if PDFMINER_AVAILABLE else None
+        self.laparams = LAParams() if PDFMINER_AVAILABLE else None
+
+    def available(self):
+        return PDFMINER_AVAILABLE
+
+    def iter_pages(self, path, max_pages=None, first_page=1):
+        last_page = first_page + max_pages - 1 if max_pages else 0
+        with open(path, 'rb') as file:
+            for page in PDFPage.get_pages(file, maxpages=last_page):
+                first_page -= 1
+                if first_page > 0:
+                    continue  # Página antes do intervalo: não é interpretada
+                output = io.StringIO()
+                device = TextConverter(self.resource_manager, output, laparams=self.laparams)
+                try:
+                    PDFPageInterpreter(self.resource_manager, device).process_page(page)
+                finally:
+                    device.close()
+                yield output.getvalue().rstrip('\f')  # Sem o form feed de fim de página
+
+
+class PyPDF2Engine(PdfTextEngine):
+    """PyPDF2.PdfReader (motor original, usado como fallback)"""
+
+    name = 'pypdf2'
+
+    def available(self):
+        return PyPDF2 is not None
+
+    def iter_pages(self, path, max_pages=None, first_page=1):
+        with open(path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            last_page = len(reader.pages)
+            if max_pages:
+                last_page = min(last_page, first_page + max_pages - 1)
+            for index in range(first_page - 1, last_page):
+                yield reader.pages[index].extract_text()
+
+
+def count_pages(path):
+    """Número de páginas do PDF (só lê a árvore de páginas, não o conteúdo)"""
+    if PyPDF2 is not None:
+        with open(path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    with open(path, 'rb') as file:
+        return sum(1 for _ in PDFPage.get_pages(file))
+
+
+# Motores disponíveis, pelo nome usado em PDF_TEXT_CONFIG
+ENGINES = {
+    PdftotextEngine.name: PdftotextEngine,
+    PdfminerEngine.name: PdfminerEngine,
+    PyPDF2Engine.name: PyPDF2Engine,
+}
+
+
+def create_engine(name, config=None):
+    """Instanciar um motor pelo nome, com as opções da configuração"""
+    config = config or {}
+    if name == PdftotextEngine.name:
+        return PdftotextEngine(config.get('pdftotext_path', 'pdftotext'), config.get('timeout', 30))
+    if name not in ENGINES:
+        raise ValueError(f'Motor de texto de PDF desconhecido: {name}')
+    return ENGINES[name]()
+
+
+class PdfTextExtractor:
+    """Tenta os motores em ordem até um devolver texto"""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Motores disponíveis conforme PDF_TEXT_CONFIG ('auto' = engine_order; o fallback vai sempre no fim)"""
+        if config is None:
+            from config import PDF_TEXT_CONFIG
+            config = PDF_TEXT_CONFIG
+
+        engine = config.get('engine', 'auto')
+        names = list(config.get('engine_order', ENGINES)) if engine == 'auto' else [engine]
+        if FALLBACK_ENGINE not in names:
+            names.append(FALLBACK_ENGINE)
+
+        engines = [create_engine(name, config) for name in names]
+        return cls(e for e in engines if e.available())
+
+    @property
+    def names(self):
+        return [engine.name for engine in self.engines]
+
+    def extract(self, path, max_pages=None, engines=None, stop_when=None):
+        """Devolver (texto, nome do motor); ('', None) se nenhum motor conseguiu texto
+
+        stop_when(texto_acumulado) é chamado após cada página; se devolver True,
+        as páginas seguintes não são lidas.
+        """
+        pages, engine = self.extract_pages(path, max_pages, engines=engines, stop_when=stop_when)
+        return ''.join(pages), engine
+
+    def extract_pages(self, path, max_pages=None, first_page=1, engines=None, stop_when=None):
+        """Devolver (texto de cada página, nome do motor); ([], None) se nenhum motor conseguiu texto"""
+        for engine in engines or self.engines:
+            try:
+                pages = self.read_pages(engine, path, max_pages, first_page, stop_when)
+            except Exception as error:
+                print(f'⚠️  Motor {engine.name} falhou em {Path(path).name}: {error}')
+                continue
+            if any(page_text and page_text.strip() for page_text in pages):
+                return pages, engine.name
+        return [], None
+
+    @staticmethod
+    def read_pages(engine, path, max_pages=None, first_page=1, stop_when=None):
+        """Texto das páginas lidas pelo motor, parando quando stop_when ficar satisfeito"""
+        pages = []
+        text = ''
+        page_iter = engine.iter_pages(path, max_pages, first_page)
+        try:
+            for page_text in page_iter:
+                pages.append(page_text or '')
+                if stop_when is not None:
+                    text += page_text or ''
+                    if stop_when(text):
+                        break
+        finally:
+            close = getattr(page_iter, 'close', None)
+            if close is not None:
+                close()  # Fecha o arquivo do PDF sem ler as páginas restantes
+        return pages
+
+    def fallback_engines(self, used):
+        """Motores depois de `used` na ordem (para tentar de novo se o texto não tiver os dados)"""
+        names = self.names
+        if used not in names:
+            return []
+        return self.engines[names.index(used) + 1:]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Manifesto do modo incremental
+
+Guarda, para cada arquivo de entrada já processado, o tamanho, a data de
+modificação e o hash do conteúdo, junto com os dados extraídos (guia, valores)
+e o arquivo SQL gerado. Numa nova execução, arquivos inalterados são pulados e
+os seus dados vêm do manifesto, o que permite remontar o INSERT_TODOS_DARMs.sql
+completo sem reler nenhum PDF.
+
+PDFs consolidados (vários DARMs no mesmo arquivo) guardam a lista 'documents',
+com os dados, o arquivo SQL e o SQ_DOC de cada DARM.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from extraction_cache import file_sha256
+
+MANIFEST_VERSION = 1
+
+
+class ProcessingManifest:
+    """Manifesto (JSON) dos arquivos de entrada já processados"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+
+    def load(self):
+        """Carregar o manifesto do disco (vazio se não existir ou for inválido)"""
+        try:
+            with open(self.path, 'r', encoding='utf8') as f:
+                content = json.load(f)
+            if content.get('version') == MANIFEST_VERSION:
+                self.entries = content.get('files', {})
+            else:
+                self.entries = {}
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        """Gravar o manifesto de forma atômica (arquivo temporário + rename)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, filepath):
+        """Devolver a entrada do arquivo se ele não mudou desde o último processamento"""
+        entry = self.entries.get(filepath.name)
+        if entry is None:
+            return None
+
+        stat = filepath.stat()
+        if entry['size'] != stat.st_size:
+            return None
+        if entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry
+
+        # Data de modificação diferente (cópia, touch): confirmar pelo conteúdo
+        if file_sha256(filepath) == entry['hash']:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return entry
+        return None
+
+    def record(self, filepath, darm_data, output_file, sq_doc=None, documents=None, ocr_dpi=None):
+        """Registrar (ou atualizar) o processamento de um arquivo
+
+        documents: lista de {'darm_data', 'output_file', 'sq_doc'} de um PDF consolidado.
+        ocr_dpi: DPI que o OCR precisou (PDF escaneado lido com DPI adaptativo).
+        """
+        stat = filepath.stat()
+        self.entries[filepath.name] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_sha256(filepath),
+            'guia': darm_data.get('numeroGuia') if darm_data else None,
+            'output_file': output_file,
+            'darm_data': darm_data,
+            'sq_doc': sq_doc,  # Reaproveitado enquanto o arquivo não mudar
+        }
+        if documents is not None:
+            self.entries[filepath.name]['documents'] = documents
+        if ocr_dpi is not None:
+            self.entries[filepath.name]['ocr_dpi'] = ocr_dpi
+
+    @staticmethod
+    def documents(entry):
+        """DARMs de uma entrada: a lista do PDF consolidado ou a própria entrada"""
+        return entry['documents'] if 'documents' in entry else [entry]
+
+    def prune(self, existing_names):
+        """Remover do manifesto os arquivos que não existem mais na pasta de entrada"""
+        existing_names = set(existing_names)
+        removed = [name for name in self.entries if name not in existing_names]
+        for name in removed:
+            del self.entries[name]
+        return removed
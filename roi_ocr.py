@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR por regiões (ROI) do formulário do DARM
+
+Em vez de passar o Tesseract na página inteira a 300 DPI, recorta só as caixas
+numeradas do formulário ("01. RECEITA", "02. INSCRIÇÃO MUNICIPAL", "05. GUIA",
+"06. VALOR DO TRIBUTO"...) e a linha do código de barras, e lê cada recorte com
+uma configuração própria (--psm 7, uma linha; whitelist só de dígitos).
+
+O resultado é montado no mesmo layout numerado do texto dos PDFs, então o
+extrator de campos (darm_extractor) é usado sem nenhuma mudança.
+
+As caixas ficam em config.ROI_OCR_TEMPLATE, em frações da página. Para conferir
+ou calibrar o modelo numa imagem real:
+
+    python roi_ocr.py DARM_escaneado.png   (grava DARM_escaneado_roi.png com as caixas)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from darm_extractor import FORM_LABELS
+from ocr_engines import engine_from_config
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+class RoiOcr:
+    """Lê as caixas do modelo numa página já rasterizada (array numpy)"""
+
+    def __init__(self, template, lang='por', padding=0.0, engine=None):
+        self.template = template
+        self.lang = lang
+        self.padding = padding
+        self.engine = engine or engine_from_config()  # Motor de OCR (ocr_engines)
+
+    @classmethod
+    def from_config(cls, base_dir=None, engine=None):
+        """Montar o leitor a partir do config.py (e do JSON de modelo, se configurado)"""
+        from config import OCR_CONFIG, ROI_OCR_CONFIG, ROI_OCR_TEMPLATE
+
+        template = {field: dict(region) for field, region in ROI_OCR_TEMPLATE.items()}
+
+        template_file = ROI_OCR_CONFIG.get('template_file')
+        if template_file:
+            path = Path(template_file)
+            if not path.is_absolute():
+                # Relativo à pasta do programa (a do executável, no PyInstaller)
+                if base_dir is None:
+                    base_dir = Path(sys.executable).parent if getattr(sys, 'frozen', False) else Path(__file__).parent
+                path = Path(base_dir) / path
+            with open(path, 'r', encoding='utf8') as f:
+                template.update(json.load(f))
+
+        return cls(template, lang=OCR_CONFIG.get('language', 'por'),
+                   padding=ROI_OCR_CONFIG.get('padding', 0.0), engine=engine)
+
+    def crop(self, image, box):
+        """Recortar a caixa (frações da página, com a margem configurada)"""
+        height, width = image.shape[:2]
+        x0, y0, x1, y1 = box
+        left = max(0, int((x0 - self.padding) * width))
+        top = max(0, int((y0 - self.padding) * height))
+        right = min(width, int((x1 + self.padding) * width))
+        bottom = min(height, int((y1 + self.padding) * height))
+        return image[top:bottom, left:right]
+
+    def read_fields(self, image, skip=()):
+        """OCR de cada caixa: {campo: texto lido} (as caixas de `skip` não são lidas)"""
+        values = {}
+        for field, region in self.template.items():
+            if field in skip:
+                continue
+            region_image = self.crop(image, region['box'])
+            if region_image.size == 0:
+                continue
+            values[field] = self.engine.image_to_string(
+                region_image, lang=self.lang, config=region.get('config', '--psm 7')).strip()
+        return values
+
+    def read(self, image, known=None):
+        """Texto no layout numerado do formulário, montado a partir das caixas
+
+        Os campos de `known` (ex.: lidos do código de barras) entram no texto sem OCR.
+        """
+        values = dict(known or {})
+        values.update(self.read_fields(image, skip=values))
+        return self.render(values)
+
+    @staticmethod
+    def render(values):
+        """Montar o texto "NN. RÓTULO\\nvalor" que o extrator de campos já entende"""
+        lines = []
+        for field, (number, label) in FORM_LABELS.items():
+            if values.get(field):
+                lines += [f'{number}. {label}', values[field]]
+        if values.get('codigoBarras'):
+            lines.append(f"Código de Barras: {values['codigoBarras']}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def draw(self, image):
+        """Cópia da imagem com as caixas do modelo desenhadas (para calibração)"""
+        canvas = image.copy()
+        if canvas.ndim == 2:
+            canvas = cv2.cvtColor(canvas, cv2.COLOR_GRAY2BGR)
+        height, width = canvas.shape[:2]
+        for field, region in self.template.items():
+            x0, y0, x1, y1 = region['box']
+            top_left = (int(x0 * width), int(y0 * height))
+            cv2.rectangle(canvas, top_left, (int(x1 * width), int(y1 * height)), (0, 0, 255), 2)
+            cv2.putText(canvas, field, (top_left[0], max(12, top_left[1] - 4)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+        return canvas
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or cv2 is None:
+        print("Uso: python roi_ocr.py <imagem_do_darm>  (requer opencv-python e pytesseract ou tesserocr)")
+        sys.exit(1)
+
+    image_path = Path(sys.argv[1])
+    image = cv2.imread(str(image_path))
+    if image is None:
+        print(f"❌ Não foi possível carregar a imagem: {image_path}")
+        sys.exit(1)
+
+    reader = RoiOcr.from_config()
+    output_path = image_path.with_name(f'{image_path.stem}_roi.png')
+    cv2.imwrite(str(output_path), reader.draw(image))
+    print(f"🖼️  Caixas do modelo desenhadas em: {output_path}")
+
+    print("🔍 Valores lidos nas caixas:")
+    for field, value in reader.read_fields(image).items():
+        print(f"   {field}: {value!r}")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alocador de SQ_DOC
+
+Os SQ_DOC vêm de uma sequência gravada num arquivo (inserts/.sq_doc_sequence),
+protegida por lock de arquivo. Cada processo reserva um bloco de números de
+uma vez (uma única abertura do arquivo por bloco) e entrega os números do
+bloco em O(1), sem colisão entre processos simultâneos nem entre execuções.
+Na liberação, a sobra do bloco é devolvida se ninguém reservou depois dele.
+
+find_duplicate_sq_docs() verifica a unicidade com um bitmap (1 bit por valor
+possível), o que permite conferir milhões de linhas com memória constante.
+"""
+
+import os
+import re
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows (executável PyInstaller)
+    fcntl = None
+    import msvcrt
+
+
+class SqDocExhaustedError(RuntimeError):
+    """A sequência de SQ_DOC chegou ao valor máximo configurado"""
+
+
+class _SequenceFile:
+    """Arquivo da sequência aberto com lock exclusivo (usar com `with`)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self.file = open(self.path, 'r+', encoding='ascii')
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK desiste após 10 s; continuar esperando
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def read(self, default):
+        """Próximo valor livre gravado no arquivo (default se vazio ou inválido)"""
+        self.file.seek(0)
+        content = self.file.read().strip()
+        return int(content) if content.isdigit() else default
+
+    def write(self, value):
+        """Gravar o próximo valor livre (durável antes de liberar o lock)"""
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(str(value))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+
+class SqDocAllocator:
+    """Entrega SQ_DOC únicos a partir de blocos reservados na sequência persistente"""
+
+    def __init__(self, sequence_path, start=1, max_value=999999, block_size=1000):
+        self.sequence_path = Path(sequence_path)
+        self.start = start
+        self.max_value = max_value
+        self.block_size = max(1, block_size)
+        self._next = 0   # Próximo número do bloco atual
+        self._end = 0    # Fim (exclusivo) do bloco atual
+        self.allocated = 0
+
+    def next(self):
+        """Próximo SQ_DOC (O(1); o arquivo só é aberto quando o bloco acaba)"""
+        if self._next >= self._end:
+            self._reserve_block()
+        value = self._next
+        self._next += 1
+        self.allocated += 1
+        return value
+
+    def _reserve_block(self):
+        with _SequenceFile(self.sequence_path) as sequence:
+            first = max(sequence.read(self.start), self.start)
+            size = min(self.block_size, self.max_value + 1 - first)
+            if size <= 0:
+                raise SqDocExhaustedError(
+                    f'Sequência de SQ_DOC esgotada (máximo {self.max_value}) em {self.sequence_path}')
+            sequence.write(first + size)
+        self._next, self._end = first, first + size
+
+    def release(self):
+        """Devolver a sobra do bloco atual, se nenhum outro processo reservou depois dele"""
+        if self._next >= self._end:
+            return
+        with _SequenceFile(self.sequence_path) as sequence:
+            if sequence.read(self.start) == self._end:
+                sequence.write(self._next)
+        self._end = self._next
+
+    def peek(self):
+        """Próximo valor livre na sequência persistente (sem reservar)"""
+        with _SequenceFile(self.sequence_path) as sequence:
+            return max(sequence.read(self.start), self.start)
+
+
+def find_duplicate_sq_docs(sq_docs, max_value=999999):
+    """Devolver os SQ_DOC repetidos (na ordem em que a repetição aparece)
+
+    Usa um bitmap de max_value + 1 bits; valores fora da faixa vão para um set à parte.
+    """
+    bitmap = bytearray(max_value // 8 + 1)
+    outside = set()
+    duplicates = []
+    for sq_doc in sq_docs:
+        if 0 <= sq_doc <= max_value:
+            byte, bit = sq_doc >> 3, 1 << (sq_doc & 7)
+            if bitmap[byte] & bit:
+                duplicates.append(sq_doc)
+            else:
+                bitmap[byte] |= bit
+        elif sq_doc in outside:
+            duplicates.append(sq_doc)
+        else:
+            outside.add(sq_doc)
+    return duplicates
+
+
+# SQ_DOC é o 8º valor da linha: "(NULL, exercício, banco, bda, complemento, lote, tipo, SQ_DOC, ..."
+_SQ_DOC_IN_ROW = re.compile(r'^\s*\(?NULL, \d+, \d+, \d+, \d+, \d+, \d+, (\d+),')
+
+
+def iter_sq_docs_in_sql(path, encoding='latin1'):
+    """Ler os SQ_DOC literais de um arquivo SQL, linha a linha (sem carregar o arquivo inteiro)"""
+    with open(path, 'r', encoding=encoding) as f:
+        for line in f:
+            match = _SQ_DOC_IN_ROW.match(line)
+            if match:
+                yield int(match.group(1))
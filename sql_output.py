@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Escrita dos arquivos SQL em lote
+
+Em vez de um INSERT_DARM_PAGO_{guia}.sql e um CHECK_GUIA_{guia}.sql por documento,
+as linhas são agrupadas em INSERTs de várias linhas (batch_size linhas por
+statement) e gravadas em poucos arquivos (rows_per_file linhas por arquivo).
+Cada arquivo é aberto uma única vez, o que faz diferença quando a pasta de
+saída está num volume de rede.
+
+split_statements() divide uma lista de linhas em INSERTs limitados por número
+de linhas e por tamanho em bytes, para não passar do max_allowed_packet do
+MySQL nem obrigar o Control-M a carregar um statement gigante na memória.
+
+StreamingSqlFile grava o arquivo único (INSERT_TODOS_DARMs.sql) à medida que
+cada documento termina: as linhas vão direto para um arquivo temporário e só
+o terminador ';' e a troca atômica (os.replace) ficam para o final. A memória
+não cresce com o tamanho do lote e o arquivo anterior só é substituído quando
+o novo está completo.
+
+existence_check_statements() monta a verificação das guias de um lote: um
+SELECT por exercício, com NR_GUIA IN (...) em blocos limitados por número de
+guias e por bytes. O resultado (NR_GUIA e AA_EXERCICIO, uma linha por guia já
+existente, ex.: mysql -B -N) é lido de volta por read_existing_guias().
+"""
+
+import csv
+import os
+from pathlib import Path
+
+# Cabeçalho do INSERT na tabela de DARMs pagos (mesmo formato dos arquivos individuais)
+INSERT_HEADER = """INSERT INTO FarrDarmsPagos (
+    id, AA_EXERCICIO, CD_BANCO, NR_BDA, NR_COMPLEMENTO, NR_LOTE_NSA, TP_LOTE_D, SQ_DOC,
+    CD_RECEITA, CD_USU_ALT, CD_USU_INCL, DT_ALT, DT_INCL, DT_VENCTO, DT_PAGTO,
+    NR_INSCRICAO, NR_GUIA, NR_COMPETENCIA, NR_CODIGO_BARRAS, NR_LOTE_IPTU, ST_DOC_D, TP_IMPOSTO,
+    VL_PAGO, VL_RECEITA, VL_PRINCIPAL, VL_MORA, VL_MULTA, VL_MULTAF_TCDL, VL_MULTAP_TSD, VL_INSU_TIP, VL_JUROS,
+    processado, criticaProcessamento
+) VALUES"""
+
+# Campos fixos do lote (os mesmos em todas as linhas geradas)
+CD_BANCO = 70
+NR_BDA = 37
+NR_LOTE_NSA = 730
+
+# Filtro do lote usado nas consultas de verificação de guias (o exercício vem de cada guia)
+CHECK_CONDITIONS = (f"CD_BANCO = {CD_BANCO} AND NR_BDA = {NR_BDA} AND NR_COMPLEMENTO = 0 "
+                    f"AND NR_LOTE_NSA = {NR_LOTE_NSA} AND TP_LOTE_D = 1")
+
+# Guias por IN (...) na verificação
+CHECK_CHUNK_SIZE = 1000
+
+
+ROW_SEPARATOR = ',\n    '
+
+
+class StatementStream:
+    """Divide linhas "(...)" em INSERTs limitados, devolvendo o texto a acrescentar no arquivo
+
+    add(row) devolve o trecho a gravar (cabeçalho, separador ou fim do statement
+    anterior + a linha) e finish() o ';' do último statement. Só guarda
+    contadores, nunca as linhas.
+    """
+
+    def __init__(self, max_rows=None, max_bytes=None, encoding='latin1'):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.header = f"{INSERT_HEADER} \n    "
+        self._header_bytes = len(self.header.encode(encoding))
+        self._separator_bytes = len(ROW_SEPARATOR.encode(encoding))
+        self.statement_rows = 0     # Linhas do statement aberto
+        self.statement_bytes = 0    # Tamanho do statement aberto, já contando o ';' final
+        self.rows = 0               # Total de linhas recebidas
+        self.statements = 0         # Total de statements abertos
+
+    def fits(self, row):
+        """A linha cabe no statement aberto sem passar dos limites?"""
+        if not self.statement_rows:
+            return True
+        if self.max_rows and self.statement_rows >= self.max_rows:
+            return False
+        extra = self._separator_bytes + len(row.encode(self.encoding))
+        return not (self.max_bytes and self.statement_bytes + extra > self.max_bytes)
+
+    def add(self, row):
+        """Acrescentar uma linha; devolve o texto a gravar"""
+        text = ''
+        if not self.fits(row):
+            text = self.finish() + '\n\n'
+
+        row_bytes = len(row.encode(self.encoding))
+        if self.statement_rows:
+            text += ROW_SEPARATOR + row
+            self.statement_bytes += self._separator_bytes + row_bytes
+        else:
+            text += self.header + row
+            self.statement_bytes = self._header_bytes + 1 + row_bytes  # +1: ';' final
+            self.statements += 1
+        self.statement_rows += 1
+        self.rows += 1
+        return text
+
+    def finish(self):
+        """Fechar o statement aberto; devolve o terminador (ou '' se não há statement aberto)"""
+        if not self.statement_rows:
+            return ''
+        self.statement_rows = 0
+        self.statement_bytes = 0
+        return ';'
+
+
+def split_statements(rows, max_rows=None, max_bytes=None, encoding='latin1'):
+    """Agrupar as linhas "(...)" em INSERTs com no máximo max_rows linhas e max_bytes bytes
+
+    O tamanho conta o statement inteiro (cabeçalho, separadores e ';') na codificação
+    do arquivo. Uma linha que sozinha passa de max_bytes sai num statement só dela.
+    Devolve um gerador de statements completos.
+    """
+    stream = StatementStream(max_rows, max_bytes, encoding)
+    statement = []
+    for row in rows:
+        if not stream.fits(row):
+            yield ''.join(statement) + stream.finish()
+            statement = []
+        statement.append(stream.add(row))
+
+    if statement:
+        yield ''.join(statement) + stream.finish()
+
+
+def existence_check_statements(guias, chunk_size=CHECK_CHUNK_SIZE, max_bytes=None):
+    """SELECTs que listam as guias já existentes no banco: NR_GUIA IN (...) em blocos
+
+    guias: pares (NR_GUIA, AA_EXERCICIO), repetidos ou não; exercício None = sem filtro
+    de exercício. Cada bloco tem no máximo chunk_size guias e max_bytes bytes.
+    """
+    by_exercicio = {}
+    for numero_guia, exercicio in guias:
+        by_exercicio.setdefault(exercicio, {})[int(numero_guia)] = None  # Sem repetição, na ordem
+
+    for exercicio, numeros in by_exercicio.items():
+        conditions = CHECK_CONDITIONS if exercicio is None else f"AA_EXERCICIO = {exercicio} AND {CHECK_CONDITIONS}"
+        prefix = f"SELECT NR_GUIA, AA_EXERCICIO FROM FarrDarmsPagos WHERE {conditions} AND NR_GUIA IN ("
+        chunk = []
+        size = len(prefix) + 2  # ');'
+        for numero in numeros:
+            extra = len(str(numero)) + (2 if chunk else 0)
+            if chunk and (len(chunk) >= chunk_size or (max_bytes and size + extra > max_bytes)):
+                yield prefix + ', '.join(chunk) + ');'
+                chunk = []
+                size = len(prefix) + 2
+                extra = len(str(numero))
+            chunk.append(str(numero))
+            size += extra
+        if chunk:
+            yield prefix + ', '.join(chunk) + ');'
+
+
+def read_existing_guias(path):
+    """Pares (NR_GUIA, AA_EXERCICIO) do resultado da verificação (TSV ou CSV; cabeçalho ignorado)"""
+    guias = set()
+    with open(path, 'r', encoding='latin1', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = '\t' if '\t' in sample else (';' if ';' in sample else ',')
+        for row in csv.reader(f, delimiter=delimiter):
+            values = [value.strip() for value in row]
+            if len(values) >= 2 and values[0].isdigit() and values[1].isdigit():
+                guias.add((int(values[0]), int(values[1])))
+    return guias
+
+
+class StreamingSqlFile:
+    """Arquivo SQL de INSERTs gravado linha a linha, com finalização atômica
+
+    As linhas vão para "<nome>.tmp"; close() grava o ';' final, força a gravação
+    em disco e troca o temporário pelo arquivo definitivo. abort() descarta o
+    temporário e deixa o arquivo anterior intacto.
+    """
+
+    def __init__(self, path, max_rows=None, max_bytes=None, encoding='latin1'):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.encoding = encoding
+        self.stream = StatementStream(max_rows, max_bytes, encoding)
+        self._file = open(self.tmp_path, 'w', encoding=encoding)
+        self._file.write('use silfae;\n\n')
+
+    @property
+    def row_count(self):
+        return self.stream.rows
+
+    @property
+    def statement_count(self):
+        return self.stream.statements
+
+    def add(self, values_row):
+        """Acrescentar uma linha "(...)" ao arquivo"""
+        self._file.write(self.stream.add(values_row))
+
+    def close(self):
+        """Finalizar o arquivo; devolve False (sem gravar nada) se nenhuma linha foi recebida"""
+        if not self.stream.rows:
+            self.abort()
+            return False
+        try:
+            self._file.write(self.stream.finish())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except BaseException:
+            self.abort()
+            raise
+        self._file.close()
+        self._file = None
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self):
+        """Descartar o arquivo temporário"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class BatchedSqlWriter:
+    """Grava linhas VALUES em INSERTs de várias linhas, divididos em poucos arquivos"""
+
+    def __init__(self, output_dir, batch_size=100, rows_per_file=5000, write_checks=True,
+                 insert_pattern='INSERT_DARMS_LOTE_{n:03d}.sql',
+                 check_pattern='CHECK_GUIAS_LOTE_{n:03d}.sql', encoding='latin1',
+                 max_statement_bytes=None, check_chunk_size=CHECK_CHUNK_SIZE):
+        self.output_dir = Path(output_dir)
+        self.batch_size = max(1, batch_size)
+        self.max_statement_bytes = max_statement_bytes
+        self.check_chunk_size = check_chunk_size
+        self.rows_per_file = max(self.batch_size, rows_per_file)
+        self.write_checks = write_checks
+        self.insert_pattern = insert_pattern
+        self.check_pattern = check_pattern
+        self.encoding = encoding
+
+        self.rows = []          # Linhas do statement em montagem
+        self.row_guias = []     # (guia, exercício) das linhas em montagem
+        self.guias = []         # (guia, exercício) do arquivo aberto, para a verificação do lote
+        self.files = []         # Arquivos gerados, na ordem
+        self.total_rows = 0
+        self._insert_file = None
+        self._check_file = None
+        self._rows_in_file = 0
+        self._file_count = 0
+
+    @property
+    def row_count(self):
+        """Linhas recebidas até agora (gravadas + em montagem)"""
+        return self.total_rows + len(self.rows)
+
+    def remove_previous_files(self):
+        """Apagar os arquivos de lote de uma execução anterior (evita sobras se o lote diminuiu)"""
+        for pattern in (self.insert_pattern, self.check_pattern):
+            prefix = pattern.split('{', 1)[0]
+            for old_file in self.output_dir.glob(f'{prefix}*.sql'):
+                old_file.unlink()
+
+    def add(self, values_row, numero_guia, exercicio=None):
+        """Acrescentar uma linha "(...)" ao lote; grava o statement quando ele chega a batch_size linhas"""
+        self.rows.append(values_row)
+        if numero_guia:
+            self.row_guias.append((numero_guia, exercicio))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Gravar o statement em montagem (se houver linhas)"""
+        if not self.rows:
+            return
+
+        if self._insert_file is None or self._rows_in_file >= self.rows_per_file:
+            self._open_next_files()
+
+        for statement in split_statements(self.rows, max_bytes=self.max_statement_bytes,
+                                          encoding=self.encoding):
+            self._insert_file.write(statement + '\n\n')
+        self.guias.extend(self.row_guias)
+
+        self._rows_in_file += len(self.rows)
+        self.total_rows += len(self.rows)
+        self.rows = []
+        self.row_guias = []
+
+    def close(self):
+        """Gravar o que falta e fechar os arquivos; devolve a lista de arquivos gerados"""
+        try:
+            self.flush()
+        finally:
+            self._close_files()
+        return self.files
+
+    def _write_checks(self):
+        """Verificação das guias do arquivo aberto: uma consulta por lote, em blocos de NR_GUIA IN (...)"""
+        if self._check_file is not None:
+            for statement in existence_check_statements(self.guias, chunk_size=self.check_chunk_size,
+                                                        max_bytes=self.max_statement_bytes):
+                self._check_file.write(statement + '\n')
+        self.guias = []
+
+    def _open_next_files(self):
+        """Fechar os arquivos atuais e abrir o próximo par (INSERT + verificação)"""
+        self._close_files()
+        self._file_count += 1
+        n = self._file_count
+
+        insert_name = self.insert_pattern.format(n=n)
+        self._insert_file = open(self.output_dir / insert_name, 'w', encoding=self.encoding)
+        self._insert_file.write('use silfae;\n\n')
+        self.files.append(insert_name)
+
+        if self.write_checks:
+            check_name = self.check_pattern.format(n=n)
+            self._check_file = open(self.output_dir / check_name, 'w', encoding=self.encoding)
+            self._check_file.write('use silfae;\n\n')
+            self.files.append(check_name)
+
+        self._rows_in_file = 0
+
+    def _close_files(self):
+        self._write_checks()
+        for f in (self._insert_file, self._check_file):
+            if f is not None:
+                f.close()
+        self._insert_file = None
+        self._check_file = None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste dos arquivos SQL em lote (INSERTs de várias linhas em poucos arquivos)
+"""
+
+import asyncio
+import re
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor
+from fixtures_darm import criar_pdf_texto, linhas_darm
+from sql_output import BatchedSqlWriter
+
+
+async def executar_em_lote(base_dir):
+    """Processar a pasta só com arquivos de lote (sem arquivos por guia)"""
+    processor = DarmProcessor()
+    processor.darms_dir = Path(base_dir) / 'darms'
+    processor.output_dir = Path(base_dir) / 'inserts'
+    processor.parallel_processing = False
+    processor.use_cache = False
+    processor.generate_individual_files = False
+    processor.generate_check_files = True
+    processor.generate_batch_files = True
+    processor.batch_size = 2
+    await processor.init()
+    await processor.process_darms()
+    return processor
+
+
+def test_writer_divide_statements_e_arquivos():
+    """batch_size linhas por INSERT e rows_per_file linhas por arquivo"""
+    print("=== TESTE DO WRITER DE LOTES ===\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        writer = BatchedSqlWriter(temp_dir, batch_size=2, rows_per_file=4)
+        for guia in range(1, 6):
+            writer.add(f'(NULL, {guia})', str(guia))
+        files = writer.close()
+
+        assert files == ['INSERT_DARMS_LOTE_001.sql', 'CHECK_GUIAS_LOTE_001.sql',
+                         'INSERT_DARMS_LOTE_002.sql', 'CHECK_GUIAS_LOTE_002.sql']
+        primeiro = (Path(temp_dir) / 'INSERT_DARMS_LOTE_001.sql').read_text(encoding='latin1')
+        assert primeiro.startswith('use silfae;')
+        assert primeiro.count('INSERT INTO FarrDarmsPagos') == 2
+        assert '(NULL, 1),\n    (NULL, 2);' in primeiro
+
+        # Uma consulta por arquivo de lote, com todas as guias do arquivo
+        checks = (Path(temp_dir) / 'CHECK_GUIAS_LOTE_001.sql').read_text(encoding='latin1')
+        assert checks.count('SELECT') == 1 and 'AND NR_GUIA IN (1, 2, 3, 4);' in checks
+        segundo = (Path(temp_dir) / 'CHECK_GUIAS_LOTE_002.sql').read_text(encoding='latin1')
+        assert 'AND NR_GUIA IN (5);' in segundo
+        assert writer.total_rows == 5
+
+    print("✅ Statements e arquivos divididos corretamente")
+
+
+def test_writer_respeita_check_chunk_size():
+    """A verificação do lote usa blocos de check_chunk_size guias"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        writer = BatchedSqlWriter(temp_dir, batch_size=2, rows_per_file=4, check_chunk_size=3)
+        for guia in range(1, 5):
+            writer.add(f'(NULL, {guia})', str(guia))
+        writer.close()
+
+        checks = (Path(temp_dir) / 'CHECK_GUIAS_LOTE_001.sql').read_text(encoding='latin1')
+        assert checks.count('SELECT') == 2
+        assert 'AND NR_GUIA IN (1, 2, 3);' in checks and 'AND NR_GUIA IN (4);' in checks
+
+    print("✅ Verificação do lote dividida em blocos de check_chunk_size")
+
+
+def test_processador_em_lote():
+    """Sem arquivos por guia; as linhas dos lotes são as mesmas do arquivo consolidado"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ['0000031', '0000032', '0000033']:
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        # Sobra de uma execução anterior com mais lotes
+        (Path(temp_dir) / 'inserts').mkdir()
+        (Path(temp_dir) / 'inserts' / 'INSERT_DARMS_LOTE_009.sql').write_text('antigo', encoding='latin1')
+
+        asyncio.run(executar_em_lote(temp_dir))
+        output_dir = Path(temp_dir) / 'inserts'
+
+        assert not list(output_dir.glob('INSERT_DARM_PAGO_*.sql'))
+        assert not list(output_dir.glob('CHECK_GUIA_*.sql'))
+        assert sorted(f.name for f in output_dir.glob('*_LOTE_*.sql')) == [
+            'CHECK_GUIAS_LOTE_001.sql', 'INSERT_DARMS_LOTE_001.sql']
+
+        lote = (output_dir / 'INSERT_DARMS_LOTE_001.sql').read_text(encoding='latin1')
+        consolidado = (output_dir / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        linhas = re.compile(r'\(NULL, .*?\)(?=[,;])')
+        assert lote.count('INSERT INTO FarrDarmsPagos') == 2
+        assert linhas.findall(lote) == linhas.findall(consolidado)
+
+    print("✅ Arquivos de lote gerados pelo processador")
+
+
+if __name__ == "__main__":
+    test_writer_divide_statements_e_arquivos()
+    test_writer_respeita_check_chunk_size()
+    test_processador_em_lote()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do código de barras / linha digitável do DARM (FEBRABAN, arrecadação)
+"""
+
+import contextlib
+import io
+from unittest import mock
+
+import numpy as np
+
+from darm_barcode import BarcodeDecoder, barcode_from_line, check_digit, is_valid_barcode, line_from_barcode, mod10, mod11
+from darm_processor import DarmProcessor
+from fixtures_darm import dados_tesseract, linhas_darm
+from ocr_engines import PytesseractEngine
+
+
+def montar_codigo(corpo):
+    """Código de 44 dígitos a partir dos 43 dígitos sem o DV geral (posição 4)"""
+    return corpo[:3] + str(check_digit(corpo, corpo[2])) + corpo[3:]
+
+
+# Segmento 1 (prefeituras), valor em reais por módulo 10 e por módulo 11: R$ 3.205,00
+CODIGO_MOD10 = montar_codigo('816' + '00000320500' + '0123' + '0301548300001542025071000')
+CODIGO_MOD11 = montar_codigo('818' + '00000320500' + '0123' + '0301548300001542025071000')
+
+
+def linha_formatada(linha):
+    """Linha digitável como impressa no DARM: "81600000003-1 20500012303-0 ..." """
+    return ' '.join(f'{linha[i:i + 11]}-{linha[i + 11]}' for i in range(0, 48, 12))
+
+
+def test_digitos_verificadores():
+    """Exemplos clássicos do manual: 261533 -> módulo 10 = 4, módulo 11 = 9"""
+    print("=== TESTE DO CÓDIGO DE BARRAS ===\n")
+    assert mod10('261533') == 4
+    assert mod11('261533') == 9
+    assert mod11('0') == 0  # Restos 0 e 1 dão DV 0
+
+    for codigo in (CODIGO_MOD10, CODIGO_MOD11):
+        assert is_valid_barcode(codigo)
+        linha = line_from_barcode(codigo)
+        assert len(linha) == 48 and barcode_from_line(linha) == codigo
+
+        # Qualquer dígito trocado invalida a linha
+        for posicao in (0, 5, 13, 30, 47):
+            trocado = linha[:posicao] + str((int(linha[posicao]) + 1) % 10) + linha[posicao + 1:]
+            assert barcode_from_line(trocado) is None
+    print("✅ Dígitos verificadores módulo 10 e módulo 11")
+
+
+def test_decodificacao():
+    """Valor em reais só nos identificadores 6 e 8; campos do campo livre mapeados"""
+    decoder = BarcodeDecoder()
+    linha = line_from_barcode(CODIGO_MOD10)
+    assert decoder.decode(linha) == {'codigoBarras': linha, 'valorTotal': '3.205,00'}
+    assert decoder.decode(CODIGO_MOD11)['codigoBarras'] == line_from_barcode(CODIGO_MOD11)
+
+    referencia = montar_codigo('817' + CODIGO_MOD10[4:])  # Valor de referência (não é em reais)
+    assert 'valorTotal' not in decoder.decode(referencia)
+
+    # Campos sintéticos de teste não validam
+    assert decoder.decode('012623020301548303100720250420250500001490632050') is None
+    assert decoder.decode('0' * 48) is None
+
+    mapeado = BarcodeDecoder({'inscricao': [19, 27], 'numeroGuia': [27, 34]})
+    dados = mapeado.decode(linha)
+    assert dados['inscricao'] == '03015483' and dados['numeroGuia'] == '154'
+
+    # Linha impressa no texto, com hífens e espaços
+    texto = f'Autenticação bancária\n{linha_formatada(linha)}\nPague até o vencimento'
+    assert decoder.find_in_text(texto)['codigoBarras'] == linha
+    assert decoder.find_in_text(f'codigo {CODIGO_MOD10} fim')['valorTotal'] == '3.205,00'
+    assert decoder.find_in_text('8' * 48) is None
+    print("✅ Linha digitável decodificada")
+
+
+def test_valor_do_codigo_de_barras():
+    """O valor total lido pelo OCR é corrigido pelo código de barras validado"""
+    linha = line_from_barcode(CODIGO_MOD10)
+    texto = '\n'.join(linhas_darm(guia='0000154', valor='3.206,00')) + f'\n{linha_formatada(linha)}\n'
+    processor = DarmProcessor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dados = processor.extract_darm_data(texto)
+    assert dados['valorTotal'] == '3.205,00'
+    assert dados['valorPrincipal'] == '3.206,00'
+    assert dados['codigoBarras'] == linha
+
+    # Sem código de barras válido, nada muda
+    with contextlib.redirect_stdout(io.StringIO()):
+        dados = processor.extract_darm_data('\n'.join(linhas_darm(valor='3.206,00')))
+    assert dados['valorTotal'] == '3.206,00' and 'codigoBarras' not in dados
+    print("✅ Valor total vindo do código de barras")
+
+
+def test_ocr_dispensado_pelo_codigo_de_barras():
+    """Com os campos obrigatórios no código de barras, a página não passa pelo Tesseract"""
+    processor = DarmProcessor()
+    processor.ocr_engine = PytesseractEngine()
+    processor.barcode = BarcodeDecoder({'inscricao': [19, 27], 'numeroGuia': [27, 34]})
+    pagina = np.zeros((100, 100), dtype=np.uint8)
+    with mock.patch.object(processor.barcode, 'read_image', return_value=processor.barcode.decode(CODIGO_MOD10)), \
+            mock.patch('pytesseract.image_to_string') as tesseract, \
+            mock.patch('pytesseract.image_to_data') as palavras, \
+            contextlib.redirect_stdout(io.StringIO()):
+        texto = processor.ocr_processed_image(pagina)
+        dados = processor.extract_darm_data(texto)
+    tesseract.assert_not_called()
+    palavras.assert_not_called()
+    assert dados['inscricao'] == '03015483' and dados['numeroGuia'] == '154'
+    assert dados['valorTotal'] == '3.205,00'
+
+    # Só com o valor no código de barras: o OCR da página continua, com o código de barras no texto
+    processor.barcode = BarcodeDecoder()
+    with mock.patch.object(processor.barcode, 'read_image', return_value=processor.barcode.decode(CODIGO_MOD10)), \
+            mock.patch('pytesseract.image_to_data', return_value=dados_tesseract('TEXTO DA PAGINA')) as tesseract, \
+            contextlib.redirect_stdout(io.StringIO()):
+        texto = processor.ocr_processed_image(pagina)
+    assert tesseract.call_count == 1
+    assert texto.endswith('TEXTO DA PAGINA\n') and line_from_barcode(CODIGO_MOD10) in texto
+    print("✅ OCR dispensado quando o código de barras basta")
+
+
+if __name__ == "__main__":
+    test_digitos_verificadores()
+    test_decodificacao()
+    test_valor_do_codigo_de_barras()
+    test_ocr_dispensado_pelo_codigo_de_barras()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do OCR com confiança por campo: só os campos fracos são relidos
+"""
+
+import contextlib
+import io
+
+import numpy as np
+
+from ocr_confidence import ConfidentOcr, layout_words, match_words
+from ocr_engines import OcrWord
+from fixtures_darm import linhas_darm
+
+
+def palavras(linhas, confiancas=None):
+    """Uma palavra por linha do formulário (rótulos quebrados em palavras), com caixas em linhas de 20 px"""
+    confiancas = confiancas or {}
+    words = []
+    for numero, linha in enumerate(linhas, start=1):
+        for coluna, texto in enumerate(linha.split()):
+            words.append(OcrWord(texto, confiancas.get(texto, 95.0), 10 + 100 * coluna, 20 * numero, 90, 18,
+                                 (1, 1, numero)))
+    return words
+
+
+class MotorFalso:
+    """Motor de OCR de teste: a página devolve `pagina`; as releituras, `releitura`"""
+
+    def __init__(self, pagina, releitura=None):
+        self.pagina = pagina
+        self.releitura = releitura or []
+        self.configs = []
+
+    def image_to_data(self, image, lang='por', config=''):
+        if not config:
+            return self.pagina
+        self.configs.append((config, image.shape))
+        return self.releitura
+
+
+def ler(motor, **kwargs):
+    reader = ConfidentOcr(motor, threshold=60, reread_configs={'inscricao': '--psm 7 -c x=1'}, scale=1, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return reader.read(np.zeros((400, 400), dtype=np.uint8))
+
+
+def test_texto_montado_das_palavras():
+    """O texto segue as linhas do OCR; cada campo acha as suas palavras depois do rótulo"""
+    print("=== TESTE DA CONFIANÇA POR CAMPO ===\n")
+    words = palavras(linhas_darm())
+    text, starts = layout_words(words)
+    assert text == '\n'.join(linhas_darm()) + '\n'
+    assert [words[index].text for index in match_words(words, starts, '149')] == ['0000149']
+    assert match_words(words, starts, '99999') == []
+
+    divididas = [OcrWord(grupo, 90.0, 0, 0, 10, 10, (1, 1, 1)) for grupo in ('81690000000', '4', '32050000000')]
+    text, starts = layout_words(divididas)
+    assert match_words(divididas, starts, '81690000000' '4' '32050000000') == [0, 2]
+
+
+def test_campos_confiaveis_nao_sao_relidos():
+    """Todos os campos acima do limite: uma única passada do OCR"""
+    motor = MotorFalso(palavras(linhas_darm()))
+    text, confidences = ler(motor)
+    assert text == '\n'.join(linhas_darm()) + '\n'
+    assert confidences['inscricao'] == 95.0 and confidences['numeroGuia'] == 95.0
+    assert motor.configs == []
+
+
+def test_campo_fraco_relido_com_a_configuracao_do_campo():
+    """Inscrição com confiança baixa: só a caixa dela é relida, e a releitura mais confiável entra no texto"""
+    motor = MotorFalso(palavras(linhas_darm(inscricao='03015488'), {'03015488': 31.0}),
+                       [OcrWord('0301', 88.0, 0, 0, 5, 5, (1, 1, 1)), OcrWord('5483', 92.0, 6, 0, 5, 5, (1, 1, 1))])
+    text, confidences = ler(motor)
+    assert '02. INSCRIÇÃO MUNICIPAL\n03015483\n' in text
+    assert confidences['inscricao'] == 88.0
+    assert len(motor.configs) == 1 and motor.configs[0][0] == '--psm 7 -c x=1'
+    print("✅ Campo fraco relido")
+
+
+def test_releitura_pior_e_descartada():
+    """Releitura menos confiável (ou desativada) mantém o valor e a confiança originais"""
+    pagina = palavras(linhas_darm(), {'03015483': 40.0})
+    text, confidences = ler(MotorFalso(pagina, [OcrWord('0301', 20.0, 0, 0, 5, 5, (1, 1, 1))]))
+    assert '\n03015483\n' in text and confidences['inscricao'] == 40.0
+
+    motor = MotorFalso(pagina, [OcrWord('03015483', 99.0, 0, 0, 5, 5, (1, 1, 1))])
+    text, confidences = ler(motor, reread=False)
+    assert confidences['inscricao'] == 40.0 and motor.configs == []
+
+
+if __name__ == "__main__":
+    test_texto_montado_das_palavras()
+    test_campos_confiaveis_nao_sao_relidos()
+    test_campo_fraco_relido_com_a_configuracao_do_campo()
+    test_releitura_pior_e_descartada()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da gravação em streaming do arquivo único (INSERT_TODOS_DARMs.sql)
+"""
+
+import asyncio
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor
+from fixtures_darm import criar_pdf_texto, linhas_darm
+from sql_output import StreamingSqlFile, split_statements
+
+LINHAS = [f"(NULL, 2025, 70, 37, 0, 730, 1, {n}, 2623, 'X')" for n in range(1, 26)]
+
+
+def test_streaming_igual_a_divisao_em_memoria():
+    """O arquivo gravado linha a linha é idêntico ao montado com split_statements"""
+    print("=== TESTE DO ARQUIVO ÚNICO EM STREAMING ===\n")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'INSERT_TODOS_DARMs.sql'
+        writer = StreamingSqlFile(path, max_rows=10, max_bytes=2500)
+        for row in LINHAS:
+            writer.add(row)
+            assert not path.exists()  # Até a finalização só existe o temporário
+        assert writer.close()
+
+        esperado = 'use silfae;\n\n' + '\n\n'.join(split_statements(LINHAS, 10, 2500))
+        assert path.read_text(encoding='latin1') == esperado
+        assert writer.statement_count == esperado.count('INSERT INTO')
+        assert not writer.tmp_path.exists()
+    print("✅ Conteúdo idêntico ao da divisão em memória")
+
+
+def test_interrupcao_mantem_arquivo_anterior():
+    """Abortar (ou não ter linhas) não toca no arquivo da execução anterior"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'INSERT_TODOS_DARMs.sql'
+        path.write_text('anterior', encoding='latin1')
+
+        writer = StreamingSqlFile(path)
+        writer.add(LINHAS[0])
+        writer.abort()
+        assert path.read_text(encoding='latin1') == 'anterior'
+        assert not writer.tmp_path.exists()
+
+        assert not StreamingSqlFile(path).close()
+        assert path.read_text(encoding='latin1') == 'anterior'
+    print("✅ Arquivo anterior preservado")
+
+
+def test_processamento_nao_acumula_registros():
+    """No process_darms() as linhas vão direto para o arquivo, sem ficar em memória"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ('0000031', '0000032', '0000033'):
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        processor = DarmProcessor()
+        processor.darms_dir = darms_dir
+        processor.output_dir = Path(temp_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = False
+        processor.incremental = False
+
+        async def processar():
+            await processor.init()
+            await processor.process_darms()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(processar())
+
+        assert processor.records == []
+        assert processor.record_count == 3
+        content = (processor.output_dir / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        assert content.count("'FARR'") == 3 and content.endswith(';')
+        assert not (processor.output_dir / 'INSERT_TODOS_DARMs.sql.tmp').exists()
+    print("✅ Registros não acumulados em memória")
+
+
+if __name__ == "__main__":
+    test_streaming_igual_a_divisao_em_memoria()
+    test_interrupcao_mantem_arquivo_anterior()
+    test_processamento_nao_acumula_registros()
@@ -4,9 +4,15 @@
 Script para testar compatibilidade com ControlM
 """
 
+import asyncio
+import contextlib
+import io
 import re
+import tempfile
 from pathlib import Path
 
+from config import OUTPUT_CONFIG
+
 def test_controlm_compatibility():
     """Testar compatibilidade com ControlM"""
     
@@ -142,6 +148,60 @@ def test_controlm_compatibility():
     print("\n🎉 Todos os testes de compatibilidade com ControlM passaram!")
     return True
 
+def check_statement_limits(content, max_rows, max_bytes, encoding='latin1'):
+    """Verificar se cada INSERT do arquivo respeita o limite de linhas e de bytes
+
+    Devolve a lista com o número de linhas de cada statement.
+    """
+    statements = [s.rstrip(';') + ';' for s in content.split(';\n\n') if s.startswith('INSERT INTO')]
+    rows_per_statement = []
+    for i, statement in enumerate(statements, 1):
+        rows = statement.count('\n    (NULL')
+        size = len(statement.encode(encoding))
+        print(f"   📊 Statement {i}: {rows} linhas, {size} bytes")
+        assert rows <= max_rows, f"Statement {i} com {rows} linhas (máximo {max_rows})"
+        assert size <= max_bytes, f"Statement {i} com {size} bytes (máximo {max_bytes})"
+        rows_per_statement.append(rows)
+    return rows_per_statement
+
+def test_controlm_statement_limits():
+    """O arquivo único é dividido em INSERTs dentro dos limites de linhas e de bytes"""
+    from darm_processor import DarmProcessor
+
+    print("🔍 Testando limites por statement...")
+    max_rows, max_bytes = 10, 2500
+    original = (OUTPUT_CONFIG['max_rows_per_statement'], OUTPUT_CONFIG['max_statement_bytes'])
+    OUTPUT_CONFIG['max_rows_per_statement'], OUTPUT_CONFIG['max_statement_bytes'] = max_rows, max_bytes
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            processor = DarmProcessor()
+            processor.output_dir = Path(temp_dir)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for guia in range(1, 26):
+                    processor.records.append(processor.build_record({
+                        'inscricao': '03015483', 'numeroGuia': str(guia), 'valorPrincipal': '32,05',
+                        'dataVencimento': '10/07/2025', 'exercicio': '2025', 'codigoReceita': '262-3',
+                        'codigoBarras': '0' * 48,
+                    }))
+                asyncio.run(processor.generate_single_sql_file())
+
+            files = list(Path(temp_dir).glob('*.sql'))
+            assert [f.name for f in files] == ['INSERT_TODOS_DARMs.sql']
+            content = files[0].read_text(encoding='latin1')
+    finally:
+        OUTPUT_CONFIG['max_rows_per_statement'], OUTPUT_CONFIG['max_statement_bytes'] = original
+
+    assert content.startswith('use silfae;') and content.count('use silfae;') == 1
+    content.encode('latin1')
+    rows_per_statement = check_statement_limits(content, max_rows, max_bytes)
+    assert sum(rows_per_statement) == 25
+    assert len(rows_per_statement) > 25 // max_rows  # O limite de bytes também dividiu
+
+    sq_docs = re.findall(r"730, 1, (\d+), 2623", content)
+    assert len(sq_docs) == len(set(sq_docs)) == 25
+    print("   ✅ Todos os statements dentro dos limites")
+
 def generate_controlm_optimized_version():
     """Gerar versão otimizada para ControlM"""
     
@@ -164,6 +224,7 @@ def generate_controlm_optimized_version():
 
 if __name__ == "__main__":
     print("🧪 Testando compatibilidade com ControlM...")
+    test_controlm_statement_limits()
     if test_controlm_compatibility():
         print("\n📄 Gerando versão otimizada para ControlM...")
         generate_controlm_optimized_version()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do DPI adaptativo: OCR primeiro em baixa resolução, mais DPI só quando falta campo
+"""
+
+import asyncio
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from darm_barcode import line_from_barcode
+from darm_processor import DarmProcessor
+from fixtures_darm import linhas_darm
+from processing_manifest import ProcessingManifest
+from test_codigo_barras import CODIGO_MOD10
+
+TEXTO_DARM = '\n'.join(linhas_darm(guia='0000081'))
+SEM_GUIA = TEXTO_DARM.replace('05. GUIA NØ\n0000081', '')
+
+
+class ProcessadorPorDpi(DarmProcessor):
+    """Processador com o OCR substituído por textos fixos conforme o DPI"""
+
+    def __init__(self, textos):
+        super().__init__()
+        self.textos = textos
+        self.dpis = []
+        self.ocr_dpi = 300
+        self.ocr_dpi_tiers = [150, 200, 300]
+        self.ocr_page_workers = 1
+
+    def iter_pdf_page_images(self, filepath, total_pages, dpi=None):
+        self.dpis.append(dpi)
+        yield 1, mock.Mock(dpi=dpi)
+
+    def ocr_page_image(self, image):
+        return self.textos[image.dpi]
+
+
+def ocr(processor):
+    with mock.patch('darm_processor.pdfinfo_from_path', return_value={'Pages': 1}), \
+            contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(processor.extract_text_from_pdf_with_ocr(Path('ESCANEADO.pdf')))
+
+
+def test_para_no_primeiro_dpi_suficiente():
+    """Documento legível a 150 DPI não é rasterizado de novo"""
+    print("=== TESTE DO DPI ADAPTATIVO ===\n")
+    processor = ProcessadorPorDpi({150: TEXTO_DARM, 200: TEXTO_DARM, 300: TEXTO_DARM})
+    assert ocr(processor) == TEXTO_DARM + '\n'
+    assert processor.dpis == [150] and processor.last_ocr_dpi == 150
+
+
+def test_sobe_quando_falta_ou_falha_campo():
+    """Campo ausente ou inválido (data, linha digitável) leva ao DPI seguinte"""
+    linha = line_from_barcode(CODIGO_MOD10)
+    linha_errada = linha[:20] + str((int(linha[20]) + 1) % 10) + linha[21:]
+    processor = ProcessadorPorDpi({
+        150: SEM_GUIA,
+        200: TEXTO_DARM + f'\nCódigo de Barras: {linha_errada}',
+        300: TEXTO_DARM + f'\nCódigo de Barras: {linha}',
+    })
+    assert ocr(processor).endswith(linha + '\n')
+    assert processor.dpis == [150, 200, 300] and processor.last_ocr_dpi == 300
+
+    processor = ProcessadorPorDpi({150: TEXTO_DARM.replace('10/07/2025', '10/97/2025'), 200: TEXTO_DARM})
+    ocr(processor)
+    assert processor.dpis == [150, 200] and processor.last_ocr_dpi == 200
+
+    # No último DPI o texto é usado mesmo incompleto
+    processor = ProcessadorPorDpi({150: SEM_GUIA, 200: SEM_GUIA, 300: SEM_GUIA})
+    assert ocr(processor) == SEM_GUIA + '\n' and processor.last_ocr_dpi == 300
+    print("✅ DPI maior só quando necessário")
+
+
+def test_dpi_registrado_por_documento():
+    """O DPI que cada documento precisou vai para o resultado, o manifesto e o resumo"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / 'ESCANEADO.pdf'
+        pdf_path.write_bytes(b'%PDF-1.4 escaneado')
+
+        processor = ProcessadorPorDpi({150: SEM_GUIA, 200: TEXTO_DARM})
+        processor.use_cache = False
+        processor.generate_individual_files = False
+        processor.generate_check_files = False
+        processor.output_dir = Path(temp_dir)
+        processor.manifest = ProcessingManifest(Path(temp_dir) / '.manifest.json')
+        with mock.patch.object(processor.pdf_text, 'extract', return_value=('', None)), \
+                mock.patch('darm_processor.pdfinfo_from_path', return_value={'Pages': 1}), \
+                mock.patch('darm_processor.OCR_AVAILABLE', True), \
+                contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(processor.process_file(pdf_path, 'pdf'))
+
+        assert processor.ocr_dpi_counts == {200: 1}
+        assert processor.manifest.entries['ESCANEADO.pdf']['ocr_dpi'] == 200
+    print("✅ DPI registrado por documento")
+
+
+if __name__ == "__main__":
+    test_para_no_primeiro_dpi_suficiente()
+    test_sobe_quando_falta_ou_falha_campo()
+    test_dpi_registrado_por_documento()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da detecção de duplicatas (hash perceptual da imagem e impressão digital dos campos)
+"""
+
+import asyncio
+import json
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from darm_processor import DarmProcessor
+from duplicate_detection import DuplicateIndex, difference_hash, hamming_distance, text_fingerprint
+from fixtures_darm import criar_pdf_texto, linhas_darm
+
+DADOS = {'inscricao': '03015483', 'numeroGuia': '149', 'exercicio': '2025',
+         'dataVencimento': '10/07/2025', 'valorTotal': '32,05'}
+
+
+def test_hash_perceptual():
+    """Reescaneamento com ruído fica perto do original; outra página fica longe"""
+    print("=== TESTE DE DUPLICATAS ===\n")
+    gerador = np.random.default_rng(7)
+    pagina = gerador.integers(0, 256, (280, 200)).astype(np.uint8)
+    ruido = np.clip(pagina.astype(int) + gerador.integers(-3, 4, pagina.shape), 0, 255).astype(np.uint8)
+    outra = gerador.integers(0, 256, (280, 200)).astype(np.uint8)
+
+    original = difference_hash(pagina)
+    assert original < 1 << 256
+    assert hamming_distance(original, difference_hash(ruido)) <= 8
+    assert hamming_distance(original, difference_hash(outra)) > 8
+
+
+def test_indice_de_hashes():
+    """Hashes a até max_distance bits são candidatos; a cópia confirmada entra no grupo do original"""
+    index = DuplicateIndex(hash_bits=64, max_distance=3)
+    original = 0x0123456789ABCDEF
+    assert index.image_candidates(original) == []
+    index.add_image('ORIGINAL.pdf', original)
+    index.add_image('VIZINHO.pdf', original ^ 0b1)
+    assert index.image_candidates(original ^ 0b10000000001) == [('VIZINHO.pdf', 1), ('ORIGINAL.pdf', 2)]
+    assert index.image_candidates(original ^ 0xF0F0) == []
+    assert index.groups() == {}  # Candidato não é cópia
+
+    index.mark_duplicate('SCAN.pdf', 'ORIGINAL.pdf', 'imagem', 2)
+    index.mark_duplicate('FOTO.jpg', 'ORIGINAL.pdf', 'imagem', 3)
+    assert index.groups() == {'ORIGINAL.pdf': [{'file': 'SCAN.pdf', 'method': 'imagem', 'distance': 2},
+                                               {'file': 'FOTO.jpg', 'method': 'imagem', 'distance': 3}]}
+
+
+def test_impressao_digital_dos_campos():
+    """Mesmos campos com outra formatação: mesma impressão digital"""
+    formatado = dict(DADOS, numeroGuia='0000149', valorTotal='R$ 32,05', codigoBarras='816900000004')
+    assert text_fingerprint(DADOS) == text_fingerprint(formatado)
+    assert text_fingerprint(dict(DADOS, numeroGuia='150')) != text_fingerprint(DADOS)
+    assert text_fingerprint({'inscricao': '03015483'}) is None
+
+    index = DuplicateIndex()
+    assert index.add_text('A.pdf', text_fingerprint(DADOS)) is None
+    assert index.add_text('A.pdf', text_fingerprint(DADOS)) is None  # O próprio arquivo
+    assert index.add_text('B.png', text_fingerprint(formatado)) == 'A.pdf'
+    assert index.add_text('C.pdf', None) is None
+
+
+def test_processador_pula_copias():
+    """O mesmo DARM em dois arquivos gera um único INSERT e o grupo vai para o relatório"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        criar_pdf_texto(darms_dir / 'DARM_A.pdf', [linhas_darm(guia='0000031')])
+        criar_pdf_texto(darms_dir / 'DARM_B_reescaneado.pdf', [linhas_darm(guia='0000031')])
+        criar_pdf_texto(darms_dir / 'DARM_C.pdf', [linhas_darm(guia='0000032')])
+
+        processor = DarmProcessor()
+        processor.darms_dir = darms_dir
+        processor.output_dir = Path(temp_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = False
+        processor.dedup = True
+        asyncio.run(processor.init())
+        asyncio.run(processor.process_darms())
+
+        content = (processor.output_dir / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        assert sorted(re.findall(r"'\d{8}', (\d+), ", content)) == ['31', '32']
+        assert processor.skipped_duplicates == 1
+        groups = json.loads((processor.output_dir / 'DUPLICATAS.json').read_text(encoding='utf8'))
+        assert [copy['file'] for copy in groups['DARM_A.pdf']] == ['DARM_B_reescaneado.pdf']
+    print("✅ Duplicatas detectadas")
+
+
+def test_mesmo_formulario_nao_e_copia():
+    """Hash de imagem igual (mesmo formulário) só pula o arquivo se inscrição, guia e valor também forem iguais"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        criar_pdf_texto(darms_dir / 'DARM_A.pdf', [linhas_darm(guia='0000149', valor='32,05')])
+        criar_pdf_texto(darms_dir / 'DARM_B.pdf', [linhas_darm(guia='0000871', valor='1.904,77',
+                                                               inscricao='04127730')])
+        criar_pdf_texto(darms_dir / 'DARM_C_copia.pdf', [linhas_darm(guia='0000149', valor='32,05')])
+
+        processor = DarmProcessor()
+        processor.darms_dir = darms_dir
+        processor.output_dir = Path(temp_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = False
+        processor.dedup = True
+        # dHash de 256 bits a 24 DPI: DARMs diferentes do mesmo modelo ficam a distância 0
+        with mock.patch.object(processor, 'image_hash', return_value=0x1234), \
+                mock.patch('darm_processor.OCR_AVAILABLE', True):
+            asyncio.run(processor.init())
+            asyncio.run(processor.process_darms())
+
+        content = (processor.output_dir / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        assert re.findall(r"'\d{8}', (\d+), ", content) == ['149', '871']
+        assert processor.skipped_duplicates == 1
+        assert processor.duplicate_index.duplicates == {
+            'DARM_C_copia.pdf': {'original': 'DARM_A.pdf', 'method': 'imagem', 'distance': 0}}
+    print("✅ DARMs diferentes do mesmo formulário mantidos")
+
+
+if __name__ == "__main__":
+    test_hash_perceptual()
+    test_indice_de_hashes()
+    test_impressao_digital_dos_campos()
+    test_processador_pula_copias()
+    test_mesmo_formulario_nao_e_copia()
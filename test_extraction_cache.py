@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do cache de extração endereçado por conteúdo
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor, parse_args
+from extraction_cache import ExtractionCache
+from fixtures_darm import criar_pdf_texto, linhas_darm
+
+
+def test_cache_chave_por_conteudo_e_configuracao():
+    """A chave muda com o conteúdo do arquivo e com as configurações de extração"""
+    print("=== TESTE DE CHAVE DO CACHE ===\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_a = criar_pdf_texto(Path(temp_dir) / 'a.pdf', [linhas_darm(guia='0000001')])
+        pdf_b = criar_pdf_texto(Path(temp_dir) / 'b.pdf', [linhas_darm(guia='0000002')])
+        copia_a = criar_pdf_texto(Path(temp_dir) / 'copia_a.pdf', [linhas_darm(guia='0000001')])
+
+        cache = ExtractionCache(Path(temp_dir) / '.cache', settings={'dpi': 300})
+        outro = ExtractionCache(Path(temp_dir) / '.cache', settings={'dpi': 200})
+
+        assert cache.key_for(pdf_a, 'pdf') == cache.key_for(copia_a, 'pdf')
+        assert cache.key_for(pdf_a, 'pdf') != cache.key_for(pdf_b, 'pdf')
+        assert cache.key_for(pdf_a, 'pdf') != outro.key_for(pdf_a, 'pdf')
+
+        key = cache.key_for(pdf_a, 'pdf')
+        assert cache.get(key) is None
+        cache.put(key, {'text': 'texto', 'darm_data': {'numeroGuia': '1'}})
+        assert cache.get(key) == {'text': 'texto', 'darm_data': {'numeroGuia': '1'}}
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # DPI e confiança do OCR voltam junto com a extração
+        ocr = {'text': 'scan', 'darm_data': {'numeroGuia': '2'}, 'ocr_dpi': 200,
+               'ocr_confidence': {'numeroGuia': 91.5}}
+        cache.put('scan', ocr)
+        assert cache.get('scan') == ocr
+        cache.close()
+        outro.close()
+
+    print("✅ Chave do cache válida")
+
+
+def test_cache_remove_entradas_menos_usadas():
+    """Ao passar do limite de tamanho, as entradas acessadas há mais tempo saem primeiro"""
+    print("=== TESTE DE LIMITE DO CACHE ===\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(Path(temp_dir), max_size_mb=0.01)  # ~10 KB
+        for i in range(10):
+            cache.put(f'chave{i}', {'text': 'x' * 2000, 'darm_data': None})
+            cache.get('chave0')  # Mantém a primeira entrada "quente"
+
+        assert cache._total_size() <= cache.max_size_bytes
+        assert cache.get('chave0') is not None
+        assert cache.get('chave9') is not None
+        assert cache.get('chave1') is None
+        cache.close()
+
+    print("✅ Limite de tamanho respeitado")
+
+
+def test_processador_reaproveita_cache():
+    """A segunda execução sobre os mesmos arquivos deve vir toda do cache"""
+    print("=== TESTE DE CACHE NO PROCESSADOR ===\n")
+
+    async def executar(base_dir, use_cache=True):
+        processor = DarmProcessor()
+        processor.darms_dir = Path(base_dir) / 'darms'
+        processor.output_dir = Path(base_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = use_cache
+        await processor.init()
+        await processor.process_darms()
+        return processor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ['0000011', '0000012']:
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        primeira = asyncio.run(executar(temp_dir))
+        segunda = asyncio.run(executar(temp_dir))
+        sem_cache = asyncio.run(executar(temp_dir, use_cache=False))
+
+        assert primeira.cache_hits == 0
+        assert segunda.cache_hits == 2
+        assert sem_cache.cache_hits == 0
+        assert segunda.guias_processadas == primeira.guias_processadas == ['11', '12']
+
+    assert parse_args(['--no-cache']).no_cache
+    print("✅ Cache reaproveitado na segunda execução")
+
+
+if __name__ == "__main__":
+    test_cache_chave_por_conteudo_e_configuracao()
+    test_cache_remove_entradas_menos_usadas()
+    test_processador_reaproveita_cache()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do extrator de campos pré-compilado (darm_extractor)
+"""
+
+import contextlib
+import io
+
+from benchmark_extracao import SAMPLE_TEXTS, extract_fields_legacy
+from darm_extractor import DEFAULT_EXTRACTOR
+
+
+def test_mesmo_resultado_do_extrator_anterior():
+    """O extrator pré-compilado devolve o mesmo dicionário que a versão anterior"""
+    print("=== TESTE DO EXTRATOR PRÉ-COMPILADO ===\n")
+
+    for name, text in SAMPLE_TEXTS.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            antes = extract_fields_legacy(text)
+            depois = DEFAULT_EXTRACTOR.extract_fields(text)
+        print(f"{name}: {depois}")
+        assert depois == antes
+
+    print("✅ Resultados idênticos")
+
+
+def test_rotulo_numerado_tem_precedencia():
+    """Rótulo genérico e campo numerado divergentes: vale o campo numerado do formulário
+
+    Mudança em relação ao extrator anterior, que para valores, vencimento e exercício
+    tentava primeiro os padrões genéricos.
+    """
+    text = ("01. RECEITA\n262-3\n02. INSCRIÇÃO MUNICIPAL\n03015483\n"
+            "Exercício: 2024\n04. ANO DE REFERÊNCIA\n2025\n05. GUIA NØ\n0000149\n"
+            "Valor Principal: R$ 10,00\n06. VALOR DO TRIBUTO\nR$ 32,05\n")
+    with contextlib.redirect_stdout(io.StringIO()):
+        antes = extract_fields_legacy(text)
+    depois = DEFAULT_EXTRACTOR.extract_fields(text, verbose=False)
+    assert (antes['exercicio'], antes['valorPrincipal']) == ('2024', '10,00')
+    assert (depois['exercicio'], depois['valorPrincipal']) == ('2025', '32,05')
+
+
+def test_varredura_unica_dos_rotulos():
+    """Todos os rótulos numerados são encontrados numa única varredura"""
+    positions = DEFAULT_EXTRACTOR.scan_labels(SAMPLE_TEXTS['linhas_separadas'])
+    assert set(positions) == {'codigoReceita', 'inscricao', 'dataVencimento', 'exercicio',
+                              'numeroGuia', 'valorPrincipal', 'valorTotal'}
+
+
+def test_codigo_barras_curto_tenta_proximo_padrao():
+    """Um rótulo de código de barras com poucos dígitos não impede achar o código completo"""
+    text = "Código de Barras: 123 (ver abaixo)\n" + "0" * 48
+    data = DEFAULT_EXTRACTOR.extract_fields(text, verbose=False)
+    assert data['codigoBarras'] == "0" * 48
+
+
+if __name__ == "__main__":
+    test_mesmo_resultado_do_extrator_anterior()
+    test_rotulo_numerado_tem_precedencia()
+    test_varredura_unica_dos_rotulos()
+    test_codigo_barras_curto_tenta_proximo_padrao()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da leitura antecipada: as páginas param de ser lidas quando os campos obrigatórios aparecem
+"""
+
+import asyncio
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from darm_extractor import DEFAULT_EXTRACTOR
+from darm_processor import DarmProcessor
+from fixtures_darm import criar_pdf_texto, linhas_darm
+from pdf_text_engines import PdfTextExtractor, PyPDF2Engine
+
+TEXTO_DARM = '\n'.join(linhas_darm(guia='0000051'))
+
+
+class MotorContador(PyPDF2Engine):
+    """PyPDF2 contando as páginas efetivamente lidas"""
+
+    def __init__(self):
+        self.pages_read = 0
+
+    def iter_pages(self, path, max_pages=None, first_page=1):
+        for page_text in super().iter_pages(path, max_pages, first_page):
+            self.pages_read += 1
+            yield page_text
+
+
+class ProcessadorOcrFalso(DarmProcessor):
+    """Processador com o OCR por página substituído por textos fixos"""
+
+    def __init__(self, paginas):
+        super().__init__()
+        self.paginas = paginas
+        self.ocr_calls = []
+
+    def ocr_pdf_page(self, filepath, page_number, total_pages, dpi=None):
+        self.ocr_calls.append(page_number)
+        return self.paginas[page_number - 1]
+
+    def iter_pdf_page_images(self, filepath, total_pages, dpi=None):
+        for page_number in range(1, total_pages + 1):
+            yield page_number, mock.Mock()
+
+    def ocr_page_image(self, image):
+        page_number = len(self.ocr_calls) + 1
+        self.ocr_calls.append(page_number)
+        return self.paginas[page_number - 1]
+
+
+def test_campos_obrigatorios():
+    """Inscrição, algum valor e número da guia são exigidos"""
+    print("=== TESTE DA LEITURA ANTECIPADA ===\n")
+    assert DEFAULT_EXTRACTOR.has_required_fields(TEXTO_DARM)
+    assert not DEFAULT_EXTRACTOR.has_required_fields(TEXTO_DARM.replace('05. GUIA NØ\n0000051', ''))
+    assert not DEFAULT_EXTRACTOR.has_required_fields('página de extrato sem dados')
+
+
+def test_camada_de_texto_para_na_primeira_pagina():
+    """Num PDF de várias páginas, só a primeira é lida quando já traz os campos"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / 'EXTRATO.pdf'
+        extrato = [[f'Linha {n} do extrato bancario' for n in range(40)]] * 4
+        criar_pdf_texto(pdf_path, [linhas_darm(guia='0000051')] + extrato)
+
+        motor = MotorContador()
+        processor = DarmProcessor()
+        processor.use_cache = False
+        processor.pdf_text = PdfTextExtractor([motor])
+        with contextlib.redirect_stdout(io.StringIO()):
+            rapido = asyncio.run(processor.extract_file(pdf_path, 'pdf'))
+        assert motor.pages_read == 1
+
+        # Mesmos dados da leitura completa
+        processor.stop_when_fields_found = False
+        with contextlib.redirect_stdout(io.StringIO()):
+            completo = asyncio.run(processor.extract_file(pdf_path, 'pdf'))
+        assert motor.pages_read == 6
+        assert rapido['darm_data'] == completo['darm_data']
+
+        # Campos só na última página: todas as páginas são lidas
+        criar_pdf_texto(pdf_path, extrato + [linhas_darm(guia='0000052')])
+        motor.pages_read = 0
+        processor.stop_when_fields_found = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(processor.extract_file(pdf_path, 'pdf'))
+        assert motor.pages_read == 5
+        assert result['darm_data']['numeroGuia'] == '52'
+    print("✅ Camada de texto lida só até os campos aparecerem")
+
+
+def test_ocr_para_na_primeira_pagina():
+    """No OCR (sequencial e paralelo) as páginas restantes não são processadas"""
+    paginas = [TEXTO_DARM, 'extrato', 'extrato', 'extrato']
+    for workers in (1, 3):
+        processor = ProcessadorOcrFalso(paginas)
+        processor.ocr_page_workers = workers
+        with mock.patch('darm_processor.pdfinfo_from_path', return_value={'Pages': 4}), \
+                contextlib.redirect_stdout(io.StringIO()):
+            text = asyncio.run(processor.extract_text_from_pdf_with_ocr(Path('EXTRATO.pdf')))
+
+        assert text == TEXTO_DARM + '\n'
+        if workers == 1:
+            assert processor.ocr_calls == [1]
+        else:
+            # Páginas já iniciadas pelos workers terminam, mas não entram no texto
+            assert 1 in processor.ocr_calls and len(processor.ocr_calls) <= 4
+    print("✅ OCR interrompido após a página com os campos")
+
+
+if __name__ == "__main__":
+    test_campos_obrigatorios()
+    test_camada_de_texto_para_na_primeira_pagina()
+    test_ocr_para_na_primeira_pagina()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do livro de guias (SQLite): guias geradas e carregadas entre execuções
+"""
+
+import asyncio
+import re
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor
+from darm_record import CD_BANCO, NR_LOTE_NSA, DarmRecord
+from fixtures_darm import criar_pdf_texto, linhas_darm
+from guia_ledger import GENERATED, LOADED, GuiaLedger
+
+
+def registro(guia, exercicio='2025', sq_doc=1):
+    return DarmRecord(exercicio, 2623, None, '03015483', guia, 2025, None, '32.05', '32.05', sq_doc)
+
+
+def test_livro_persistente():
+    """Guias registradas são encontradas pela chave, também depois de reabrir o livro"""
+    print("=== TESTE DO LIVRO DE GUIAS ===\n")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / '.guias.sqlite3'
+        ledger = GuiaLedger(path)
+        primeira = ledger.start_run()
+        ledger.record(registro('41'), 'DARM_41.pdf', 'INSERT_DARM_PAGO_41.sql')
+        ledger.record(registro(None), 'SEM_GUIA.pdf')  # Sem chave: não entra no livro
+        ledger.close()
+
+        ledger = GuiaLedger(path)
+        assert ledger.start_run() > primeira
+        entry = ledger.lookup((41, 2025, CD_BANCO, NR_LOTE_NSA))
+        assert entry['status'] == GENERATED and entry['run_id'] == primeira
+        assert entry['source_file'] == 'DARM_41.pdf' and entry['sq_doc'] == 1
+        assert ledger.lookup((41, 2024, CD_BANCO, NR_LOTE_NSA)) is None
+        assert ledger.count() == 1
+
+        # Carregada no banco: continua carregada quando o INSERT é gerado de novo
+        ledger.mark_loaded([(41, 2025, CD_BANCO, NR_LOTE_NSA), (42, 2025, CD_BANCO, NR_LOTE_NSA)])
+        ledger.record(registro('41', sq_doc=7), 'DARM_41_copia.pdf')
+        entry = ledger.lookup(registro('41').key())
+        assert entry['status'] == LOADED and entry['sq_doc'] == 7 and entry['run_id'] == ledger.run_id
+        assert ledger.count(LOADED) == 2
+        ledger.close()
+    print("✅ Livro de guias persistente")
+
+
+def test_processador_consulta_o_livro():
+    """Sem CHECK_GUIA por guia; guias já carregadas no banco não geram INSERT"""
+
+    async def executar(base_dir):
+        processor = DarmProcessor()
+        processor.darms_dir = Path(base_dir) / 'darms'
+        processor.output_dir = Path(base_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = False
+        await processor.init()
+        await processor.process_darms()
+        return processor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ['0000051', '0000052']:
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        primeira = asyncio.run(executar(temp_dir))
+        output_dir = Path(temp_dir) / 'inserts'
+        assert primeira.guias_processadas == ['51', '52']
+        assert not list(output_dir.glob('CHECK_GUIA_*.sql'))
+
+        ledger = GuiaLedger(output_dir / '.guias.sqlite3')
+        assert ledger.count(GENERATED) == 2
+        ledger.mark_loaded([(51, 2025, CD_BANCO, NR_LOTE_NSA)])
+        ledger.close()
+
+        segunda = asyncio.run(executar(temp_dir))
+        content = (output_dir / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        assert re.findall(r"'\d{8}', (\d+), ", content) == ['52']
+        assert segunda.guias_processadas == ['52'] and segunda.skipped_loaded == 1
+    print("✅ Guias carregadas puladas")
+
+
+
+def test_guia_gerada_em_execucao_anterior():
+    """Guia já gerada por outro arquivo numa execução anterior não é gerada de novo (skip_generated)"""
+
+    async def executar(base_dir, skip_generated=True):
+        processor = DarmProcessor()
+        processor.darms_dir = Path(base_dir) / 'darms'
+        processor.output_dir = Path(base_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = False
+        processor.skip_generated = skip_generated
+        await processor.init()
+        await processor.process_darms()
+        return processor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        criar_pdf_texto(darms_dir / 'DARM_61.pdf', [linhas_darm(guia='0000061')])
+        primeira = asyncio.run(executar(temp_dir))
+        assert primeira.guias_processadas == ['61']
+
+        # Outro arquivo com a mesma guia; o arquivo original continua gerando a sua
+        criar_pdf_texto(darms_dir / 'COPIA_61.pdf', [linhas_darm(guia='0000061', valor='45,10')])
+        segunda = asyncio.run(executar(temp_dir))
+        assert segunda.guias_processadas == ['61'] and segunda.skipped_generated == 1
+        content = (Path(temp_dir) / 'inserts' / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        assert '32.05' in content and '45.10' not in content
+
+        terceira = asyncio.run(executar(temp_dir, skip_generated=False))
+        assert terceira.guias_processadas == ['61', '61'] and terceira.skipped_generated == 0
+    print("✅ Guias já geradas puladas")
+
+
+if __name__ == "__main__":
+    test_livro_persistente()
+    test_processador_consulta_o_livro()
+    test_guia_gerada_em_execucao_anterior()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do modo incremental (manifesto de arquivos processados)
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor
+from fixtures_darm import criar_pdf_texto, linhas_darm
+
+
+async def executar_incremental(base_dir):
+    """Executar o processador em modo incremental, sem cache de extração"""
+    processor = DarmProcessor()
+    processor.darms_dir = Path(base_dir) / 'darms'
+    processor.output_dir = Path(base_dir) / 'inserts'
+    processor.parallel_processing = False
+    processor.use_cache = False
+    processor.incremental = True
+    await processor.init()
+    await processor.process_darms()
+    return processor
+
+
+def guias_no_consolidado(base_dir):
+    """Listar os NR_GUIA presentes no INSERT_TODOS_DARMs.sql"""
+    content = (Path(base_dir) / 'inserts' / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+    return sorted(re.findall(r"'\d{8}', (\d+), ", content))
+
+
+def sq_docs_no_consolidado(base_dir):
+    """Mapear NR_GUIA -> SQ_DOC no INSERT_TODOS_DARMs.sql"""
+    content = (Path(base_dir) / 'inserts' / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+    return {guia: sq_doc for sq_doc, guia in re.findall(r"730, 1, (\d+), .*?'\d{8}', (\d+), ", content)}
+
+
+def test_modo_incremental():
+    """Arquivos inalterados são pulados e o consolidado continua completo"""
+    print("=== TESTE DO MODO INCREMENTAL ===\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ['0000021', '0000022', '0000023']:
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        primeira = asyncio.run(executar_incremental(temp_dir))
+        assert primeira.skipped_unchanged == 0
+        assert guias_no_consolidado(temp_dir) == ['21', '22', '23']
+        sq_docs = sq_docs_no_consolidado(temp_dir)
+
+        # Segunda execução: nada mudou, tudo vem do manifesto (inclusive o SQ_DOC)
+        segunda = asyncio.run(executar_incremental(temp_dir))
+        assert segunda.skipped_unchanged == 3
+        assert guias_no_consolidado(temp_dir) == ['21', '22', '23']
+        assert sq_docs_no_consolidado(temp_dir) == sq_docs
+
+        # Arquivo alterado é reprocessado; arquivo removido sai do consolidado
+        alterado = darms_dir / 'DARM_0000022.pdf'
+        criar_pdf_texto(alterado, [linhas_darm(guia='0000099')])
+        os.utime(alterado, ns=(0, 0))
+        (darms_dir / 'DARM_0000023.pdf').unlink()
+
+        terceira = asyncio.run(executar_incremental(temp_dir))
+        assert terceira.skipped_unchanged == 1
+        assert guias_no_consolidado(temp_dir) == ['21', '99']
+        assert sq_docs_no_consolidado(temp_dir)['21'] == sq_docs['21']
+        assert sq_docs_no_consolidado(temp_dir)['99'] not in sq_docs.values()  # Novo SQ_DOC
+        assert set(terceira.manifest.entries) == {'DARM_0000021.pdf', 'DARM_0000022.pdf'}
+
+    print("✅ Modo incremental funcionando")
+
+
+if __name__ == "__main__":
+    test_modo_incremental()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste dos motores de OCR (tesserocr com instâncias aquecidas, pytesseract como fallback)
+"""
+
+import threading
+from unittest import mock
+
+import numpy as np
+
+import ocr_engines
+from ocr_engines import OcrWord, PytesseractEngine, TesserocrEngine, engine_from_config, parse_tesseract_config
+
+
+class ApiFalsa:
+    """PyTessBaseAPI de teste: registra as chamadas e devolve a whitelist em uso"""
+
+    criadas = []
+
+    def __init__(self, lang='eng', path=None):
+        self.lang = lang
+        self.variables = {'tessedit_char_whitelist': ''}
+        self.psm = None
+        self.image = None
+        self.ended = False
+        ApiFalsa.criadas.append(self)
+
+    def GetVariableAsString(self, name):
+        return self.variables.get(name)
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+        return True
+
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.image = (data, width, height, bytes_per_pixel, bytes_per_line)
+
+    def SetImage(self, image):
+        self.image = image
+
+    def GetUTF8Text(self):
+        return f"psm={self.psm} whitelist={self.variables['tessedit_char_whitelist']}"
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        self.ended = True
+
+
+def tesserocr_falso():
+    ApiFalsa.criadas = []
+    return mock.patch.object(ocr_engines, 'tesserocr', mock.Mock(PyTessBaseAPI=ApiFalsa))
+
+
+def test_configuracao_do_tesseract():
+    """A linha de comando do tesseract vira segmentação e variáveis da API"""
+    print("=== TESTE DOS MOTORES DE OCR ===\n")
+    assert parse_tesseract_config('') == (None, {})
+    assert parse_tesseract_config('--psm 7 -c tessedit_char_whitelist=0123456789.,') == \
+        (7, {'tessedit_char_whitelist': '0123456789.,'})
+
+
+def test_instancia_reaproveitada():
+    """Uma instância por thread e idioma; a configuração de uma chamada não vaza para a próxima"""
+    with tesserocr_falso():
+        engine = TesserocrEngine()
+        assert engine.available()
+        caixa = np.zeros((20, 30), dtype=np.uint8)
+
+        assert engine.image_to_string(caixa, lang='por', config='--psm 7 -c tessedit_char_whitelist=0123') == \
+            'psm=7 whitelist=0123'
+        assert engine.image_to_string(caixa, lang='por') == 'psm=3 whitelist='
+        assert len(ApiFalsa.criadas) == 1 and ApiFalsa.criadas[0].lang == 'por'
+
+        # Imagem direto da memória: tons de cinza e BGR (convertido para RGB)
+        api = ApiFalsa.criadas[0]
+        assert api.image[1:] == (30, 20, 1, 30)
+        colorida = np.zeros((2, 2, 3), dtype=np.uint8)
+        colorida[:, :, 0] = 255  # Azul no BGR
+        engine.image_to_string(colorida, lang='por')
+        data, width, height, bytes_per_pixel, bytes_per_line = api.image
+        assert (width, height, bytes_per_pixel, bytes_per_line) == (2, 2, 3, 6)
+        assert data[:3] == bytes([0, 0, 255])
+
+        # Outra thread: outra instância
+        thread = threading.Thread(target=engine.image_to_string, args=(caixa,), kwargs={'lang': 'por'})
+        thread.start()
+        thread.join()
+        assert len(ApiFalsa.criadas) == 2
+
+        engine.close()
+        assert all(api.ended for api in ApiFalsa.criadas)
+    print("✅ Instâncias do Tesseract reaproveitadas")
+
+
+def test_escolha_do_motor():
+    """Modo auto: tesserocr quando instalado; senão o pytesseract"""
+    with mock.patch.object(ocr_engines, 'tesserocr', None):
+        assert isinstance(engine_from_config({'engine': 'auto'}), PytesseractEngine)
+        assert isinstance(engine_from_config({'engine': 'tesserocr'}), PytesseractEngine)
+    with tesserocr_falso():
+        assert isinstance(engine_from_config({'engine': 'auto'}), TesserocrEngine)
+        assert isinstance(engine_from_config({'engine': 'pytesseract'}), PytesseractEngine)
+
+    with mock.patch('pytesseract.image_to_string', return_value='texto') as tesseract:
+        assert PytesseractEngine().image_to_string('imagem', lang='por', config='--psm 7') == 'texto'
+    tesseract.assert_called_once_with('imagem', lang='por', config='--psm 7')
+    print("✅ Escolha do motor de OCR")
+
+
+def test_palavras_com_confianca():
+    """image_to_data do pytesseract: só as palavras, com confiança, caixa e linha"""
+    dados = {'text': ['', '02.', 'INSCRIÇÃO', ' '], 'conf': ['-1', '91.5', 87, -1],
+             'left': [0, 10, 50, 0], 'top': [0, 20, 20, 0], 'width': [100, 30, 80, 0], 'height': [40, 12, 12, 0],
+             'block_num': [1, 1, 1, 1], 'par_num': [0, 1, 1, 1], 'line_num': [0, 1, 1, 1]}
+    with mock.patch('pytesseract.image_to_data', return_value=dados) as tesseract:
+        words = PytesseractEngine().image_to_data('imagem', lang='por', config='--psm 6')
+    assert words == [OcrWord('02.', 91.5, 10, 20, 30, 12, (1, 1, 1)),
+                     OcrWord('INSCRIÇÃO', 87.0, 50, 20, 80, 12, (1, 1, 1))]
+    assert tesseract.call_args.kwargs['config'] == '--psm 6'
+    print("✅ Palavras com confiança")
+
+
+if __name__ == "__main__":
+    test_configuracao_do_tesseract()
+    test_instancia_reaproveitada()
+    test_escolha_do_motor()
+    test_palavras_com_confianca()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do OCR por regiões (caixas do formulário do DARM)
+"""
+
+import contextlib
+import io
+from unittest import mock
+
+import numpy as np
+
+from darm_extractor import DEFAULT_EXTRACTOR
+from darm_processor import DarmProcessor
+from fixtures_darm import dados_tesseract
+from ocr_engines import PytesseractEngine
+from roi_ocr import RoiOcr
+
+MODELO = {
+    'inscricao': {'box': [0.0, 0.0, 0.5, 0.1], 'config': '--psm 7 -c tessedit_char_whitelist=0123456789'},
+    'numeroGuia': {'box': [0.5, 0.0, 1.0, 0.1], 'config': '--psm 8'},
+    'valorTotal': {'box': [0.0, 0.5, 1.0, 0.6]},
+}
+# Leitura de cada caixa, pela configuração usada no Tesseract
+LEITURAS = {MODELO['inscricao']['config']: '03015483\n', '--psm 8': '0000154', '--psm 7': '3.205,00'}
+
+
+def tesseract_falso(chamadas):
+    """image_to_string que registra o recorte e devolve a leitura da caixa"""
+    def image_to_string(image, lang=None, config=''):
+        chamadas.append((image.shape, config))
+        return LEITURAS[config]
+    return image_to_string
+
+
+def test_recortes_e_texto_montado():
+    """Cada caixa é recortada e lida com a sua configuração; o texto sai no layout numerado"""
+    print("=== TESTE DO OCR POR REGIÕES ===\n")
+    pagina = np.zeros((1000, 1000), dtype=np.uint8)
+    chamadas = []
+    leitor = RoiOcr(MODELO, engine=PytesseractEngine())
+
+    with mock.patch('pytesseract.image_to_string', tesseract_falso(chamadas)):
+        texto = leitor.read(pagina)
+
+    assert [shape for shape, _ in chamadas] == [(100, 500), (100, 500), (100, 1000)]
+    assert chamadas[2][1] == '--psm 7'  # Configuração padrão das caixas sem 'config'
+    assert texto.startswith('02. INSCRIÇÃO MUNICIPAL\n03015483\n05. GUIA NØ\n0000154')
+    dados = DEFAULT_EXTRACTOR.extract_fields(texto, verbose=False)
+    assert dados['inscricao'] == '03015483'
+    assert dados['numeroGuia'] == '154'
+    assert dados['valorTotal'] == '3.205,00'
+    print("✅ Caixas lidas e texto compatível com o extrator")
+
+
+def test_margem_nao_sai_da_pagina():
+    """A margem extra é limitada às bordas da imagem"""
+    leitor = RoiOcr({}, padding=0.05)
+    pagina = np.zeros((200, 100, 3), dtype=np.uint8)
+    assert leitor.crop(pagina, [0.0, 0.0, 0.5, 0.5]).shape == (110, 55, 3)
+    assert leitor.crop(pagina, [0.9, 0.9, 1.0, 1.0]).shape == (30, 15, 3)
+
+
+def test_pagina_inteira_quando_faltam_campos():
+    """Sem os campos obrigatórios nas caixas, o processador lê a página inteira"""
+    processor = DarmProcessor()
+    processor.ocr_engine = PytesseractEngine()
+    processor.roi_ocr = RoiOcr({'inscricao': MODELO['inscricao']}, engine=processor.ocr_engine)
+    pagina = np.zeros((1000, 1000), dtype=np.uint8)
+
+    # Caixas são lidas como texto; a página inteira, por palavras (confiança por campo)
+    with mock.patch('pytesseract.image_to_string', return_value='03015483') as caixas, \
+            mock.patch('pytesseract.image_to_data', return_value=dados_tesseract('PAGINA INTEIRA')) as pagina_inteira, \
+            contextlib.redirect_stdout(io.StringIO()):
+        assert processor.ocr_processed_image(pagina) == 'PAGINA INTEIRA\n'
+        assert caixas.call_count == 1 and pagina_inteira.call_count == 1
+
+        processor.roi_fallback_full_page = False
+        assert processor.ocr_processed_image(pagina) == '02. INSCRIÇÃO MUNICIPAL\n03015483\n'
+        assert caixas.call_count == 2 and pagina_inteira.call_count == 1
+    print("✅ Fallback para a página inteira")
+
+
+if __name__ == "__main__":
+    test_recortes_e_texto_montado()
+    test_margem_nao_sai_da_pagina()
+    test_pagina_inteira_quando_faltam_campos()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do registro de padrões de extração (pattern_registry)
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from config import EXTRACTION_PATTERNS, EXTRACTION_CONFIG
+from darm_extractor import DEFAULT_EXTRACTOR
+from pattern_registry import LABEL_AFTER_VALUE, LABEL_BEFORE_VALUE, NO_LABEL, PatternRegistry, specificity
+
+
+def aceitar(match):
+    return match.group(1)
+
+
+def test_padroes_vem_do_config():
+    """O extrator usa os padrões genéricos de config.EXTRACTION_PATTERNS"""
+    print("=== TESTE DO REGISTRO DE PADRÕES ===\n")
+    assert DEFAULT_EXTRACTOR.registry.definition() == EXTRACTION_PATTERNS
+
+    data = DEFAULT_EXTRACTOR.extract_fields("Receita: 258-5\nInscrição: 12345678\n", verbose=False)
+    assert data['codigoReceita'] == '258-5'
+    assert data['inscricao'] == '12345678'
+    print("✅ Padrões carregados do config.py")
+
+
+def test_ordem_adaptativa():
+    """O padrão que acerta passa à frente do que nunca acerta"""
+    registry = PatternRegistry({'campo': [r'nunca(\d+)', r'valor (\d+)']}, reorder_interval=2)
+
+    assert registry.find('campo', 'valor 1', aceitar) == '1'
+    assert registry.entries['campo'][0].source == r'nunca(\d+)'
+    assert registry.find('campo', 'valor 2', aceitar) == '2'
+
+    # Após 2 buscas a ordem é recalculada
+    assert registry.entries['campo'][0].source == r'valor (\d+)'
+    assert registry.find('campo', 'valor 3', aceitar) == '3'
+    stats = {item['pattern']: item for item in registry.stats()['campo']}
+    assert stats[r'valor (\d+)']['hits'] == 3
+    assert stats[r'nunca(\d+)']['attempts'] == 2  # Não foi mais tentado
+
+
+def test_padrao_sem_rotulo_fica_no_fim():
+    """A ordem adaptativa não deixa um padrão sem rótulo vencer o padrão com rótulo"""
+    assert specificity(r'(?:RECEITA|Receita)\s*:?\s*(\d{1,4}-\d{1,2})') == LABEL_BEFORE_VALUE
+    assert specificity(r'R?\$?\s*([\d,\.]+)\s*(?:Principal|PRINCIPAL)') == LABEL_AFTER_VALUE
+    assert specificity(r'(\d{1,4})-(\d{1,2})') == NO_LABEL
+
+    registry = PatternRegistry({'codigoReceita': EXTRACTION_PATTERNS['codigoReceita']}, reorder_interval=10)
+    for _ in range(60):
+        registry.find('codigoReceita', 'guia paga 258-5', aceitar)  # Só o padrão sem rótulo acerta
+    assert registry.entries['codigoReceita'][-1].source == r'(\d{1,4})-(\d{1,2})'
+
+    texto = 'CNPJ 42.498.733/0001-48\nCódigo de Receita: 262-3'
+    assert registry.find('codigoReceita', texto, aceitar) == '262-3'
+
+    # Estatísticas de outra execução também não mudam o vencedor
+    nova_execucao = PatternRegistry({'codigoReceita': EXTRACTION_PATTERNS['codigoReceita']})
+    nova_execucao.merge_stats(registry.stats_delta())
+    assert nova_execucao.find('codigoReceita', texto, aceitar) == '262-3'
+    assert DEFAULT_EXTRACTOR.extract_fields(texto, verbose=False, record=False)['codigoReceita'] == '262-3'
+
+
+def test_match_recusado_tenta_proximo_padrao():
+    """Um match que o accept recusa não conta como acerto"""
+    registry = PatternRegistry({'campo': [r'(\d)', r'(\d{3})']}, adaptive=False)
+    value = registry.find('campo', 'abc 123', lambda m: m.group(1) if len(m.group(1)) == 3 else None)
+    assert value == '123'
+    assert [e.hits for e in registry.entries['campo']] == [0, 1]
+
+
+def test_estatisticas_entre_processos_e_execucoes():
+    """Deltas de outro processo somam no registro e as estatísticas sobrevivem a uma nova execução"""
+    patterns = {'campo': [r'nunca(\d+)', r'valor (\d+)']}
+    worker = PatternRegistry(patterns, adaptive=False)
+    worker.find('campo', 'valor 7', aceitar)
+    delta = worker.stats_delta()
+    assert worker.stats_delta() == {}  # Já enviado
+
+    principal = PatternRegistry(patterns)
+    principal.merge_stats(delta)
+    assert principal.entries['campo'][0].source == r'valor (\d+)'
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stats_path = Path(temp_dir) / 'stats.json'
+        principal.save_stats(stats_path)
+
+        nova_execucao = PatternRegistry(patterns)
+        assert nova_execucao.load_stats(stats_path)
+        assert nova_execucao.entries['campo'][0].source == r'valor (\d+)'
+        assert nova_execucao.entries['campo'][0].hits == 1
+        assert not PatternRegistry(patterns).load_stats(Path(temp_dir) / 'inexistente.json')
+
+
+def test_arquivo_json_de_padroes():
+    """Um arquivo JSON substitui os padrões do config.py para os campos que define"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        patterns_file = Path(temp_dir) / 'padroes.json'
+        patterns_file.write_text(json.dumps({'numeroGuia': [r'Documento\s*(\d+)']}), encoding='utf8')
+
+        original = EXTRACTION_CONFIG['patterns_file']
+        EXTRACTION_CONFIG['patterns_file'] = str(patterns_file)
+        try:
+            registry = PatternRegistry.from_config()
+        finally:
+            EXTRACTION_CONFIG['patterns_file'] = original
+
+    assert registry.definition()['numeroGuia'] == [r'Documento\s*(\d+)']
+    assert registry.definition()['inscricao'] == EXTRACTION_PATTERNS['inscricao']
+    print("✅ Arquivo de padrões aplicado")
+
+
+if __name__ == "__main__":
+    test_padroes_vem_do_config()
+    test_ordem_adaptativa()
+    test_padrao_sem_rotulo_fica_no_fim()
+    test_match_recusado_tenta_proximo_padrao()
+    test_estatisticas_entre_processos_e_execucoes()
+    test_arquivo_json_de_padroes()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste dos PDFs consolidados (vários DARMs no mesmo arquivo)
+"""
+
+import asyncio
+import contextlib
+import io
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from darm_extractor import DEFAULT_EXTRACTOR
+from darm_processor import DarmProcessor
+from extraction_cache import ExtractionCache
+from fixtures_darm import criar_pdf_texto, linhas_darm
+
+
+def texto(guia):
+    return '\n'.join(linhas_darm(guia=guia)) + '\n'
+
+
+def test_divisao_do_texto():
+    """Cada página (ou "01. RECEITA") abre um DARM; páginas sem dados continuam o anterior"""
+    print("=== TESTE DO PDF CONSOLIDADO ===\n")
+    paginas = [
+        'CABECALHO DO BANCO\n' + texto('0000061'),
+        'Autenticação mecânica 123\n',       # Continuação do DARM anterior
+        texto('0000062') + texto('0000063'),  # Dois DARMs na mesma página
+    ]
+    documentos = DEFAULT_EXTRACTOR.split_documents(paginas)
+    assert len(documentos) == 3
+    assert documentos[0].startswith('CABECALHO') and documentos[0].endswith('123\n')
+    assert [DEFAULT_EXTRACTOR.extract_fields(d, verbose=False)['numeroGuia'] for d in documentos] == ['61', '62', '63']
+    print("✅ Texto dividido por DARM")
+
+
+async def processar(base_dir, paralelo=False):
+    processor = DarmProcessor()
+    processor.darms_dir = Path(base_dir) / 'darms'
+    processor.output_dir = Path(base_dir) / 'inserts'
+    processor.parallel_processing = paralelo
+    processor.max_workers = 2
+    processor.use_cache = False
+    processor.incremental = not paralelo
+    processor.split_multi_darm = True
+    processor.split_chunk_pages = 2
+    processor.split_page_workers = 2   # Blocos de páginas lidos no pool de processos
+    await processor.init()
+    await processor.process_darms()
+    return processor
+
+
+def test_um_registro_por_darm():
+    """Um PDF com N DARMs gera N linhas no consolidado, também ao vir do manifesto"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        guias = ['0000071', '0000072', '0000073', '0000074', '0000075']
+        paginas = [linhas_darm(guia=guia) for guia in guias]
+        paginas.insert(2, ['Comprovante de pagamento'])  # Página sem DARM
+        criar_pdf_texto(darms_dir / 'CONSOLIDADO_BANCO.pdf', paginas)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            primeira = asyncio.run(processar(temp_dir))
+        assert primeira.guias_processadas == ['71', '72', '73', '74', '75']
+
+        consolidado = Path(temp_dir) / 'inserts' / 'INSERT_TODOS_DARMs.sql'
+        content = consolidado.read_text(encoding='latin1')
+        assert re.findall(r"'\d{8}', (\d+), ", content) == ['71', '72', '73', '74', '75']
+        assert len(list((Path(temp_dir) / 'inserts').glob('INSERT_DARM_PAGO_*.sql'))) == 5
+
+        # Segunda execução: arquivo inalterado, os cinco DARMs vêm do manifesto com o mesmo SQ_DOC
+        with contextlib.redirect_stdout(io.StringIO()):
+            segunda = asyncio.run(processar(temp_dir))
+        assert segunda.skipped_unchanged == 1
+        assert consolidado.read_text(encoding='latin1') == content
+    print("✅ Um registro por DARM do PDF consolidado")
+
+
+def test_um_registro_por_darm_em_paralelo():
+    """No pool de processos o worker também divide o PDF consolidado (--multi-darm chega ao worker)"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        criar_pdf_texto(darms_dir / 'CONSOLIDADO_1.pdf', [linhas_darm(guia='0000011'), linhas_darm(guia='0000012')])
+        criar_pdf_texto(darms_dir / 'CONSOLIDADO_2.pdf', [linhas_darm(guia='0000021'), linhas_darm(guia='0000022')])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor = asyncio.run(processar(temp_dir, paralelo=True))
+        assert processor.guias_processadas == ['11', '12', '21', '22']
+    print("✅ Um registro por DARM também no processamento paralelo")
+
+
+def test_darm_sem_guia_nao_derruba_os_demais():
+    """Um DARM sem guia no meio do PDF consolidado não impede o registro dos seguintes"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        sem_guia = [linha for linha in linhas_darm(guia='') if linha not in ('05. GUIA NØ', '')]
+        criar_pdf_texto(darms_dir / 'LOTE.pdf', [linhas_darm(guia='0000101'), sem_guia,
+                                                 linhas_darm(guia='0000103')])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor = asyncio.run(processar(temp_dir))
+        assert processor.guias_processadas == ['101', 'SEM_GUIA', '103']
+        assert processor.manifest.lookup(darms_dir / 'LOTE.pdf') is not None
+
+        consolidado = Path(temp_dir) / 'inserts' / 'INSERT_TODOS_DARMs.sql'
+        assert re.findall(r"'\d{8}', (\w+), ", consolidado.read_text(encoding='latin1')) == ['101', 'NULL', '103']
+        assert (Path(temp_dir) / 'inserts' / 'INSERT_DARM_PAGO_103.sql').exists()
+
+    # Erro ao registrar um DARM: os outros seguem e o arquivo fica para a próxima execução
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        criar_pdf_texto(darms_dir / 'LOTE.pdf', [linhas_darm(guia=guia) for guia in ('0000101', '0000102', '0000103')])
+        registrar = DarmProcessor.register_darm_data
+
+        async def falhar_na_segunda(self, filepath, darm_data):
+            if darm_data['numeroGuia'] == '102':
+                raise ValueError('falha simulada')
+            return await registrar(self, filepath, darm_data)
+
+        saida = io.StringIO()
+        with mock.patch.object(DarmProcessor, 'register_darm_data', falhar_na_segunda), \
+                contextlib.redirect_stdout(saida):
+            processor = asyncio.run(processar(temp_dir))
+        assert processor.guias_processadas == ['101', '103']
+        assert '❌ Erro ao registrar LOTE.pdf#2: falha simulada' in saida.getvalue()
+        assert processor.manifest.lookup(darms_dir / 'LOTE.pdf') is None
+    print("✅ DARM sem guia registrado sem afetar os demais")
+
+
+def test_cache_guarda_a_lista():
+    """O cache de extração devolve todos os DARMs do PDF consolidado"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(Path(temp_dir))
+        documentos = [{'numeroGuia': '1'}, {'numeroGuia': '2'}]
+        cache.put('chave', {'text': 'texto', 'darm_data': documentos[0], 'documents': documentos})
+        assert cache.get('chave') == {'text': 'texto', 'darm_data': documentos[0], 'documents': documentos}
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_divisao_do_texto()
+    test_um_registro_por_darm()
+    test_um_registro_por_darm_em_paralelo()
+    test_darm_sem_guia_nao_derruba_os_demais()
+    test_cache_guarda_a_lista()
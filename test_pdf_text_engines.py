@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste dos motores de texto de PDF e do fallback para o PyPDF2
+"""
+
+import asyncio
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+import PyPDF2
+
+from darm_extractor import DEFAULT_EXTRACTOR
+from darm_processor import DarmProcessor
+from fixtures_darm import criar_pdf_texto, linhas_darm
+from pdf_text_engines import PdfminerEngine, PdfTextEngine, PdfTextExtractor, PyPDF2Engine
+
+
+class MotorFixo(PdfTextEngine):
+    """Motor de teste que devolve sempre o mesmo texto (ou falha)"""
+
+    def __init__(self, name, text=None):
+        self.name = name
+        self.text = text
+        self.calls = 0
+
+    def available(self):
+        return True
+
+    def iter_pages(self, path, max_pages=None, first_page=1):
+        self.calls += 1
+        if self.text is None:
+            raise RuntimeError('motor quebrado')
+        return iter([self.text])
+
+
+def test_pypdf2_igual_ao_leitor_original():
+    """O motor PyPDF2 devolve o mesmo texto da leitura direta com PdfReader"""
+    print("=== TESTE DOS MOTORES DE TEXTO DE PDF ===\n")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / 'DARM.pdf'
+        criar_pdf_texto(pdf_path, [linhas_darm(guia='0000041'), linhas_darm(guia='0000042')])
+
+        with open(pdf_path, 'rb') as f:
+            esperado = ''.join(page.extract_text() for page in PyPDF2.PdfReader(f).pages)
+        assert PyPDF2Engine().extract(pdf_path) == esperado
+        assert len(list(PyPDF2Engine().iter_pages(pdf_path, max_pages=1))) == 1
+    print("✅ Motor PyPDF2 equivalente")
+
+
+def test_ordem_e_fallback():
+    """Motores que falham ou não devolvem texto passam a vez para o próximo"""
+    quebrado = MotorFixo('quebrado')
+    vazio = MotorFixo('vazio', '  \n')
+    bom = MotorFixo('bom', 'texto')
+    extractor = PdfTextExtractor([quebrado, vazio, bom])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert extractor.extract(Path('x.pdf')) == ('texto', 'bom')
+        assert PdfTextExtractor([quebrado]).extract(Path('x.pdf')) == ('', None)
+    assert extractor.fallback_engines('vazio') == [bom]
+    assert extractor.fallback_engines('bom') == []
+    assert extractor.fallback_engines('ocr') == []
+
+    # Configuração automática: só motores disponíveis, com o PyPDF2 sempre no fim
+    nomes = PdfTextExtractor.from_config({'engine': 'pdfminer'}).names
+    assert nomes[-1] == 'pypdf2'
+    print("✅ Ordem e fallback dos motores")
+
+
+def test_texto_sem_dados_tenta_o_pypdf2():
+    """Se o texto do motor rápido não tem os dados do DARM, o processador tenta o PyPDF2"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / 'DARM_0000043.pdf'
+        criar_pdf_texto(pdf_path, [linhas_darm(guia='0000043')])
+
+        rapido = MotorFixo('rapido', 'texto sem os campos do formulário')
+        processor = DarmProcessor()
+        processor.use_cache = False
+        processor.pdf_text = PdfTextExtractor([rapido, PyPDF2Engine()])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(processor.extract_file(pdf_path, 'pdf'))
+
+        assert rapido.calls == 1
+        assert result['darm_data']['numeroGuia'] == '43'
+    print("✅ Fallback para o PyPDF2 quando faltam dados")
+
+
+def test_pdfminer_separa_as_linhas():
+    """O pdfminer devolve uma linha por linha do formulário: rótulos e valores não se misturam"""
+    motor = PdfminerEngine()
+    if not motor.available():
+        print("⚠️  pdfminer.six não instalado: teste ignorado")
+        return
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / 'DARM_0000101.pdf'
+        criar_pdf_texto(pdf_path, [linhas_darm(guia='0000101')])
+
+        texto = motor.extract(pdf_path)
+        assert '05. GUIA NØ\n0000101\n' in texto
+        dados = DEFAULT_EXTRACTOR.extract_fields(texto, verbose=False, record=False)
+        assert dados['numeroGuia'] == '101'
+        assert dados['codigoReceita'] == '2623'
+        assert dados['valorPrincipal'] == '32,05'
+        assert DEFAULT_EXTRACTOR.has_well_formed_data(dados)
+    print("✅ pdfminer com quebras de linha")
+
+
+def test_texto_malformado_tenta_o_pypdf2():
+    """Texto com rótulos e valores grudados resolve os campos com valores errados: o PyPDF2 é usado"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / 'DARM_0000044.pdf'
+        criar_pdf_texto(pdf_path, [linhas_darm(guia='0000044')])
+
+        # Texto como o do pdfminer sem LAParams: guia '4406', valor '32,0509.'
+        colado = MotorFixo('colado', ''.join(linhas_darm(guia='0000044')))
+        assert not DEFAULT_EXTRACTOR.has_well_formed_data(
+            DEFAULT_EXTRACTOR.extract_fields(colado.text, verbose=False, record=False))
+
+        processor = DarmProcessor()
+        processor.use_cache = False
+        processor.pdf_text = PdfTextExtractor([colado, PyPDF2Engine()])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(processor.extract_file(pdf_path, 'pdf'))
+
+        assert colado.calls == 1
+        assert result['darm_data']['numeroGuia'] == '44'
+        assert result['darm_data']['valorPrincipal'] == '32,05'
+    print("✅ Fallback para o PyPDF2 quando os dados vêm malformados")
+
+
+if __name__ == "__main__":
+    test_pypdf2_igual_ao_leitor_original()
+    test_ordem_e_fallback()
+    test_texto_sem_dados_tenta_o_pypdf2()
+    test_pdfminer_separa_as_linhas()
+    test_texto_malformado_tenta_o_pypdf2()
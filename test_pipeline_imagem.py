@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do caminho de imagem do OCR: páginas rasterizadas direto em tons de cinza
+"""
+
+import contextlib
+import io
+from pathlib import Path
+from unittest import mock
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmark_memoria_ocr import run_benchmark, synthetic_page
+from darm_processor import DarmProcessor
+from ocr_engines import OcrWord
+
+
+def test_cinza_igual_ao_bgr():
+    """Pré-processar a página em cinza dá o mesmo resultado que partir da página BGR"""
+    print("=== TESTE DO PIPELINE DE IMAGEM ===\n")
+    processor = DarmProcessor()
+    gray = np.asarray(synthetic_page(72, 'L'))
+    bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    assert np.array_equal(processor.preprocess_image_for_ocr(gray), processor.preprocess_image_for_ocr(bgr))
+    print("✅ Mesmo resultado sem a conversão de cores")
+
+
+def test_pagina_em_cinza_ate_o_ocr():
+    """A página é rasterizada em cinza e chega ao motor de OCR como array 2D"""
+    processor = DarmProcessor()
+    pagina = Image.new('L', (200, 100), 255)
+    with mock.patch('darm_processor.convert_from_path', return_value=[pagina]) as convert:
+        assert processor.rasterize_pdf_page(Path('DARM.pdf'), 2) is pagina
+    assert convert.call_args.kwargs['grayscale'] is True
+
+    # O OCR da página inteira é por palavras (confiança por campo); o motor é o atual do processador
+    palavras = [OcrWord('texto', 95.0, 0, 0, 50, 12, (1, 1, 1))]
+    processor.ocr_engine = mock.Mock(image_to_data=mock.Mock(return_value=palavras))
+    processor.barcode = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert processor.ocr_page_image(pagina) == 'texto\n'
+        assert processor.ocr_page_image(pagina.convert('RGB')) == 'texto\n'  # Página colorida também serve
+    assert processor.ocr_engine.image_to_data.call_count == 2
+    for call in processor.ocr_engine.image_to_data.call_args_list:
+        assert call.args[0].shape == (100, 200) and call.args[0].dtype == np.uint8
+
+
+def test_menos_memoria_por_pagina():
+    """O pipeline atual aloca bem menos por página que o anterior"""
+    result = run_benchmark(dpi=100)
+    assert result['atual'] < result['anterior'] / 2
+    print(f"✅ {result['anterior'] // 1024} KB -> {result['atual'] // 1024} KB por página")
+
+
+if __name__ == "__main__":
+    test_cinza_igual_ao_bgr()
+    test_pagina_em_cinza_ate_o_ocr()
+    test_menos_memoria_por_pagina()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do pré-processamento das imagens montado a partir da configuração
+"""
+
+import contextlib
+import io
+from unittest import mock
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from darm_processor import DarmProcessor
+from image_preprocessing import ImagePreprocessor, fit_within, stretch_contrast
+
+TUDO = {'convert_to_grayscale': True, 'apply_threshold': True, 'remove_noise': True, 'smooth_image': True,
+        'enhance_contrast': True, 'resize_if_needed': True, 'max_width': 2000, 'max_height': 3000}
+SO_THRESHOLD = dict(TUDO, enhance_contrast=False, resize_if_needed=False)
+
+
+def pagina(altura=300, largura=200):
+    """Página em cinza com um retângulo escuro e um gradiente leve"""
+    imagem = np.tile(np.linspace(180, 230, largura, dtype=np.uint8), (altura, 1))
+    imagem[50:80, 20:150] = 30
+    return imagem
+
+
+def test_etapas_conforme_configuracao():
+    """Etapas sem efeito (kernel e blur 1x1) ficam fora; preprocessing=False desliga tudo"""
+    print("=== TESTE DO PRÉ-PROCESSAMENTO ===\n")
+    ocr = {'preprocessing': True, 'threshold_method': 'adaptive', 'kernel_size': 1, 'blur_kernel': 1}
+    assert ImagePreprocessor.from_config(ocr, TUDO).names == ['grayscale', 'resize', 'contrast', 'threshold']
+    assert ImagePreprocessor.from_config(dict(ocr, kernel_size=3, blur_kernel=3), SO_THRESHOLD).names == \
+        ['grayscale', 'threshold', 'noise', 'smooth']
+    assert ImagePreprocessor.from_config(dict(ocr, preprocessing=False), TUDO).names == []
+    print("✅ Etapas montadas a partir da configuração")
+
+
+def test_mesmo_resultado_do_pipeline_anterior():
+    """Com as etapas do pipeline fixo anterior, o resultado é idêntico"""
+    ocr = {'preprocessing': True, 'threshold_method': 'adaptive', 'kernel_size': 1, 'blur_kernel': 1}
+    bgr = cv2.cvtColor(pagina(), cv2.COLOR_GRAY2BGR)
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    anterior = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    anterior = cv2.GaussianBlur(cv2.morphologyEx(anterior, cv2.MORPH_CLOSE, np.ones((1, 1), np.uint8)), (1, 1), 0)
+    atual, _ = ImagePreprocessor.from_config(ocr, SO_THRESHOLD).apply(bgr)
+    assert np.array_equal(atual, anterior)
+
+    for metodo in ('otsu', 'binary'):
+        binaria, _ = ImagePreprocessor.from_config(dict(ocr, threshold_method=metodo), SO_THRESHOLD).apply(bgr)
+        assert set(np.unique(binaria)) <= {0, 255}
+
+
+def test_reducao_e_contraste():
+    """Scans grandes são reduzidos mantendo a proporção; etapas sem efeito não copiam a imagem"""
+    a4_300dpi = np.zeros((3508, 2480), dtype=np.uint8)
+    reduzida = fit_within(a4_300dpi, 2000, 3000)
+    assert reduzida.shape == (2829, 2000)
+    pequena = pagina()
+    assert fit_within(pequena, 2000, 3000) is pequena
+
+    esticada = stretch_contrast(pequena)
+    assert esticada.min() == 0 and esticada.max() == 255
+    assert stretch_contrast(esticada) is esticada
+    print("✅ Redução e contraste")
+
+
+def test_pagina_rasterizada_nao_e_reduzida():
+    """Página de PDF rasterizada a 300 DPI chega inteira ao OCR; arquivos de imagem são reduzidos"""
+    processor = DarmProcessor()
+    processor.preprocessor = ImagePreprocessor.from_config(
+        {'preprocessing': True, 'threshold_method': 'binary', 'kernel_size': 1, 'blur_kernel': 1}, TUDO)
+    processor.ocr_engine = mock.Mock(image_to_data=mock.Mock(return_value=[]))
+    processor.barcode = None
+    a4_300dpi = np.full((3508, 2480), 255, dtype=np.uint8)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor.ocr_page_image(Image.fromarray(a4_300dpi))
+        assert processor.preprocess_image_for_ocr(a4_300dpi).shape == (2829, 2000)
+    assert processor.ocr_engine.image_to_data.call_args.args[0].shape == (3508, 2480)
+
+
+def test_tempos_por_etapa():
+    """O processador mostra o tempo de cada etapa por imagem e a média no fim"""
+    processor = DarmProcessor()
+    processor.preprocessor = ImagePreprocessor.from_config(
+        {'preprocessing': True, 'threshold_method': 'adaptive', 'kernel_size': 3, 'blur_kernel': 3}, TUDO)
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        for _ in range(2):
+            processed = processor.preprocess_image_for_ocr(np.asarray(pagina()))
+    assert processed.shape == (300, 200)
+    linha = saida.getvalue().splitlines()[-1]
+    assert linha.startswith('⏱️  Pré-processamento: grayscale') and 'smooth' in linha
+    media = processor.preprocessor.timing_report()
+    assert list(media) == ['grayscale', 'resize', 'contrast', 'threshold', 'noise', 'smooth']
+    assert processor.preprocessor.timings['threshold'][1] == 2
+    print("✅ Tempos por etapa")
+
+
+if __name__ == "__main__":
+    test_etapas_conforme_configuracao()
+    test_mesmo_resultado_do_pipeline_anterior()
+    test_reducao_e_contraste()
+    test_pagina_rasterizada_nao_e_reduzida()
+    test_tempos_por_etapa()
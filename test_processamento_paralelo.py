@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do processamento paralelo (pool de processos) do DarmProcessor
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor
+from fixtures_darm import criar_pdf_texto, linhas_darm
+
+
+async def processar_diretorio(base_dir, paralelo):
+    """Processar os DARMs do diretório no modo indicado e devolver o processador"""
+    processor = DarmProcessor()
+    processor.darms_dir = Path(base_dir) / 'darms'
+    processor.output_dir = Path(base_dir) / ('inserts_paralelo' if paralelo else 'inserts_sequencial')
+    processor.parallel_processing = paralelo
+    processor.max_workers = 3
+    await processor.init()
+    await processor.process_darms()
+    return processor
+
+
+def test_processamento_paralelo_ordem_deterministica():
+    """O modo paralelo deve produzir as mesmas guias, na mesma ordem, que o sequencial"""
+    print("=== TESTE DE PROCESSAMENTO PARALELO ===\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ['0000305', '0000101', '0000204', '0000150', '0000999']:
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        sequencial = asyncio.run(processar_diretorio(temp_dir, paralelo=False))
+        paralelo = asyncio.run(processar_diretorio(temp_dir, paralelo=True))
+
+        print(f"Sequencial: {sequencial.guias_processadas}")
+        print(f"Paralelo:   {paralelo.guias_processadas}")
+
+        assert sequencial.guias_processadas == ['101', '150', '204', '305', '999']
+        assert paralelo.guias_processadas == sequencial.guias_processadas
+        assert len(list(paralelo.output_dir.glob('INSERT_DARM_PAGO_*.sql'))) == 5
+
+    print("✅ Ordem determinística preservada no modo paralelo")
+
+
+if __name__ == "__main__":
+    test_processamento_paralelo_ordem_deterministica()
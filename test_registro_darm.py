@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do registro estruturado (DarmRecord) usado na geração dos SQL
+"""
+
+import asyncio
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor
+
+DADOS = {
+    'inscricao': '03015483',
+    'numeroGuia': '0000154',
+    'valorPrincipal': '3.205,00',
+    'valorTotal': '3.205,00',
+    'dataVencimento': '10/07/2025',
+    'exercicio': '2025',
+    'codigoReceita': '262-3',
+    'codigoBarras': '0126 2302 0301 5483 0310 0720 2504 2025 0500 0015 4063 2050',
+}
+
+
+def test_registro_normalizado():
+    """O registro guarda os valores já no formato do banco"""
+    print("=== TESTE DO REGISTRO DARM ===\n")
+    processor = DarmProcessor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        record = processor.build_record(DADOS)
+
+    assert record.numero_guia == '154'
+    assert record.codigo_receita == '2623'
+    assert record.data_vencimento == '2025-07-10 00:00:00'
+    assert record.valor_total == record.valor_principal == '3205.00'
+    assert record.codigo_barras == '012623020301548303100720250420250500001540632050'
+    assert not hasattr(record, '__dict__')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert processor.generate_sql_insert(DADOS) == record.render_insert()
+        assert processor.build_record({**DADOS, 'inscricao': ''}) is None
+    print("✅ Registro normalizado")
+
+
+def test_consolidado_a_partir_dos_registros():
+    """O arquivo único sai dos registros, cada linha com o SQ_DOC alocado para ela"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        processor = DarmProcessor()
+        processor.output_dir = Path(temp_dir)
+        processor.generate_check_files = False
+
+        async def registrar():
+            for guia, inscricao in [('0000101', '03015483'), ('0000102', ''), ('0000103', '03015483')]:
+                await processor.register_darm_data(Path(f'DARM_{guia}.pdf'),
+                                                   {**DADOS, 'numeroGuia': guia, 'inscricao': inscricao})
+            await processor.generate_single_sql_file()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(registrar())
+
+        # A guia sem inscrição não gera registro nem consome SQ_DOC
+        assert [(r.numero_guia, r.sq_doc) for r in processor.records] == [('101', 1), ('103', 2)]
+        content = (Path(temp_dir) / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+        assert "730, 1, 1, 2623, NULL, 'FARR'" in content
+        assert "730, 1, 2, 2623, NULL, 'FARR'" in content
+
+        # Arquivo individual renderizado do mesmo registro
+        individual = (Path(temp_dir) / 'INSERT_DARM_PAGO_0000103.sql').read_text(encoding='latin1')
+        assert individual == processor.records[1].render_insert()
+
+    print("✅ Arquivo único gerado a partir dos registros")
+
+
+def test_valor_com_virgula_nao_quebra_a_linha():
+    """Um valor com vírgula não desalinha as colunas (não há split do texto SQL)"""
+    processor = DarmProcessor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        record = processor.build_record({**DADOS, 'inscricao': '0301,5483'})
+    row = record.row(sq_doc=123)
+    assert row.startswith('(NULL, 2025, 70, 37, 0, 730, 1, 123, 2623, ')
+    assert "'0301,5483'" in row
+
+
+if __name__ == "__main__":
+    test_registro_normalizado()
+    test_consolidado_a_partir_dos_registros()
+    test_valor_com_virgula_nao_quebra_a_linha()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do alocador de SQ_DOC (sequência persistente com reserva de blocos)
+"""
+
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+from sq_doc_allocator import SqDocAllocator, SqDocExhaustedError, find_duplicate_sq_docs, iter_sq_docs_in_sql
+
+
+def alocar_em_processo(args):
+    """Alocar `quantidade` SQ_DOC num processo separado"""
+    sequence_path, quantidade = args
+    allocator = SqDocAllocator(sequence_path, block_size=7)
+    valores = [allocator.next() for _ in range(quantidade)]
+    allocator.release()
+    return valores
+
+
+def test_blocos_e_execucoes():
+    """Blocos reservados não se sobrepõem e a sequência continua na execução seguinte"""
+    print("=== TESTE DO ALOCADOR DE SQ_DOC ===\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sequence_path = Path(temp_dir) / '.sq_doc_sequence'
+        a = SqDocAllocator(sequence_path, start=100, block_size=3)
+        b = SqDocAllocator(sequence_path, start=100, block_size=3)
+
+        assert [a.next(), a.next()] == [100, 101]
+        assert b.next() == 103          # Bloco de b começa depois do bloco de a
+        assert [a.next(), a.next()] == [102, 106]
+
+        # Sobra de b não pode voltar (a reservou depois); sobra de a volta para a sequência
+        b.release()
+        a.release()
+        assert a.peek() == 107
+
+        seguinte = SqDocAllocator(sequence_path, start=100, block_size=3)
+        assert seguinte.next() == 107
+    print("✅ Blocos sem sobreposição")
+
+
+def test_sequencia_esgotada():
+    """Passar do valor máximo é erro, nunca reaproveitamento silencioso"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        allocator = SqDocAllocator(Path(temp_dir) / 'seq', start=1, max_value=4, block_size=3)
+        assert [allocator.next() for _ in range(4)] == [1, 2, 3, 4]
+        try:
+            allocator.next()
+            assert False, "Deveria ter esgotado"
+        except SqDocExhaustedError:
+            pass
+
+
+def test_processos_simultaneos():
+    """Vários processos alocando ao mesmo tempo não repetem SQ_DOC"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sequence_path = Path(temp_dir) / '.sq_doc_sequence'
+        with multiprocessing.Pool(4) as pool:
+            resultados = pool.map(alocar_em_processo, [(sequence_path, 300)] * 4)
+
+        todos = [v for valores in resultados for v in valores]
+        assert len(todos) == 1200
+        assert find_duplicate_sq_docs(todos) == []
+    print("✅ Processos simultâneos sem colisão")
+
+
+def test_verificacao_por_bitmap():
+    """A verificação encontra repetições dentro e fora da faixa do bitmap"""
+    valores = list(range(200000)) + [150000, 5, 2000000, 2000000]
+    assert find_duplicate_sq_docs(valores) == [150000, 5, 2000000]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sql_path = Path(temp_dir) / 'INSERT.sql'
+        sql_path.write_text("use silfae;\n\nINSERT INTO FarrDarmsPagos (\n    id\n) VALUES \n"
+                            "    (NULL, 2025, 70, 37, 0, 730, 1, 10, 2623, NULL),\n"
+                            "    (NULL, 2025, 70, 37, 0, 730, 1, 11, 2623, NULL);", encoding='latin1')
+        assert list(iter_sq_docs_in_sql(sql_path)) == [10, 11]
+
+
+if __name__ == "__main__":
+    test_blocos_e_execucoes()
+    test_sequencia_esgotada()
+    test_processos_simultaneos()
+    test_verificacao_por_bitmap()
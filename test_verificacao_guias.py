@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da verificação de existência das guias (uma consulta por lote, resultado lido de volta)
+"""
+
+import asyncio
+import re
+import tempfile
+from pathlib import Path
+
+from darm_processor import DarmProcessor, parse_args
+from fixtures_darm import criar_pdf_texto, linhas_darm
+from sql_output import existence_check_statements, read_existing_guias
+
+
+def test_consultas_em_blocos():
+    """NR_GUIA IN (...) por exercício, sem repetição, limitado por guias e por bytes"""
+    print("=== TESTE DA VERIFICAÇÃO DE GUIAS ===\n")
+    guias = [('101', '2025'), ('102', '2025'), ('101', '2025'), ('103', '2025'), ('7', '2024')]
+    statements = list(existence_check_statements(guias, chunk_size=2))
+    assert len(statements) == 3
+    assert statements[0].startswith('SELECT NR_GUIA, AA_EXERCICIO FROM FarrDarmsPagos WHERE AA_EXERCICIO = 2025 AND ')
+    assert statements[0].endswith('AND NR_GUIA IN (101, 102);')
+    assert statements[1].endswith('AND NR_GUIA IN (103);')
+    assert 'AA_EXERCICIO = 2024' in statements[2] and statements[2].endswith('NR_GUIA IN (7);')
+
+    limite = len(statements[0]) + 4
+    por_bytes = list(existence_check_statements([(str(n), 2025) for n in range(100, 110)], max_bytes=limite))
+    assert len(por_bytes) == 5 and all(len(statement) <= limite for statement in por_bytes)
+    numeros = [numero for statement in por_bytes
+               for numero in re.search(r'IN \((.*)\);', statement).group(1).split(', ')]
+    assert numeros == [str(n) for n in range(100, 110)]
+
+
+def test_resultado_lido_de_volta():
+    """Saída do mysql -B -N (TSV) ou CSV com cabeçalho"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tsv = Path(temp_dir) / 'GUIAS_EXISTENTES.tsv'
+        tsv.write_text('101\t2025\n103\t2025\n', encoding='latin1')
+        assert read_existing_guias(tsv) == {(101, 2025), (103, 2025)}
+
+        csv = Path(temp_dir) / 'resultado.csv'
+        csv.write_text('NR_GUIA,AA_EXERCICIO\n7,2024\n', encoding='latin1')
+        assert read_existing_guias(csv) == {(7, 2024)}
+
+
+def test_processador_exclui_guias_existentes():
+    """Primeira execução gera a verificação; com o resultado, as guias existentes ficam fora do INSERT"""
+
+    async def executar(base_dir, use_ledger=True):
+        processor = DarmProcessor()
+        processor.darms_dir = Path(base_dir) / 'darms'
+        processor.output_dir = Path(base_dir) / 'inserts'
+        processor.parallel_processing = False
+        processor.use_cache = False
+        processor.use_ledger = use_ledger
+        await processor.init()
+        await processor.process_darms()
+        return processor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        darms_dir = Path(temp_dir) / 'darms'
+        darms_dir.mkdir()
+        for guia in ['0000061', '0000062', '0000063']:
+            criar_pdf_texto(darms_dir / f'DARM_{guia}.pdf', [linhas_darm(guia=guia)])
+
+        asyncio.run(executar(temp_dir))
+        output_dir = Path(temp_dir) / 'inserts'
+        check = (output_dir / 'CHECK_GUIAS_EXISTENTES.sql').read_text(encoding='latin1')
+        assert check.count('SELECT') == 1 and 'AA_EXERCICIO = 2025' in check
+        assert check.rstrip().endswith('AND NR_GUIA IN (61, 62, 63);')
+        assert not list(output_dir.glob('CHECK_GUIA_*.sql'))
+
+        # Resultado da consulta: 61 e 63 já estão no banco
+        (output_dir / 'GUIAS_EXISTENTES.tsv').write_text('61\t2025\n63\t2025\n', encoding='latin1')
+        for use_ledger in (True, False):
+            processor = asyncio.run(executar(temp_dir, use_ledger))
+            content = (output_dir / 'INSERT_TODOS_DARMs.sql').read_text(encoding='latin1')
+            assert re.findall(r"'\d{8}', (\d+), ", content) == ['62']
+            assert processor.skipped_loaded == 2
+            assert (output_dir / 'CHECK_GUIAS_EXISTENTES.sql').read_text(encoding='latin1').rstrip().endswith(
+                'AND NR_GUIA IN (62);')
+
+    assert parse_args(['--guias-existentes', 'resultado.tsv']).guias_existentes == 'resultado.tsv'
+    print("✅ Guias existentes excluídas dos INSERTs")
+
+
+if __name__ == "__main__":
+    test_consultas_em_blocos()
+    test_resultado_lido_de_volta()
+    test_processador_exclui_guias_existentes()